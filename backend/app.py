@@ -1,45 +1,172 @@
-from flask import Flask, request, jsonify
+import os
+import json
+import logging
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 from modules.query_understanding import extract_keywords
 from modules.web_search import search_web
-from modules.content_scraping import scrape_content
-from modules.pre_filtering import filter_content
-from modules.summarization import summarize_and_structure
+from modules.content_scraping import iter_scraped
+from modules.pre_filtering import filter_documents, DocumentFilter, FILTER_CHAR_BUDGET
+from modules.summarization import summarize_and_structure, stream_summary, error_message, MODEL
+from modules.llm_scheduler import get_llm_scheduler, LLMBusy
+from modules.answer_cache import get_answer_cache, query_key, is_cacheable
+from modules.semantic_cache import get_semantic_cache
+from modules.local_index import local_first_evidence
+from modules.domain_health import get_domain_health
+from modules.startup import warm_up_async, readiness
+from modules.single_flight import SingleFlight
+from modules.metrics import timed, register_stats, render_metrics
+from modules.logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)  # This will enable CORS for all routes
 
+# Identical queries arriving together share one pipeline run
+inflight = SingleFlight()
+register_stats('single_flight', inflight.stats)
+
+# Development server settings (production runs under gunicorn, see gunicorn.conf.py)
+FLASK_PORT = int(os.getenv('FLASK_PORT', 5001))
+FLASK_DEBUG = os.getenv('FLASK_DEBUG', 'true').lower() == 'true'
+
+BUSY_MESSAGE = "Too many questions are being answered right now. Please try again in a few seconds."
+
 def main_pipeline(query, conversation_history=None):
     """
     Main pipeline for the AI Copilot.
     """
-    print(f"Received query: {query}")
+    with timed('pipeline'):
+        return _run_pipeline(query, conversation_history)
+
+def _run_pipeline(query, conversation_history):
+    logger.info("Received query: %s", query)
     if conversation_history:
-        print(f"Conversation history: {len(conversation_history)} messages")
+        logger.debug("Conversation history: %d messages", len(conversation_history))
+
+    # 0. Answer Cache - the same (or a paraphrased) question was answered moments ago
+    answer_cache = get_answer_cache()
+    semantic_cache = get_semantic_cache()
+    with timed('answer_cache'):
+        cached = answer_cache.lookup(query, conversation_history) or semantic_cache.lookup(query, conversation_history)
+    if cached:
+        logger.info("Answer cache hit")
+        return dict(cached, cache="hit")
 
     # 1. Query Understanding
     keywords = extract_keywords(query)
-    print(f"Extracted keywords: {keywords}")
+    logger.info("Extracted keywords: %s", keywords)
 
-    # 2. Web Search
-    urls = search_web(keywords)
-    print(f"Found URLs: {urls}")
+    # Local-first mode: pages scraped earlier may already cover the query
+    filtered_content = local_first_evidence(query, keywords, FILTER_CHAR_BUDGET)
+    if filtered_content is None:
+        # 2. Web Search
+        urls = search_web(keywords)
+        logger.info("Found %d URLs", len(urls))
+        logger.debug("URLs: %s", urls)
 
-    # 3. Scrape Content
-    scraped_content = scrape_content(urls)
-    print(f"Scraped content length: {len(scraped_content)} characters")
+        # 3 + 4. Scrape Content and Pre-filter each page as it arrives,
+        # stopping early once there is enough relevant content
+        with timed('scrape'):
+            filtered_content = filter_documents(iter_scraped(urls), keywords, query=query)
 
-    # 4. Pre-filtering
-    filtered_content = filter_content(scraped_content, keywords)
-    print(f"Filtered content length: {len(filtered_content)} characters")
+    # Same question over the same evidence gives the same prompt, reuse its answer
+    cached = answer_cache.get(query, conversation_history, filtered_content)
+    if cached:
+        logger.info("Answer cache hit on evidence")
+        return dict(cached, cache="hit")
 
     # 5. Summarize and Structure - Pass the original query and conversation history
     result = summarize_and_structure(filtered_content, query, conversation_history)
+    # Error responses, empty answers and answers without evidence are never cached
+    if is_cacheable(result, filtered_content):
+        answer_cache.put(query, conversation_history, filtered_content, result)
+        semantic_cache.put(query, conversation_history, result)
+    result['cache'] = "miss"
 
-    print("Final Result:")
-    print(result)
+    logger.debug("Final result: %s", result)
     return result
 
+def stream_pipeline(query, conversation_history=None):
+    """
+    Streaming version of main_pipeline. Yields stage events while the pipeline
+    runs, then the response tokens as the LLM generates them.
+    A cached answer is sent as a single token event.
+    """
+    with timed('pipeline'):
+        yield from _stream_pipeline(query, conversation_history)
+
+def _stream_pipeline(query, conversation_history):
+    logger.info("Received streaming query: %s", query)
+    answer_cache = get_answer_cache()
+    semantic_cache = get_semantic_cache()
+    with timed('answer_cache'):
+        cached = answer_cache.lookup(query, conversation_history) or semantic_cache.lookup(query, conversation_history)
+    if cached:
+        yield from _cached_answer_events(cached)
+        return
+
+    yield {"type": "stage", "stage": "understanding"}
+    keywords = extract_keywords(query)
+
+    yield {"type": "stage", "stage": "searching"}
+    filtered_content = local_first_evidence(query, keywords, FILTER_CHAR_BUDGET)
+    if filtered_content is None:
+        urls = search_web(keywords)
+
+        # Filter each page as it arrives and report progress
+        yield {"type": "stage", "stage": "scraping", "done": 0, "total": len(urls)}
+        with timed('scrape'):
+            doc_filter = DocumentFilter(keywords, query=query)
+            pages = iter_scraped(urls)
+            done = 0
+            try:
+                for i, text in pages:
+                    done += 1
+                    yield {"type": "stage", "stage": "scraping", "done": done, "total": len(urls)}
+                    if doc_filter.add(i, text):
+                        break
+            finally:
+                # Also runs when the client disconnects mid-scrape
+                pages.close()
+
+            yield {"type": "stage", "stage": "filtering"}
+            filtered_content = doc_filter.result()
+
+    cached = answer_cache.get(query, conversation_history, filtered_content)
+    if cached:
+        yield from _cached_answer_events(cached)
+        return
+
+    yield {"type": "stage", "stage": "generating"}
+    prompt_tokens = {}
+    pieces = []
+    try:
+        for text in stream_summary(filtered_content, query, conversation_history, prompt_tokens):
+            pieces.append(text)
+            yield {"type": "token", "text": text}
+    except LLMBusy as e:
+        yield {"type": "error", "message": BUSY_MESSAGE, "retry_after": e.retry_after}
+        return
+    except Exception as e:
+        logger.error("An error occurred while using Ollama: %s", e)
+        yield {"type": "error", "message": error_message(query)}
+        return
+
+    sources = ["Web search results"]
+    result = {"summary": "".join(pieces), "sources": sources, "prompt_tokens": prompt_tokens}
+    # Same rule as main_pipeline
+    if is_cacheable(result, filtered_content):
+        answer_cache.put(query, conversation_history, filtered_content, result)
+        semantic_cache.put(query, conversation_history, result)
+    yield {"type": "done", "sources": sources, "prompt_tokens": prompt_tokens, "cache": "miss"}
+
+def _cached_answer_events(result):
+    yield {"type": "token", "text": result["summary"]}
+    yield {"type": "done", "sources": result["sources"], "prompt_tokens": result.get("prompt_tokens", {}), "cache": "hit"}
+
 @app.route('/api/query', methods=['POST'])
 def handle_query():
     data = request.get_json()
@@ -49,9 +176,69 @@ def handle_query():
     if not query:
         return jsonify({"error": "Query not provided"}), 400
 
-    result = main_pipeline(query, conversation_history)
+    try:
+        # Reject up front rather than after search and scraping
+        get_llm_scheduler(MODEL).check_capacity()
+        result = inflight.do(query_key(query, conversation_history), main_pipeline, query, conversation_history)
+    except LLMBusy as e:
+        return busy_response(e)
     return jsonify(result)
 
-if __name__ == "__main__":
-    app.run(debug=True, port=5001)
+@app.route('/api/query/stream', methods=['POST'])
+def handle_query_stream():
+    """
+    Streams the pipeline as newline-delimited JSON events (application/x-ndjson).
+    """
+    data = request.get_json()
+    query = data.get('query')
+    conversation_history = data.get('conversation_history', [])
+
+    if not query:
+        return jsonify({"error": "Query not provided"}), 400
+
+    try:
+        get_llm_scheduler(MODEL).check_capacity()
+    except LLMBusy as e:
+        return busy_response(e)
+
+    def generate():
+        key = query_key(query, conversation_history)
+        for event in inflight.stream(key, stream_pipeline, query, conversation_history):
+            yield json.dumps(event) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/metrics')
+def metrics():
+    """Stage latency histograms, LLM token counts and cache/queue stats in Prometheus text format."""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
 
+@app.route('/ready')
+def ready():
+    """200 once the models are loaded and the worker pools are up, 503 before that."""
+    is_ready, checks = readiness()
+    return jsonify(dict(checks, ready=is_ready)), 200 if is_ready else 503
+
+@app.route('/domains')
+def domains():
+    """What the scraper has learned about each host: health, timeouts and circuit state."""
+    health = get_domain_health()
+    if health is None:
+        return jsonify({"error": "Domain health tracking is disabled"}), 404
+    limit = request.args.get('limit', 100, type=int)
+    return jsonify({"stats": health.stats(), "hosts": health.hosts(limit, request.args.get('host'))})
+
+def busy_response(e):
+    """503 with a Retry-After hint when the LLM queue is full."""
+    return jsonify({"error": BUSY_MESSAGE, "retry_after": e.retry_after}), 503, {'Retry-After': str(e.retry_after)}
+
+if __name__ == "__main__":
+    # Load the models and start the worker pools in the background; /ready reports when done.
+    # With the reloader on, only the child process that serves requests needs them.
+    if not FLASK_DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        warm_up_async()
+    app.run(debug=FLASK_DEBUG, port=FLASK_PORT)
@@ -0,0 +1,329 @@
+import os
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+import uvicorn
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse, PlainTextResponse
+from starlette.routing import Route
+from modules.query_understanding import extract_keywords
+from modules.web_search import search_web_async
+from modules.content_scraping import iter_scraped_async
+from modules.pre_filtering import DocumentFilter, FILTER_CHAR_BUDGET
+from modules.summarization import summarize_and_structure_async, stream_summary_async, error_message, MODEL
+from modules.llm_scheduler import get_llm_scheduler, LLMBusy
+from modules.answer_cache import get_answer_cache, query_key, is_cacheable
+from modules.semantic_cache import get_semantic_cache
+from modules.local_index import local_first_evidence
+from modules.domain_health import get_domain_health
+from modules.single_flight import AsyncSingleFlight
+from modules.http_client import new_async_client
+from modules.startup import warm_up_async, readiness
+from modules.metrics import timed, register_stats, render_metrics
+from modules.logging_config import configure_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+# How often a non-streaming request checks whether its client went away
+DISCONNECT_POLL_INTERVAL = 0.5
+
+# Identical queries arriving together share one pipeline run
+inflight = AsyncSingleFlight()
+register_stats('single_flight', inflight.stats)
+
+BUSY_MESSAGE = "Too many questions are being answered right now. Please try again in a few seconds."
+
+
+async def main_pipeline(client, query, conversation_history=None):
+    """
+    Async version of app.main_pipeline. Network stages are awaited on the
+    event loop; CPU-bound NLP stages run in worker threads.
+    """
+    with timed('pipeline'):
+        return await _run_pipeline(client, query, conversation_history)
+
+
+async def _run_pipeline(client, query, conversation_history):
+    logger.info("Received query: %s", query)
+
+    # 0. Answer Cache
+    answer_cache = get_answer_cache()
+    semantic_cache = get_semantic_cache()
+    with timed('answer_cache'):
+        cached = await lookup_cached_answer(answer_cache, semantic_cache, query, conversation_history)
+    if cached:
+        logger.info("Answer cache hit")
+        return dict(cached, cache="hit")
+
+    # 1. Query Understanding
+    keywords = await asyncio.to_thread(extract_keywords, query)
+    logger.info("Extracted keywords: %s", keywords)
+
+    # Local-first mode: pages scraped earlier may already cover the query
+    filtered_content = await asyncio.to_thread(local_first_evidence, query, keywords, FILTER_CHAR_BUDGET)
+    if filtered_content is None:
+        # 2. Web Search
+        urls = await search_web_async(client, keywords)
+        logger.info("Found %d URLs", len(urls))
+
+        # 3 + 4. Scrape Content and Pre-filter each page as it arrives
+        with timed('scrape'):
+            filtered_content = await filter_documents_async(iter_scraped_async(client, urls), keywords, query)
+
+    cached = await asyncio.to_thread(answer_cache.get, query, conversation_history, filtered_content)
+    if cached:
+        return dict(cached, cache="hit")
+
+    # 5. Summarize and Structure
+    result = await summarize_and_structure_async(filtered_content, query, conversation_history)
+    # Error responses, empty answers and answers without evidence are never cached
+    if is_cacheable(result, filtered_content):
+        await asyncio.to_thread(answer_cache.put, query, conversation_history, filtered_content, result)
+        await asyncio.to_thread(semantic_cache.put, query, conversation_history, result)
+    result['cache'] = "miss"
+    return result
+
+
+async def lookup_cached_answer(answer_cache, semantic_cache, query, conversation_history):
+    """Exact match first, then a paraphrase of a recent query."""
+    cached = await asyncio.to_thread(answer_cache.lookup, query, conversation_history)
+    if cached is None:
+        cached = await asyncio.to_thread(semantic_cache.lookup, query, conversation_history)
+    return cached
+
+
+async def filter_documents_async(pages, keywords, query=None):
+    """
+    Async version of filter_documents: filters pages as they arrive and stops
+    scraping once enough relevant content has been collected.
+    """
+    doc_filter = DocumentFilter(keywords, query=query)
+    try:
+        async for i, text in pages:
+            if await asyncio.to_thread(doc_filter.add, i, text):
+                logger.info("Collected %d characters of relevant content, stopping early", doc_filter.high_chars)
+                break
+    finally:
+        await pages.aclose()
+    # Dense filtering embeds the query here
+    return await asyncio.to_thread(doc_filter.result)
+
+
+async def stream_pipeline(client, query, conversation_history=None):
+    """
+    Async version of app.stream_pipeline, yielding the same events.
+    """
+    events = _stream_pipeline(client, query, conversation_history)
+    with timed('pipeline'):
+        try:
+            async for event in events:
+                yield event
+        finally:
+            await events.aclose()
+
+
+async def _stream_pipeline(client, query, conversation_history):
+    logger.info("Received streaming query: %s", query)
+    answer_cache = get_answer_cache()
+    semantic_cache = get_semantic_cache()
+    with timed('answer_cache'):
+        cached = await lookup_cached_answer(answer_cache, semantic_cache, query, conversation_history)
+    if cached:
+        for event in _cached_answer_events(cached):
+            yield event
+        return
+
+    yield {"type": "stage", "stage": "understanding"}
+    keywords = await asyncio.to_thread(extract_keywords, query)
+
+    yield {"type": "stage", "stage": "searching"}
+    filtered_content = await asyncio.to_thread(local_first_evidence, query, keywords, FILTER_CHAR_BUDGET)
+    if filtered_content is None:
+        urls = await search_web_async(client, keywords)
+
+        yield {"type": "stage", "stage": "scraping", "done": 0, "total": len(urls)}
+        with timed('scrape'):
+            doc_filter = DocumentFilter(keywords, query=query)
+            pages = iter_scraped_async(client, urls)
+            done = 0
+            try:
+                async for i, text in pages:
+                    done += 1
+                    yield {"type": "stage", "stage": "scraping", "done": done, "total": len(urls)}
+                    if await asyncio.to_thread(doc_filter.add, i, text):
+                        break
+            finally:
+                # Also runs when the client disconnects mid-scrape
+                await pages.aclose()
+
+            yield {"type": "stage", "stage": "filtering"}
+            filtered_content = await asyncio.to_thread(doc_filter.result)
+
+    cached = await asyncio.to_thread(answer_cache.get, query, conversation_history, filtered_content)
+    if cached:
+        for event in _cached_answer_events(cached):
+            yield event
+        return
+
+    yield {"type": "stage", "stage": "generating"}
+    prompt_tokens = {}
+    pieces = []
+    try:
+        async for text in stream_summary_async(filtered_content, query, conversation_history, prompt_tokens):
+            pieces.append(text)
+            yield {"type": "token", "text": text}
+    except asyncio.CancelledError:
+        raise
+    except LLMBusy as e:
+        yield {"type": "error", "message": BUSY_MESSAGE, "retry_after": e.retry_after}
+        return
+    except Exception as e:
+        logger.error("An error occurred while using Ollama: %s", e)
+        yield {"type": "error", "message": error_message(query)}
+        return
+
+    sources = ["Web search results"]
+    result = {"summary": "".join(pieces), "sources": sources, "prompt_tokens": prompt_tokens}
+    # Same rule as main_pipeline
+    if is_cacheable(result, filtered_content):
+        await asyncio.to_thread(answer_cache.put, query, conversation_history, filtered_content, result)
+        await asyncio.to_thread(semantic_cache.put, query, conversation_history, result)
+    yield {"type": "done", "sources": sources, "prompt_tokens": prompt_tokens, "cache": "miss"}
+
+
+def _cached_answer_events(result):
+    yield {"type": "token", "text": result["summary"]}
+    yield {"type": "done", "sources": result["sources"], "prompt_tokens": result.get("prompt_tokens", {}), "cache": "hit"}
+
+
+async def run_until_disconnected(request, coro):
+    """
+    Runs coro, cancelling it if the client disconnects first.
+    Returns (finished, result).
+    """
+    task = asyncio.create_task(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return True, task.result()
+            if await request.is_disconnected():
+                logger.info("Client disconnected, cancelling query")
+                task.cancel()
+                return False, None
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def _read_query(request):
+    data = await request.json()
+    return data.get('query'), data.get('conversation_history', [])
+
+
+async def handle_query(request):
+    query, conversation_history = await _read_query(request)
+    if not query:
+        return JSONResponse({"error": "Query not provided"}, status_code=400)
+
+    client = request.app.state.http_client
+    key = query_key(query, conversation_history)
+    try:
+        # Reject up front rather than after search and scraping
+        get_llm_scheduler(MODEL).check_capacity()
+        finished, result = await run_until_disconnected(
+            request, inflight.do(key, main_pipeline, client, query, conversation_history))
+    except LLMBusy as e:
+        return busy_response(e)
+    if not finished:
+        # Nobody is listening any more
+        return Response(status_code=499)
+    return JSONResponse(result)
+
+
+async def handle_query_stream(request):
+    """
+    Streams newline-delimited JSON events. The generator is cancelled when the client disconnects.
+    """
+    query, conversation_history = await _read_query(request)
+    if not query:
+        return JSONResponse({"error": "Query not provided"}, status_code=400)
+
+    try:
+        get_llm_scheduler(MODEL).check_capacity()
+    except LLMBusy as e:
+        return busy_response(e)
+
+    client = request.app.state.http_client
+
+    async def generate():
+        key = query_key(query, conversation_history)
+        async for event in inflight.stream(key, stream_pipeline, client, query, conversation_history):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type='application/x-ndjson',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+async def handle_ready(request):
+    """200 once the models are loaded and the worker pools are up, 503 before that."""
+    is_ready, checks = readiness()
+    return JSONResponse(dict(checks, ready=is_ready), status_code=200 if is_ready else 503)
+
+
+async def handle_metrics(request):
+    """Stage latency histograms, LLM token counts and cache/queue stats in Prometheus text format."""
+    return PlainTextResponse(render_metrics(), media_type='text/plain; version=0.0.4')
+
+
+async def handle_domains(request):
+    """What the scraper has learned about each host: health, timeouts and circuit state."""
+    health = get_domain_health()
+    if health is None:
+        return JSONResponse({"error": "Domain health tracking is disabled"}, status_code=404)
+    try:
+        limit = int(request.query_params.get('limit', 100))
+    except ValueError:
+        limit = 100
+    stats = await asyncio.to_thread(health.stats)
+    hosts = await asyncio.to_thread(health.hosts, limit, request.query_params.get('host'))
+    return JSONResponse({"stats": stats, "hosts": hosts})
+
+
+def busy_response(e):
+    """503 with a Retry-After hint when the LLM queue is full."""
+    return JSONResponse({"error": BUSY_MESSAGE, "retry_after": e.retry_after}, status_code=503,
+                        headers={'Retry-After': str(e.retry_after)})
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load the models and start the worker pools in the background; /ready reports when done
+    warm_up_async()
+    # One pooled HTTP client shared by every in-flight query
+    async with new_async_client() as client:
+        app.state.http_client = client
+        yield
+
+
+app = Starlette(
+    routes=[
+        Route('/api/query', handle_query, methods=['POST']),
+        Route('/api/query/stream', handle_query_stream, methods=['POST']),
+        Route('/metrics', handle_metrics),
+        Route('/ready', handle_ready),
+        Route('/domains', handle_domains),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
+
+if __name__ == "__main__":
+    uvicorn.run("app_async:app", port=int(os.getenv('FLASK_PORT', 5001)))
@@ -0,0 +1,173 @@
+# pipeline.py
+"""
+End-to-end benchmark of main_pipeline, fully offline.
+
+Search results and pages come from the recorded fixtures and the LLM is a stub
+generating at a fixed token rate (see stub_servers.py), so runs are repeatable
+and only our own code is measured. Reports p50/p95 per pipeline stage and end
+to end, throughput at the given number of concurrent clients, and peak RSS.
+
+Each run keeps its state in a fresh temporary directory. By default every
+cache also stores nothing (cold runs); --warm keeps the search, page and
+answer caches on, as in production.
+
+Usage (from backend/, with the spaCy and NLTK data installed once):
+    python -m benchmarks.pipeline --requests 30 --concurrency 4 --token-rate 30
+    python -m benchmarks.pipeline --warm --json > results.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from .stub_servers import stub_servers, FixtureWeb, DEFAULT_TOKEN_RATE, DEFAULT_PREFILL_RATE, DEFAULT_REPLY_TOKENS
+
+COLD_ENV = {
+    'SEARCH_CACHE_TTL': '0',
+    'PAGE_CACHE_TTL': '0',
+    'PAGE_CACHE_NEGATIVE_TTL': '0',
+    'ANSWER_CACHE_TTL': '0',
+    'ANSWER_CACHE_QUERY_TTL': '0',
+    'SEMANTIC_CACHE_ENABLED': 'false',
+}
+
+# Every store the backend keeps on disk; all of them go in the run's own directory,
+# so no run (cold or warm) starts from state left by an earlier one
+STATE_PATHS = {
+    'PAGE_CACHE_PATH': 'pages.sqlite3',
+    'SEARCH_CACHE_PATH': 'search.sqlite3',
+    'ANSWER_CACHE_PATH': 'answers.sqlite3',
+    'LOCAL_INDEX_PATH': 'local_index.sqlite3',
+    'DOMAIN_HEALTH_PATH': 'domains.sqlite3',
+    'VECTOR_STORE_DIR': 'vectors',
+}
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def configure_environment(urls, args, cache_dir):
+    """Points the backend at the stubs. Must run before any module is imported."""
+    os.environ['SEARCH_URL'] = urls['search_url']
+    os.environ['OLLAMA_HOST'] = urls['ollama_host']
+    os.environ['CACHE_DIR'] = cache_dir
+    for name, filename in STATE_PATHS.items():
+        os.environ[name] = os.path.join(cache_dir, filename)
+    os.environ['LOG_LEVEL'] = args.log_level
+    os.environ['LLM_QUEUE_SIZE'] = str(max(args.concurrency, int(os.getenv('LLM_QUEUE_SIZE', 16))))
+    if not args.warm:
+        os.environ.update(COLD_ENV)
+    if args.local_first:
+        os.environ['LOCAL_FIRST'] = 'true'
+
+
+def run(args):
+    import app
+    from modules.metrics import STAGE_SECONDS
+
+    samples = defaultdict(list)
+    recording = threading.Event()
+
+    def record(value, labels):
+        if recording.is_set():
+            samples[labels['stage']].append(value)
+
+    STAGE_SECONDS.add_listener(record)
+    queries = [q['query'] for q in FixtureWeb().queries]
+
+    def one(i):
+        started = time.perf_counter()
+        try:
+            result = app.main_pipeline(queries[i % len(queries)], [])
+            ok = bool(result.get('sources'))
+        except Exception as e:
+            print(f"request {i} failed: {e}", file=sys.stderr)
+            ok = False
+        return time.perf_counter() - started, ok
+
+    # Loads spaCy, NLTK and the caches outside the measured window
+    for i in range(args.warmup):
+        one(i)
+
+    recording.set()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(one, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    recording.clear()
+
+    latencies = [latency for latency, ok in outcomes if ok]
+    return {
+        'mode': 'warm' if args.warm else 'cold',
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'token_rate': args.token_rate,
+        'failed': sum(1 for _, ok in outcomes if not ok),
+        'wall_seconds': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'end_to_end': {'p50': percentile(latencies, 50), 'p95': percentile(latencies, 95)},
+        'stages': {
+            stage: {'count': len(values), 'p50': percentile(values, 50), 'p95': percentile(values, 95)}
+            for stage, values in sorted(samples.items())
+        },
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def print_report(report):
+    print(f"{report['mode']} run: {report['requests']} requests, {report['concurrency']} concurrent clients, "
+          f"LLM at {report['token_rate']:g} tokens/s")
+    print(f"{'stage':<16}{'count':>8}{'p50 (s)':>10}{'p95 (s)':>10}")
+    for stage, values in report['stages'].items():
+        print(f"{stage:<16}{values['count']:>8}{values['p50']:>10.3f}{values['p95']:>10.3f}")
+    end_to_end = report['end_to_end']
+    print(f"{'end to end':<16}{report['requests'] - report['failed']:>8}{end_to_end['p50']:>10.3f}{end_to_end['p95']:>10.3f}")
+    print(f"\nThroughput: {report['throughput_rps']:.2f} requests/s over {report['wall_seconds']:.1f}s "
+          f"({report['failed']} failed)")
+    print(f"Peak RSS:   {report['peak_rss_mb']:.0f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=30)
+    parser.add_argument('--concurrency', type=int, default=4, help='concurrent clients')
+    parser.add_argument('--warmup', type=int, default=1, help='unmeasured requests run first')
+    parser.add_argument('--warm', action='store_true', help='keep the caches on')
+    parser.add_argument('--local-first', action='store_true', help='answer from the local index when it covers the query')
+    parser.add_argument('--token-rate', type=float, default=DEFAULT_TOKEN_RATE, help='stub LLM tokens per second')
+    parser.add_argument('--prefill-rate', type=float, default=DEFAULT_PREFILL_RATE, help='stub LLM prompt tokens per second')
+    parser.add_argument('--reply-tokens', type=int, default=DEFAULT_REPLY_TOKENS, help='tokens per stub answer')
+    parser.add_argument('--page-latency', type=float, default=0.0, help='seconds added to every page fetch')
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args()
+
+    options = dict(token_rate=args.token_rate, prefill_rate=args.prefill_rate,
+                   reply_tokens=args.reply_tokens, page_latency=args.page_latency)
+    with stub_servers(**options) as urls, tempfile.TemporaryDirectory() as cache_dir:
+        configure_environment(urls, args, cache_dir)
+        report = run(args)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# prompt_prefix.py
+"""
+Compares Ollama time-to-first-token for two prompt layouts:
+
+  before: one user message with the query, history and web data *before*
+          the static formatting instructions (no shared prefix)
+  after:  the static SYSTEM_PROMPT as a first message, then the per-request
+          user message (shared, cacheable prefix)
+
+Every run uses a different query, so only the layout can explain a difference.
+
+Usage (from backend/, with Ollama running):
+    python -m benchmarks.prompt_prefix --runs 10
+"""
+import argparse
+import statistics
+import time
+import ollama
+from modules.summarization import build_prompt, MODEL, OLLAMA_NUM_CTX, OLLAMA_KEEP_ALIVE
+
+QUERIES = [
+    "upcoming hackathons for cse students",
+    "best smartwatch under 5000",
+    "top 5 python web frameworks",
+    "how to deploy a flask app to production",
+    "latest iphone features and price",
+    "compare rtx 4060 vs rx 7600",
+    "explain quantum computing in simple terms",
+    "best budget laptops for programming",
+    "upcoming tech conferences in india",
+    "what is retrieval augmented generation",
+]
+
+SAMPLE_EVIDENCE = (
+    "Registration for the Smart India Hackathon closes on 15 September and the grand finale runs in December. "
+    "The Galaxy Watch FE costs ₹4,999 and offers a 1.2 inch AMOLED display with 30 hour battery life. "
+    "Django, FastAPI and Flask remain the most popular Python frameworks according to the latest developer survey. "
+) * 20
+
+
+def legacy_messages(messages):
+    """Rebuilds the old layout: per-request content first, static instructions after."""
+    system, user = messages
+    return [{'role': 'user', 'content': user['content'] + "\n\n" + system['content']}]
+
+
+def time_to_first_token(messages):
+    start = time.perf_counter()
+    stream = ollama.chat(
+        model=MODEL,
+        messages=messages,
+        options={'num_ctx': OLLAMA_NUM_CTX, 'num_predict': 8},
+        keep_alive=OLLAMA_KEEP_ALIVE,
+        stream=True,
+    )
+    first_token = None
+    for chunk in stream:
+        if first_token is None and chunk['message']['content']:
+            first_token = time.perf_counter() - start
+    return first_token if first_token is not None else time.perf_counter() - start
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def run(layout, runs):
+    timings = []
+    for i in range(runs):
+        query = QUERIES[i % len(QUERIES)] + f" (run {i})"
+        messages, _ = build_prompt(SAMPLE_EVIDENCE, query)
+        if layout == 'before':
+            messages = legacy_messages(messages)
+        timings.append(time_to_first_token(messages))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    # Load the model so neither layout pays the cold start
+    time_to_first_token([{'role': 'user', 'content': 'hi'}])
+
+    results = {}
+    for layout in ('before', 'after'):
+        results[layout] = run(layout, args.runs)
+
+    print(f"\nTime to first token over {args.runs} runs ({MODEL}):")
+    for layout, timings in results.items():
+        print(f"  {layout:>6}: median {statistics.median(timings) * 1000:8.0f} ms   "
+              f"p95 {percentile(timings, 95) * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# record.py
+"""
+Re-records the benchmark fixtures from the live web: for each query, the
+search results and every result page, rewritten to point at the fixture
+server (see stub_servers.py). Pages that fail to download are left as links
+so the offline runs still exercise the error path.
+
+Usage (from backend/, online):
+    python -m benchmarks.record                                # re-record fixtures/queries.json
+    python -m benchmarks.record "best budget laptops for programming"
+"""
+import os
+import re
+import sys
+import json
+import html
+import requests
+from .stub_servers import FIXTURES_DIR
+from modules.query_understanding import extract_keywords
+from modules.web_search import search_web, SEARCH_HEADERS
+
+RESULT_TEMPLATE = '''  <div class="g"><div class="yuRUbf"><a href="{{page:{name}}}"><h3>{title}</h3></a></div></div>'''
+SEARCH_TEMPLATE = '''<!DOCTYPE html>
+<html><head><title>{query} - Search</title></head>
+<body>
+<div id="search"><div id="rso">
+{results}
+</div></div>
+</body></html>
+'''
+
+
+def slugify(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')[:60]
+
+
+def record_query(query, timeout=15):
+    """Downloads the results for query and writes its search and page fixtures."""
+    slug = slugify(query)
+    urls = search_web(extract_keywords(query), use_cache=False)
+    results = []
+    for i, url in enumerate(urls, 1):
+        name = f'{slug}-{i}'
+        title = url
+        try:
+            response = requests.get(url, headers=SEARCH_HEADERS, timeout=timeout)
+            response.raise_for_status()
+            with open(os.path.join(FIXTURES_DIR, 'pages', f'{name}.html'), 'w', encoding='utf-8') as f:
+                f.write(response.text)
+            match = re.search(r'<title[^>]*>(.*?)</title>', response.text, re.S | re.I)
+            if match:
+                title = html.unescape(match.group(1)).strip()
+            print(f"  recorded {url}")
+        except Exception as e:
+            print(f"  could not download {url}: {e}")
+        results.append(RESULT_TEMPLATE.format(name=name, title=html.escape(title)))
+
+    with open(os.path.join(FIXTURES_DIR, 'search', f'{slug}.html'), 'w', encoding='utf-8') as f:
+        f.write(SEARCH_TEMPLATE.format(query=html.escape(query), results='\n'.join(results)))
+    return {'query': query, 'search': f'{slug}.html'}
+
+
+def main():
+    queries_path = os.path.join(FIXTURES_DIR, 'queries.json')
+    with open(queries_path, encoding='utf-8') as f:
+        recorded = json.load(f)
+
+    queries = sys.argv[1:] or [q['query'] for q in recorded]
+    for query in queries:
+        print(f"Recording: {query}")
+        entry = record_query(query)
+        recorded = [q for q in recorded if q['query'] != query] + [entry]
+
+    with open(queries_path, 'w', encoding='utf-8') as f:
+        json.dump(recorded, f, indent=2)
+        f.write('\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+# stub_servers.py
+"""
+Offline stand-ins for the web and for Ollama, used by the benchmarks and by
+test_search.py --offline.
+
+  fixture web: /search?q=... returns the recorded result page whose query shares
+               the most words with q (see fixtures/queries.json), and
+               /pages/<name>.html the recorded articles. Pages are spread over
+               several ports so the per-host scrape limiter sees separate sites.
+  ollama:      /api/chat streams a canned answer at a fixed token rate after a
+               prefill delay proportional to the prompt, reporting the same
+               timing fields as Ollama; /api/embed returns deterministic vectors.
+
+Usage (from backend/):
+    python -m benchmarks.stub_servers --token-rate 30
+    SEARCH_URL=<printed url> OLLAMA_HOST=<printed url> python app.py
+"""
+import os
+import re
+import json
+import math
+import time
+import zlib
+import argparse
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+PAGE_PLACEHOLDER = re.compile(r'\{page:([\w-]+)\}')
+
+# Roughly what llama3.1:8b manages on a laptop GPU
+DEFAULT_TOKEN_RATE = 30.0
+DEFAULT_PREFILL_RATE = 1500.0
+DEFAULT_REPLY_TOKENS = 250
+EMBEDDING_DIMS = 64
+
+CANNED_ANSWER = (
+    "## Summary\n\nBased on the sources, here are the key points:\n\n"
+    "- **First option**: recommended for most readers, with the details listed in the sources.\n"
+    "- **Second option**: a cheaper alternative with fewer features.\n"
+    "- **Third option**: worth considering if availability matters more than price.\n\n"
+    "### Dates and prices\n\n| Item | Date | Price |\n|------|------|-------|\n"
+    "| Registration | 30 September 2025 | Free |\n| Final round | December 2025 | ₹4,999 |\n\n"
+    "Check the official websites before deciding, since details change often.\n"
+)
+
+
+def _words(text):
+    return set(re.findall(r'[a-z0-9]+', text.lower()))
+
+
+class FixtureWeb:
+    """Recorded search results and pages, and the ports they are served on."""
+
+    def __init__(self, fixtures_dir=FIXTURES_DIR):
+        self.fixtures_dir = fixtures_dir
+        with open(os.path.join(fixtures_dir, 'queries.json'), encoding='utf-8') as f:
+            self.queries = json.load(f)
+        self.page_names = sorted(
+            name[:-len('.html')] for name in os.listdir(os.path.join(fixtures_dir, 'pages'))
+            if name.endswith('.html')
+        )
+        self.ports = []
+
+    def port_for(self, page):
+        return self.ports[zlib.crc32(page.encode()) % len(self.ports)]
+
+    def search_page(self, query):
+        """The recorded result page for the query closest to query, with live page URLs."""
+        words = _words(query)
+        best = max(self.queries, key=lambda q: len(words & _words(q['query'])))
+        with open(os.path.join(self.fixtures_dir, 'search', best['search']), encoding='utf-8') as f:
+            html = f.read()
+        return PAGE_PLACEHOLDER.sub(
+            lambda m: f'http://127.0.0.1:{self.port_for(m.group(1))}/pages/{m.group(1)}.html', html)
+
+    def page(self, name):
+        if name not in self.page_names:
+            return None
+        with open(os.path.join(self.fixtures_dir, 'pages', f'{name}.html'), encoding='utf-8') as f:
+            return f.read()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type='text/html; charset=utf-8'):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, payload, status=200):
+        self._send(status, json.dumps(payload), 'application/json; charset=utf-8')
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+
+def web_handler(site, page_latency):
+    class WebHandler(_Handler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            if url.path == '/search':
+                query = parse_qs(url.query).get('q', [''])[0]
+                return self._send(200, site.search_page(query))
+
+            match = re.fullmatch(r'/pages/([\w-]+)\.html', url.path)
+            html = site.page(match.group(1)) if match else None
+            if page_latency:
+                time.sleep(page_latency)
+            if html is None:
+                return self._send(404, '<html><body><h1>Not Found</h1></body></html>')
+            self._send(200, html)
+
+    return WebHandler
+
+
+def _embedding(text):
+    """A normalized hashed bag of words, so equal texts embed equally and similar ones nearby."""
+    vector = [0.0] * EMBEDDING_DIMS
+    for word in _words(text):
+        vector[zlib.crc32(word.encode()) % EMBEDDING_DIMS] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def ollama_handler(token_rate, prefill_rate, reply_tokens):
+    tokens = re.findall(r'\S+\s*|\s+', CANNED_ANSWER)
+
+    class OllamaHandler(_Handler):
+        def do_GET(self):
+            if self.path == '/api/version':
+                return self._send_json({'version': 'stub'})
+            self._send(200, 'Ollama is running', 'text/plain; charset=utf-8')
+
+        def do_POST(self):
+            if self.path == '/api/chat':
+                return self._chat(self._read_json())
+            if self.path == '/api/embed':
+                return self._embed(self._read_json())
+            self._send_json({'error': f'unknown endpoint {self.path}'}, 404)
+
+        def _embed(self, body):
+            inputs = body.get('input', '')
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            self._send_json({'model': body.get('model'), 'embeddings': [_embedding(text) for text in inputs]})
+
+        def _chat(self, body):
+            started = time.perf_counter()
+            prompt_tokens = sum(len(m.get('content', '')) for m in body.get('messages', [])) // 4
+            count = min(reply_tokens, (body.get('options') or {}).get('num_predict') or reply_tokens)
+            reply = [tokens[i % len(tokens)] for i in range(count)]
+
+            time.sleep(prompt_tokens / prefill_rate)
+            prefill_ns = int((time.perf_counter() - started) * 1e9)
+
+            def chunk(content, done, **extra):
+                return dict(model=body.get('model'), created_at=datetime.now(timezone.utc).isoformat(),
+                            message={'role': 'assistant', 'content': content}, done=done, **extra)
+
+            def final(eval_started):
+                eval_ns = int((time.perf_counter() - eval_started) * 1e9)
+                return dict(done_reason='stop', total_duration=prefill_ns + eval_ns, load_duration=0,
+                            prompt_eval_count=prompt_tokens, prompt_eval_duration=prefill_ns,
+                            eval_count=count, eval_duration=eval_ns)
+
+            eval_started = time.perf_counter()
+            if not body.get('stream', True):
+                time.sleep(count / token_rate)
+                return self._send_json(chunk(''.join(reply), True, **final(eval_started)))
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            try:
+                for token in reply:
+                    time.sleep(1 / token_rate)
+                    self._write_chunk(chunk(token, False))
+                self._write_chunk(chunk('', True, **final(eval_started)))
+                self.wfile.write(b'0\r\n\r\n')
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+        def _write_chunk(self, payload):
+            data = json.dumps(payload).encode('utf-8') + b'\n'
+            self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+            self.wfile.flush()
+
+    return OllamaHandler
+
+
+def serve(ready=None, page_hosts=4, page_latency=0.0, token_rate=DEFAULT_TOKEN_RATE,
+          prefill_rate=DEFAULT_PREFILL_RATE, reply_tokens=DEFAULT_REPLY_TOKENS, port=0):
+    """
+    Runs the fixture web and the stub Ollama until the process ends. The URLs are
+    sent through the ready queue, or printed when there is none.
+    """
+    site = FixtureWeb()
+    handler = web_handler(site, page_latency)
+    web_servers = [ThreadingHTTPServer(('127.0.0.1', port + i if port else 0), handler)
+                   for i in range(max(1, page_hosts))]
+    site.ports = [server.server_address[1] for server in web_servers]
+    ollama = ThreadingHTTPServer(('127.0.0.1', port + len(web_servers) if port else 0),
+                                 ollama_handler(token_rate, prefill_rate, reply_tokens))
+
+    for server in web_servers + [ollama]:
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    urls = {
+        'search_url': f'http://127.0.0.1:{site.ports[0]}/search',
+        'ollama_host': f'http://127.0.0.1:{ollama.server_address[1]}',
+    }
+    if ready is None:
+        print(f"SEARCH_URL={urls['search_url']}")
+        print(f"OLLAMA_HOST={urls['ollama_host']}")
+    else:
+        ready.put(urls)
+    threading.Event().wait()
+
+
+@contextmanager
+def stub_servers(**options):
+    """
+    Runs the stub servers in a child process, so they add nothing to the
+    caller's memory or CPU figures. Yields {'search_url': ..., 'ollama_host': ...}.
+    """
+    ready = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(ready,), kwargs=options, daemon=True)
+    process.start()
+    try:
+        yield ready.get(timeout=30)
+    finally:
+        process.terminate()
+        process.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=0, help='first port to use (default: any free ports)')
+    parser.add_argument('--page-hosts', type=int, default=4, help='ports the fixture pages are spread over')
+    parser.add_argument('--page-latency', type=float, default=0.0, help='seconds added to every page fetch')
+    parser.add_argument('--token-rate', type=float, default=DEFAULT_TOKEN_RATE, help='generated tokens per second')
+    parser.add_argument('--prefill-rate', type=float, default=DEFAULT_PREFILL_RATE, help='prompt tokens per second')
+    parser.add_argument('--reply-tokens', type=int, default=DEFAULT_REPLY_TOKENS, help='tokens per answer')
+    args = parser.parse_args()
+    serve(page_hosts=args.page_hosts, page_latency=args.page_latency, token_rate=args.token_rate,
+          prefill_rate=args.prefill_rate, reply_tokens=args.reply_tokens, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
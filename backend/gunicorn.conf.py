@@ -0,0 +1,42 @@
+# gunicorn.conf.py
+"""
+Production server settings. From backend/:
+
+    gunicorn -c gunicorn.conf.py app:app                                        # Flask
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker app_async:app   # ASGI
+
+The app is imported and the models loaded once in the master process; the
+workers forked from it share that memory copy-on-write. Each worker then
+starts its own CPU and browser pools.
+"""
+import gc
+import os
+import modules  # Loads backend/.env before anything reads the environment
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('FLASK_PORT', 5001)}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+# Threads per worker for the Flask app; ignored by the uvicorn worker, which runs one event loop
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 8))
+# Long enough for a queued LLM generation (LLM_QUEUE_TIMEOUT) plus the answer itself
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+graceful_timeout = 30
+keepalive = 5
+preload_app = True
+
+# Split the cores between the workers' CPU pools instead of giving each worker all of them
+os.environ.setdefault('CPU_POOL_WORKERS', str(max(1, (os.cpu_count() or 1) // workers)))
+
+
+def when_ready(server):
+    # Runs in the master after the app is imported and before any worker is forked
+    from modules.startup import load_models
+    load_models()
+    # Move everything loaded so far out of the collector's reach, so collections
+    # in the workers don't write to (and copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from modules.startup import start_worker
+    start_worker()
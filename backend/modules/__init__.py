@@ -0,0 +1,11 @@
+# Settings are read from the environment when each module is imported;
+# backend/.env (see .env.example) fills in whatever the environment doesn't set.
+import os
+
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    load_dotenv = None
+
+if load_dotenv is not None:
+    load_dotenv(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.env'))
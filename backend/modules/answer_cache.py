@@ -0,0 +1,167 @@
+# answer_cache.py
+import os
+import re
+import json
+import hashlib
+import threading
+import time
+from .page_cache import CACHE_DIR
+from .summarization import MODEL, history_context
+from .metrics import register_stats
+from .sqlite_db import ThreadLocalConnection
+
+ANSWER_CACHE_PATH = os.getenv('ANSWER_CACHE_PATH', os.path.join(CACHE_DIR, 'answers.sqlite3'))
+# How long an answer is reused for the same query without looking at the web again
+ANSWER_CACHE_QUERY_TTL = int(os.getenv('ANSWER_CACHE_QUERY_TTL', 600))
+# How long an answer is reused when the query and the filtered evidence are identical
+ANSWER_CACHE_TTL = int(os.getenv('ANSWER_CACHE_TTL', 6 * 3600))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv('ANSWER_CACHE_MAX_ENTRIES', 2000))
+
+
+def normalize_query(query):
+    """Lowercases, collapses whitespace and drops trailing punctuation."""
+    return re.sub(r'[\s?!.]+$', '', ' '.join(query.lower().split()))
+
+
+def _digest(value):
+    return hashlib.sha256(json.dumps(value).encode('utf-8')).hexdigest()
+
+
+def context_key(conversation_history=None):
+    """The model plus the part of the conversation history that actually ends up in the prompt."""
+    return _digest([MODEL, _digest(history_context(conversation_history))])
+
+
+def query_key(query, conversation_history=None):
+    """Identifies a question: the normalized query in its context."""
+    return _digest([normalize_query(query), context_key(conversation_history)])
+
+
+def answer_key(query, conversation_history, evidence):
+    """query_key plus a fingerprint of the filtered web evidence."""
+    evidence_hash = hashlib.sha256(evidence.encode('utf-8')).hexdigest()
+    return _digest([query_key(query, conversation_history), evidence_hash])
+
+
+def is_cacheable(result, evidence):
+    """
+    Whether a pipeline result may be reused: error responses (no sources),
+    empty answers and answers written without any web evidence are not.
+    """
+    return bool(result.get('sources') and (result.get('summary') or '').strip() and (evidence or '').strip())
+
+
+class AnswerCache:
+    """
+    SQLite-backed cache of final pipeline results.
+
+    lookup() is the fast path: a recent answer to the same question is returned
+    before any search or scraping happens. get() matches on the filtered evidence
+    too, so an identical prompt never reaches the LLM twice within ANSWER_CACHE_TTL.
+    The table is capped at max_entries with LRU eviction.
+    """
+
+    def __init__(self, path=ANSWER_CACHE_PATH, ttl=ANSWER_CACHE_TTL, query_ttl=ANSWER_CACHE_QUERY_TTL,
+                 max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.query_ttl = min(query_ttl, ttl)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self.query_hits = 0
+        self.evidence_hits = 0
+        self.misses = 0
+        self._connect = ThreadLocalConnection(path)
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                query_key TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS answers_query_key ON answers (query_key, created_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS answers_last_access ON answers (last_access)')
+
+    def _hit(self, key, result):
+        self._connect().execute('UPDATE answers SET last_access = ? WHERE key = ?', (time.time(), key))
+        return json.loads(result)
+
+    def lookup(self, query, conversation_history=None):
+        """Returns the newest answer to this question from the last query_ttl seconds, or None."""
+        now = time.time()
+        row = self._connect().execute(
+            'SELECT key, result FROM answers WHERE query_key = ? AND created_at > ? AND expires_at > ? '
+            'ORDER BY created_at DESC LIMIT 1',
+            (query_key(query, conversation_history), now - self.query_ttl, now)
+        ).fetchone()
+        if row is None:
+            # Not counted as a miss yet, get() may still match on the evidence
+            return None
+        with self._lock:
+            self.query_hits += 1
+        return self._hit(*row)
+
+    def get(self, query, conversation_history, evidence):
+        """Returns the answer generated from exactly this evidence, or None."""
+        key = answer_key(query, conversation_history, evidence)
+        row = self._connect().execute(
+            'SELECT key, result FROM answers WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.evidence_hits += 1
+        return self._hit(*row)
+
+    def put(self, query, conversation_history, evidence, result):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO answers (key, query_key, result, created_at, expires_at, last_access) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (answer_key(query, conversation_history, evidence), query_key(query, conversation_history),
+             json.dumps(result), now, now + self.ttl, now)
+        )
+        self._evict(now)
+
+    def _evict(self, now):
+        conn = self._connect()
+        conn.execute('DELETE FROM answers WHERE expires_at <= ?', (now,))
+        # Drop least recently used answers beyond the cap
+        conn.execute(
+            'DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_access DESC LIMIT -1 OFFSET ?)',
+            (self.max_entries,)
+        )
+
+    def stats(self):
+        entries = self._connect().execute('SELECT COUNT(*) FROM answers').fetchone()[0]
+        with self._lock:
+            lookups = self.query_hits + self.evidence_hits + self.misses
+            return {
+                'query_hits': self.query_hits,
+                'evidence_hits': self.evidence_hits,
+                'misses': self.misses,
+                'hit_rate': (self.query_hits + self.evidence_hits) / lookups if lookups else 0.0,
+                'entries': entries,
+                'max_entries': self.max_entries,
+            }
+
+
+_answer_cache = None
+_answer_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    """Returns the process-wide answer cache."""
+    global _answer_cache
+    if _answer_cache is None:
+        with _answer_cache_lock:
+            if _answer_cache is None:
+                _answer_cache = AnswerCache()
+                register_stats('answer_cache', _answer_cache.stats)
+    return _answer_cache
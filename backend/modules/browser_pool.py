@@ -0,0 +1,185 @@
+# browser_pool.py
+import os
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+BROWSER_POOL_SIZE = int(os.getenv('BROWSER_POOL_SIZE', 2))
+BROWSER_MAX_USES = int(os.getenv('BROWSER_MAX_USES', 50))
+BROWSER_ACQUIRE_TIMEOUT = float(os.getenv('BROWSER_ACQUIRE_TIMEOUT', 30))
+BROWSER_PAGE_LOAD_TIMEOUT = float(os.getenv('BROWSER_PAGE_LOAD_TIMEOUT', 15))
+# Selenium search fallback; when off, Selenium and webdriver_manager are never imported
+BROWSER_SEARCH_ENABLED = os.getenv('BROWSER_SEARCH_ENABLED', 'true').lower() == 'true'
+# Launch the headless browsers at startup instead of on the first Selenium search
+BROWSER_POOL_PRELAUNCH = os.getenv('BROWSER_POOL_PRELAUNCH', 'false').lower() == 'true'
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def resolve_driver_path():
+    """Resolves (and downloads if needed) the chromedriver binary once per process."""
+    global _driver_path
+    if _driver_path is None:
+        with _driver_path_lock:
+            if _driver_path is None:
+                from webdriver_manager.chrome import ChromeDriverManager
+                _driver_path = ChromeDriverManager().install()
+    return _driver_path
+
+
+def create_driver():
+    """Launches a new headless Chrome."""
+    # Imported here so servers that never search with a browser don't load Selenium
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.add_argument("--headless")  # Run in headless mode
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument(f"--user-agent={USER_AGENT}")
+
+    driver = webdriver.Chrome(service=Service(resolve_driver_path()), options=chrome_options)
+    driver.set_page_load_timeout(BROWSER_PAGE_LOAD_TIMEOUT)
+    return driver
+
+
+class _PooledDriver:
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+
+
+class BrowserPool:
+    """
+    Keeps up to `size` headless Chrome drivers alive between searches.
+
+    Drivers are reset (cookies cleared, blank page) after each use, recycled
+    after `max_uses` sessions, and replaced if they crash or raise.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, max_uses=BROWSER_MAX_USES):
+        self.size = max(1, size)
+        self.max_uses = max(1, max_uses)
+        # Idle drivers, most recently used last; guarded by _cond, which is
+        # notified whenever a driver is returned or a slot frees up
+        self._idle = []
+        self._cond = threading.Condition()
+        self._created = 0
+        self._closed = False
+
+    def warm(self):
+        """Pre-launches drivers until the pool is full."""
+        while True:
+            with self._cond:
+                if self._closed or self._created >= self.size:
+                    return
+                self._created += 1
+            try:
+                pooled = _PooledDriver(create_driver())
+            except Exception as e:
+                self._free_slot()
+                logger.warning("Could not pre-launch browser: %s", e)
+                return
+            self._put_idle(pooled)
+
+    def warm_async(self):
+        threading.Thread(target=self.warm, name='browser-pool-warm', daemon=True).start()
+
+    def _acquire(self, timeout):
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                # Pool is at capacity, wait for a driver to be returned or retired
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No browser became free within {timeout}s")
+                self._cond.wait(remaining)
+
+        try:
+            return _PooledDriver(create_driver())
+        except Exception:
+            self._free_slot()
+            raise
+
+    def _put_idle(self, pooled):
+        with self._cond:
+            self._idle.append(pooled)
+            self._cond.notify()
+
+    def _free_slot(self):
+        with self._cond:
+            self._created -= 1
+            # A waiter can launch a replacement
+            self._cond.notify()
+
+    def _discard(self, pooled):
+        self._free_slot()
+        try:
+            pooled.driver.quit()
+        except Exception:
+            pass
+
+    def _release(self, pooled):
+        pooled.uses += 1
+        if self._closed or pooled.uses >= self.max_uses:
+            self._discard(pooled)
+            return
+        try:
+            # Reset state so the next search starts clean
+            pooled.driver.delete_all_cookies()
+            pooled.driver.get('about:blank')
+        except Exception:
+            self._discard(pooled)
+            return
+        self._put_idle(pooled)
+
+    @contextmanager
+    def session(self, timeout=BROWSER_ACQUIRE_TIMEOUT):
+        """
+        Yields a ready driver. A driver that raised is assumed broken and quit.
+        """
+        pooled = self._acquire(timeout)
+        try:
+            yield pooled.driver
+        except Exception:
+            self._discard(pooled)
+            raise
+        else:
+            self._release(pooled)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._discard(pooled)
+
+
+_browser_pool = None
+_browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """Returns the process-wide browser pool, pre-launching its drivers on first use."""
+    global _browser_pool
+    if _browser_pool is None:
+        with _browser_pool_lock:
+            if _browser_pool is None:
+                _browser_pool = BrowserPool()
+                _browser_pool.warm_async()
+                atexit.register(_browser_pool.close)
+    return _browser_pool
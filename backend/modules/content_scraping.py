@@ -1,85 +1,554 @@
 # content_scraping.py
-import requests
-from bs4 import BeautifulSoup
+import os
+import asyncio
+import logging
+import httpx
 import trafilatura
 import time
 import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from urllib.parse import urlparse
+from .page_cache import get_page_cache, ttl_from_headers
+from .local_index import get_local_index
+from .domain_health import get_domain_health, DOMAIN_MIN_TIMEOUT
+from . import http_client, cpu_pool
+from .http_client import ACCEPT_ENCODING, UnsupportedContentType
+from .metrics import Counter, timed
 
-def scrape_content(urls):
+logger = logging.getLogger(__name__)
+
+PAGE_FETCHES = Counter('page_fetch_total', 'Page lookups by outcome', ['result'])
+
+# Pages scraped per query (the top search results), and seconds allowed per page
+MAX_SCRAPE_URLS = int(os.getenv('MAX_SCRAPE_URLS', 10))
+SCRAPE_TIMEOUT = float(os.getenv('SCRAPE_TIMEOUT', 15))
+
+# Parallel scraping settings
+SCRAPE_WORKERS = int(os.getenv('SCRAPE_WORKERS', 8))
+SCRAPE_PER_HOST_LIMIT = int(os.getenv('SCRAPE_PER_HOST_LIMIT', 2))
+SCRAPE_HOST_DELAY = float(os.getenv('SCRAPE_HOST_DELAY', 1.0))
+SCRAPE_TIME_BUDGET = float(os.getenv('SCRAPE_TIME_BUDGET', 20))
+# Pages are cut off after this much HTML; the main content is nearly always near the top
+SCRAPE_MAX_PAGE_MB = float(os.getenv('SCRAPE_MAX_PAGE_MB', 2))
+SCRAPE_MAX_PAGE_BYTES = int(SCRAPE_MAX_PAGE_MB * 1024 * 1024)
+
+# How long to remember pages that had no usable text or weren't HTML; 0 doesn't remember them
+NEGATIVE_TTL = int(os.getenv('PAGE_CACHE_NEGATIVE_TTL', 900))
+
+# Better headers to avoid blocking
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Cache-Control': 'max-age=0'
+}
+
+
+class HostLimiter:
     """
-    Scrapes the main content from a list of URLs with anti-blocking measures.
+    Per-host politeness: caps concurrent fetches to one host and spaces out
+    consecutive requests to it, instead of sleeping between every URL.
+    """
+
+    def __init__(self, max_concurrent=SCRAPE_PER_HOST_LIMIT, delay=SCRAPE_HOST_DELAY):
+        self.max_concurrent = max(1, max_concurrent)
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._next_start = {}
+
+    def acquire(self, host, deadline=None):
+        """Blocks until a slot for host is free. Returns False if the deadline passes first."""
+        with self._lock:
+            slot = self._slots.setdefault(host, threading.BoundedSemaphore(self.max_concurrent))
+
+        timeout = None if deadline is None else max(0, deadline - time.monotonic())
+        if not slot.acquire(timeout=timeout):
+            return False
+
+        # Reserve the next start time for this host (random jitter like a human)
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.delay * random.uniform(0.5, 1.5)
+
+        if deadline is not None and start >= deadline:
+            slot.release()
+            return False
+        if start > now:
+            time.sleep(start - now)
+        return True
+
+    def release(self, host):
+        with self._lock:
+            slot = self._slots.get(host)
+        if slot:
+            slot.release()
+
+
+# Fallback extraction, tried in order: main content areas, then all paragraphs
+UNWANTED_ELEMENTS_XPATH = '//script|//style|//noscript|//nav|//header|//footer|//aside'
+CONTENT_AREA_XPATHS = [
+    '//article', '//main',
+    *(f'//*[contains(concat(" ", normalize-space(@class), " "), " {name} ")]'
+      for name in ('content', 'post-content', 'entry-content', 'article-body')),
+    '//div[@role="main"]',
+]
+
+
+def _element_text(element):
+    return ' '.join(element.text_content().split())
+
+
+def extract_text(html):
+    """
+    Extracts the main text from a page's HTML. Returns None if nothing useful was found.
+    The page is parsed once with lxml and the tree shared by both extractors.
+    """
+    if not html:
+        return None
+    tree = trafilatura.load_html(html)
+    if tree is None:
+        return None
+
+    # Try trafilatura first (best at isolating article content); it works on a copy of the tree
+    main_content = trafilatura.extract(tree)
+    if main_content and len(main_content) > 100:
+        return main_content
+
+    # Secondary extraction straight from the tree
+    for element in tree.xpath(UNWANTED_ELEMENTS_XPATH):
+        element.drop_tree()
+
+    extracted_text = ""
+    for xpath in CONTENT_AREA_XPATHS:
+        elements = tree.xpath(xpath)
+        if elements:
+            extracted_text = ' '.join(_element_text(element) for element in elements)
+            break
+
+    if not extracted_text:
+        # Final fallback - get all paragraph text
+        extracted_text = ' '.join(_element_text(p) for p in tree.xpath('//p'))
+
+    if extracted_text and len(extracted_text) > 100:
+        return extracted_text
+    return None
+
+
+def _extract(url, html):
+    # Extraction is CPU-bound, it runs in the CPU pool instead of holding the GIL here.
+    # Raises TimeoutError for pages that take too long; they are skipped, not cached as empty
+    with timed('extract'):
+        return cpu_pool.run(extract_text, html)
+
+
+async def _extract_async(url, html):
+    with timed('extract'):
+        return await cpu_pool.run_async(extract_text, html)
+
+
+def _extraction_timed_out(url, error):
+    PAGE_FETCHES.inc(result='extract_timeout')
+    logger.warning("Giving up on extracting %s: %s", url, error)
+
+
+def _request_headers(entry):
+    headers = dict(HEADERS)
+    if entry:
+        # Conditional revalidation of a stale entry
+        if entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        headers.pop('Cache-Control', None)
+    return headers
+
+
+def _store_page(cache, url, html, text, response_headers):
+    # Pages without useful text are cached briefly too, so we don't keep retrying them
+    ttl = ttl_from_headers(response_headers) if text else NEGATIVE_TTL
+    if ttl <= 0:
+        # The server asked us not to keep it; drop any older copy too
+        cache.delete(url)
+        return
+    cache.put(url, html, text,
+              etag=response_headers.get('ETag'),
+              last_modified=response_headers.get('Last-Modified'),
+              ttl=ttl)
+
+
+def _index_page(url, text):
+    # Every extracted page feeds the local index; failing to index must not lose the page
+    index = get_local_index()
+    if index is None or not text:
+        return
+    try:
+        with timed('local_index_add'):
+            index.add_document(url, text)
+    except Exception as e:
+        logger.warning("Could not index %s: %s", url, e)
+
+
+def _record_fetch(url, outcome, latency=None, status=None, size=0, chars=0, error=None):
+    # Feeds the domain health registry, which ranks, times out and skips hosts on later queries
+    health = get_domain_health()
+    if health is None:
+        return
+    try:
+        health.record(url, outcome, latency, status, size, chars, error)
+    except Exception as e:
+        logger.warning("Could not record fetch of %s: %s", url, e)
+
+
+def _record_failure(url, error, timeout, latency):
+    if isinstance(error, httpx.HTTPStatusError):
+        _record_fetch(url, 'http_error', latency, error.response.status_code, error=str(error))
+    elif isinstance(error, httpx.TimeoutException):
+        # A timeout cut short by the scrape budget says nothing about the host
+        if timeout >= DOMAIN_MIN_TIMEOUT:
+            _record_fetch(url, 'timeout', latency, error=f"timed out after {timeout:.1f}s")
+    elif isinstance(error, httpx.HTTPError):
+        _record_fetch(url, 'error', latency, error=str(error) or type(error).__name__)
+
+
+def _reject_page(cache, url, error):
+    # Not HTML (PDFs, images, feeds...); remember that so we don't fetch it again soon
+    PAGE_FETCHES.inc(result='rejected')
+    logger.debug("Skipping %s: %s", url, error)
+    if cache and NEGATIVE_TTL > 0:
+        cache.put(url, '', None, ttl=NEGATIVE_TTL)
+
+
+def _lookup(url, use_cache=True):
+    """
+    (cache, entry, hit) for url. hit is True when the entry is fresh and can be
+    served without touching the network (or the per-host limiter).
+    """
+    cache = get_page_cache() if use_cache else None
+    entry = cache.get(url) if cache else None
+    hit = bool(entry) and entry['expires_at'] > time.time()
+    if hit:
+        PAGE_FETCHES.inc(result='cache_hit')
+    return cache, entry, hit
+
+
+def extract_from_url(url, timeout=SCRAPE_TIMEOUT, use_cache=True):
+    """
+    Returns the main text of a single URL, served from the page cache when fresh.
+    Stale entries are revalidated with ETag/Last-Modified before re-downloading.
     """
-    print(f"Scraping content from {len(urls)} URLs...")
-    
-    all_content = []
-    
-    # Better headers to avoid blocking
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'en-US,en;q=0.5',
-        'Accept-Encoding': 'gzip, deflate',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-        'Cache-Control': 'max-age=0'
-    }
-    
-    for i, url in enumerate(urls):
+    cache, entry, hit = _lookup(url, use_cache)
+    if hit:
+        return entry['text']
+    return _fetch_page(url, cache, entry, timeout)
+
+
+def _fetch_page(url, cache, entry, timeout):
+    started = time.monotonic()
+    try:
+        with timed('fetch'):
+            response = http_client.get(url, headers=_request_headers(entry), timeout=timeout,
+                                       max_bytes=SCRAPE_MAX_PAGE_BYTES, html_only=True, truncate=True)
+            html = response.text
+        latency = time.monotonic() - started
+        if entry and response.status_code == 304:
+            PAGE_FETCHES.inc(result='revalidated')
+            cache.refresh(url, ttl_from_headers(response.headers))
+            _record_fetch(url, 'ok', latency, 304, chars=len(entry['text'] or ''))
+            return entry['text']
+        response.raise_for_status()
+    except UnsupportedContentType as e:
+        _reject_page(cache, url, e)
+        _record_fetch(url, 'rejected', time.monotonic() - started)
+        return None
+    except Exception as e:
+        PAGE_FETCHES.inc(result='error')
+        logger.debug("Fetching %s failed: %s", url, e)
+        _record_failure(url, e, timeout, time.monotonic() - started)
+        raise
+    PAGE_FETCHES.inc(result='downloaded')
+    if response.extensions.get('truncated'):
+        logger.debug("%s cut off at %d bytes", url, SCRAPE_MAX_PAGE_BYTES)
+
+    try:
+        text = _extract(url, html)
+    except TimeoutError as e:
+        # Says nothing about the page itself, so no negative cache entry
+        _extraction_timed_out(url, e)
+        return None
+    _record_fetch(url, 'ok', latency, response.status_code, len(response.content), len(text or ''))
+
+    if cache:
+        _store_page(cache, url, html, text, response.headers)
+    _index_page(url, text)
+    return text
+
+
+def _log_scrape_failure(url, error):
+    # The page is skipped either way; the domain health registry has the per-host picture
+    if isinstance(error, httpx.TimeoutException):
+        logger.info("Timed out fetching %s", url)
+    elif isinstance(error, httpx.HTTPError):
+        logger.info("Could not fetch %s: %s", url, error)
+    else:
+        logger.warning("Scraping %s failed: %s", url, error, exc_info=True)
+
+
+def _plan_fetches(urls):
+    """
+    (index, timeout) for each URL to fetch: hosts that reliably yield content
+    first, hosts with an open circuit skipped, at most MAX_SCRAPE_URLS.
+    """
+    health = get_domain_health()
+    plan = None
+    if health is not None:
         try:
-            # Add random delay to avoid rate limiting
-            if i > 0:
-                time.sleep(random.uniform(0.5, 1.5))
-            
-            # Try trafilatura first (often bypasses blocks better)
-            downloaded = trafilatura.fetch_url(url, config={'DEFAULT': {'USER_AGENT': headers['User-Agent']}})
-            main_content = trafilatura.extract(downloaded)
-            
-            if main_content and len(main_content) > 100:
-                all_content.append(main_content)
-            else:
-                # Fallback to requests with better headers
-                response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
-                response.raise_for_status()
-                
-                # Use BeautifulSoup as secondary extraction
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Remove unwanted elements
-                for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-                    element.decompose()
-                
-                # Extract text from main content areas
-                content_selectors = [
-                    'article', 'main', '.content', '.post-content', 
-                    '.entry-content', '.article-body', 'div[role="main"]'
-                ]
-                
-                extracted_text = ""
-                for selector in content_selectors:
-                    elements = soup.select(selector)
-                    if elements:
-                        extracted_text = ' '.join([elem.get_text(strip=True) for elem in elements])
-                        break
-                
-                if not extracted_text:
-                    # Final fallback - get all paragraph text
-                    paragraphs = soup.find_all('p')
-                    extracted_text = ' '.join([p.get_text(strip=True) for p in paragraphs])
-                
-                if extracted_text and len(extracted_text) > 100:
-                    all_content.append(extracted_text)
-                
-        except requests.exceptions.Timeout:
-            continue  # Skip timeouts silently
-        except requests.exceptions.HTTPError as e:
-            continue  # Skip HTTP errors silently
+            # The limit keeps probes from being claimed for URLs that won't be fetched
+            plan = health.plan(urls, SCRAPE_TIMEOUT, limit=MAX_SCRAPE_URLS)
         except Exception as e:
-            continue  # Skip other errors silently
-            
+            logger.warning("Domain health lookup failed: %s", e)
+    if plan is None:
+        plan = [(i, SCRAPE_TIMEOUT) for i in range(len(urls))]
+    return plan[:MAX_SCRAPE_URLS]
+
+
+def _scrape_one(url, timeout, limiter, deadline):
+    try:
+        cache, entry, hit = _lookup(url)
+    except Exception as e:
+        _log_scrape_failure(url, e)
+        return None
+    if hit:
+        # Cached pages cost the host nothing, so they skip the politeness limits
+        return entry['text']
+
+    host = urlparse(url).netloc.lower()
+    if not limiter.acquire(host, deadline):
+        return None
+    try:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        return _fetch_page(url, cache, entry, min(timeout, remaining))
+    except Exception as e:
+        _log_scrape_failure(url, e)
+        return None
+    finally:
+        limiter.release(host)
+
+
+def iter_scraped(urls, max_workers=SCRAPE_WORKERS, per_host_limit=SCRAPE_PER_HOST_LIMIT,
+                 host_delay=SCRAPE_HOST_DELAY, time_budget=SCRAPE_TIME_BUDGET):
+    """
+    Fetches URLs in parallel and yields (index, text) as each one finishes.
+    text is None when a URL failed or had no useful content. Stops once
+    time_budget (seconds) runs out. URLs are fetched in the order and with the
+    timeouts planned by the domain health registry, at most MAX_SCRAPE_URLS.
+    """
+    plan = _plan_fetches(urls) if urls else []
+    if not plan:
+        return
+
+    limiter = HostLimiter(per_host_limit, host_delay)
+    deadline = time.monotonic() + time_budget
+
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(plan))))
+    pending = len(plan)
+    try:
+        futures = {executor.submit(_scrape_one, urls[i], timeout, limiter, deadline): i for i, timeout in plan}
+        for future in as_completed(futures, timeout=time_budget):
+            pending -= 1
+            yield futures[future], future.result()
+    except FuturesTimeoutError:
+        logger.info("Scrape time budget of %ss reached, %d URLs still pending", time_budget, pending)
+    finally:
+        # Don't wait for stragglers past the budget
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def scrape_content(urls, max_workers=SCRAPE_WORKERS, per_host_limit=SCRAPE_PER_HOST_LIMIT,
+                   host_delay=SCRAPE_HOST_DELAY, time_budget=SCRAPE_TIME_BUDGET):
+    """
+    Scrapes the main content from a list of URLs with anti-blocking measures.
+
+    URLs are fetched in parallel by a bounded worker pool, with per-host
+    concurrency and delay limits. When time_budget (seconds) runs out, whatever
+    has arrived so far is returned. Content always keeps the original URL order.
+    """
+    logger.info("Scraping content from %d URLs...", len(urls))
+
+    results = [None] * len(urls)
+    for i, text in iter_scraped(urls, max_workers, per_host_limit, host_delay, time_budget):
+        results[i] = text
+
+    # Keep the original URL order so downstream filtering stays deterministic
+    all_content = [text for text in results if text]
+
     combined_content = "\n\n".join(all_content)
-    print(f"Content scraped: {len(combined_content)} characters from {len(all_content)} sources")
+    logger.info("Content scraped: %d characters from %d sources", len(combined_content), len(all_content))
     return combined_content
 
+
+# Async equivalents for the ASGI pipeline (app_async.py)
+
+class AsyncHostLimiter:
+    """
+    asyncio version of HostLimiter for use on a single event loop.
+    """
+
+    def __init__(self, max_concurrent=SCRAPE_PER_HOST_LIMIT, delay=SCRAPE_HOST_DELAY):
+        self.max_concurrent = max(1, max_concurrent)
+        self.delay = delay
+        self._slots = {}
+        self._next_start = {}
+
+    async def acquire(self, host, deadline):
+        slot = self._slots.setdefault(host, asyncio.Semaphore(self.max_concurrent))
+        try:
+            await asyncio.wait_for(slot.acquire(), timeout=max(0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            return False
+
+        now = time.monotonic()
+        start = max(now, self._next_start.get(host, now))
+        self._next_start[host] = start + self.delay * random.uniform(0.5, 1.5)
+
+        if start >= deadline:
+            slot.release()
+            return False
+        if start > now:
+            await asyncio.sleep(start - now)
+        return True
+
+    def release(self, host):
+        self._slots[host].release()
+
+
+
+async def extract_from_url_async(client, url, timeout=SCRAPE_TIMEOUT, use_cache=True):
+    """
+    Async version of extract_from_url using a client from http_client.new_async_client.
+    Extraction runs in the CPU pool so it doesn't block the event loop.
+    """
+    cache, entry, hit = await asyncio.to_thread(_lookup, url, use_cache)
+    if hit:
+        return entry['text']
+    return await _fetch_page_async(client, url, cache, entry, timeout)
+
+
+async def _fetch_page_async(client, url, cache, entry, timeout):
+    started = time.monotonic()
+    try:
+        with timed('fetch'):
+            response = await http_client.get_async(client, url, headers=_request_headers(entry), timeout=timeout,
+                                                   max_bytes=SCRAPE_MAX_PAGE_BYTES, html_only=True, truncate=True)
+        latency = time.monotonic() - started
+        if entry and response.status_code == 304:
+            PAGE_FETCHES.inc(result='revalidated')
+            await asyncio.to_thread(cache.refresh, url, ttl_from_headers(response.headers))
+            await asyncio.to_thread(_record_fetch, url, 'ok', latency, 304, 0, len(entry['text'] or ''))
+            return entry['text']
+        response.raise_for_status()
+    except UnsupportedContentType as e:
+        await asyncio.to_thread(_reject_page, cache, url, e)
+        await asyncio.to_thread(_record_fetch, url, 'rejected', time.monotonic() - started)
+        return None
+    except Exception as e:
+        PAGE_FETCHES.inc(result='error')
+        logger.debug("Fetching %s failed: %s", url, e)
+        await asyncio.to_thread(_record_failure, url, e, timeout, time.monotonic() - started)
+        raise
+    PAGE_FETCHES.inc(result='downloaded')
+    if response.extensions.get('truncated'):
+        logger.debug("%s cut off at %d bytes", url, SCRAPE_MAX_PAGE_BYTES)
+
+    html = response.text
+    try:
+        text = await _extract_async(url, html)
+    except TimeoutError as e:
+        _extraction_timed_out(url, e)
+        return None
+    await asyncio.to_thread(_record_fetch, url, 'ok', latency, response.status_code, len(response.content),
+                            len(text or ''))
+
+    if cache:
+        await asyncio.to_thread(_store_page, cache, url, html, text, response.headers)
+    await asyncio.to_thread(_index_page, url, text)
+    return text
+
+
+async def iter_scraped_async(client, urls, max_workers=SCRAPE_WORKERS, per_host_limit=SCRAPE_PER_HOST_LIMIT,
+                             host_delay=SCRAPE_HOST_DELAY, time_budget=SCRAPE_TIME_BUDGET):
+    """
+    Async version of iter_scraped. Yields (index, text) as each URL finishes.
+    Pending fetches are cancelled when the budget runs out or the caller stops.
+    """
+    plan = await asyncio.to_thread(_plan_fetches, urls) if urls else []
+    if not plan:
+        return
+
+    limiter = AsyncHostLimiter(per_host_limit, host_delay)
+    workers = asyncio.Semaphore(max(1, max_workers))
+    deadline = time.monotonic() + time_budget
+
+    async def scrape_one(i, url, timeout):
+        try:
+            cache, entry, hit = await asyncio.to_thread(_lookup, url)
+        except Exception as e:
+            _log_scrape_failure(url, e)
+            return i, None
+        if hit:
+            # Cached pages cost the host nothing, so they skip the politeness limits
+            return i, entry['text']
+
+        host = urlparse(url).netloc.lower()
+        async with workers:
+            if not await limiter.acquire(host, deadline):
+                return i, None
+            try:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return i, None
+                return i, await _fetch_page_async(client, url, cache, entry, min(timeout, remaining))
+            except Exception as e:
+                _log_scrape_failure(url, e)
+                return i, None
+            finally:
+                limiter.release(host)
+
+    tasks = [asyncio.create_task(scrape_one(i, urls[i], timeout)) for i, timeout in plan]
+    pending = len(tasks)
+    try:
+        for next_done in asyncio.as_completed(tasks, timeout=time_budget):
+            result = await next_done
+            pending -= 1
+            yield result
+    except asyncio.TimeoutError:
+        logger.info("Scrape time budget of %ss reached, %d URLs still pending", time_budget, pending)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def scrape_content_async(client, urls, **kwargs):
+    """
+    Async version of scrape_content. Content keeps the original URL order.
+    """
+    logger.info("Scraping content from %d URLs...", len(urls))
+
+    results = [None] * len(urls)
+    async for i, text in iter_scraped_async(client, urls, **kwargs):
+        results[i] = text
+
+    all_content = [text for text in results if text]
+
+    combined_content = "\n\n".join(all_content)
+    logger.info("Content scraped: %d characters from %d sources", len(combined_content), len(all_content))
+    return combined_content
@@ -0,0 +1,276 @@
+# cpu_pool.py
+import os
+import atexit
+import signal
+import asyncio
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from .metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+# Worker processes for CPU-bound page extraction and sentence splitting; 0 runs them in the calling thread
+CPU_POOL_WORKERS = int(os.getenv('CPU_POOL_WORKERS', os.cpu_count() or 1))
+# Tasks allowed in flight; when full, callers run the task themselves instead of queueing
+CPU_POOL_QUEUE_SIZE = int(os.getenv('CPU_POOL_QUEUE_SIZE', 4 * max(1, CPU_POOL_WORKERS)))
+# How long a caller waits for a free queue slot before running the task itself
+CPU_POOL_SLOT_WAIT = float(os.getenv('CPU_POOL_SLOT_WAIT', 0.5))
+# Longest one task may run, counted from when a worker starts it (time spent queued doesn't count)
+CPU_POOL_TIMEOUT = float(os.getenv('CPU_POOL_TIMEOUT', 10))
+
+# How often run_async re-checks for a free queue slot
+SLOT_POLL_INTERVAL = 0.02
+
+WARMUP_HTML = ('<html><body><article><h1>Warm up</h1>'
+               + '<p>This paragraph only loads the extraction code. It is long enough to be kept.</p>' * 3
+               + '</article></body></html>')
+
+# Set in worker processes, which never offload again
+_in_worker = False
+
+
+def _init_worker():
+    """Loads the parsers and the sentence tokenizer once per worker, before its first task."""
+    global _in_worker
+    _in_worker = True
+    # Ctrl-C is handled by the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        # Imports the task modules too, so the first real task doesn't pay for them
+        from .content_scraping import extract_text
+        from .pre_filtering import split_sentences
+        extract_text(WARMUP_HTML)
+        split_sentences("Warm up. Done.")
+    except Exception as e:
+        logger.warning("CPU pool worker warm-up failed: %s", e)
+
+
+def _ready():
+    return os.getpid()
+
+
+class _Deadline(BaseException):
+    """
+    Raised by the worker's alarm. Not an Exception, so the task's own
+    `except Exception` handlers (trafilatura has several) can't swallow it.
+    """
+
+
+def _on_alarm(signum, frame):
+    raise _Deadline
+
+
+def _run_limited(fn, args, timeout):
+    """Runs fn(*args) in a worker, raising TimeoutError if it runs longer than timeout."""
+    if not hasattr(signal, 'setitimer'):
+        return fn(*args)
+    signal.signal(signal.SIGALRM, _on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        try:
+            return fn(*args)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except _Deadline:
+        raise TimeoutError(f"{fn.__name__} timed out after {timeout}s") from None
+
+
+class CPUPool:
+    """
+    A process pool for CPU-bound pure-Python work (HTML extraction, sentence
+    tokenization), so it runs on every core instead of holding the GIL on
+    request threads. Only strings and bytes should cross the boundary.
+
+    Workers are spawned fresh rather than forked from the threaded server and
+    are pre-warmed. At most queue_size tasks are in flight; past that, callers
+    wait up to slot_wait seconds for a slot and then run the task themselves
+    (counted as inline), so a burst never builds an unbounded backlog.
+    """
+
+    def __init__(self, workers=CPU_POOL_WORKERS, queue_size=CPU_POOL_QUEUE_SIZE, timeout=CPU_POOL_TIMEOUT,
+                 slot_wait=CPU_POOL_SLOT_WAIT):
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.timeout = timeout
+        self.slot_wait = slot_wait
+        # The worker enforces the timeout itself. The caller only gives up after the
+        # worst case of every task queued ahead of it timing out too, in case a
+        # worker is stuck somewhere the alarm can't interrupt
+        self.wait_timeout = timeout * (-(-self.queue_size // self.workers) + 1)
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.queue_size)
+        self._executor = None
+        self._warming = []
+        self.submitted = 0
+        self.inline = 0
+        self.timed_out = 0
+        self.restarts = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'),
+                                                     initializer=_init_worker)
+            return self._executor
+
+    def warm(self):
+        """Starts every worker in the background."""
+        executor = self._get_executor()
+        self._warming = [executor.submit(_ready) for _ in range(self.workers)]
+
+    def is_warm(self):
+        """Whether every worker has started and loaded its models."""
+        return all(future.done() and not future.cancelled() and future.exception() is None
+                   for future in self._warming)
+
+    def _restart(self, executor):
+        # A worker died (e.g. killed for memory); replace the whole pool
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+                self.restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+        logger.warning("CPU pool worker died, restarting the pool")
+
+    def _queue_full(self, fn):
+        with self._lock:
+            self.inline += 1
+        logger.debug("CPU pool queue full for %ss, running %s in the caller", self.slot_wait, fn.__name__)
+
+    async def _take_slot_async(self):
+        """Like self._slots.acquire(timeout=self.slot_wait), without blocking the event loop."""
+        deadline = asyncio.get_running_loop().time() + self.slot_wait
+        while not self._slots.acquire(blocking=False):
+            if asyncio.get_running_loop().time() >= deadline:
+                return False
+            await asyncio.sleep(SLOT_POLL_INTERVAL)
+        return True
+
+    def _submit(self, fn, args):
+        """
+        Returns (future, executor) for fn(*args), or (None, None) if the pool is
+        broken. The caller must hold a queue slot; it is released when the task ends.
+        """
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_run_limited, fn, args, self.timeout)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._restart(executor)
+            return None, None
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot stays taken until the worker is done, even if the caller gave up
+        future.add_done_callback(lambda _: self._slots.release())
+        with self._lock:
+            self.submitted += 1
+        return future, executor
+
+    def _timed_out(self, fn):
+        with self._lock:
+            self.timed_out += 1
+        logger.warning("%s took longer than %ss in the CPU pool", fn.__name__, self.timeout)
+        return TimeoutError(f"{fn.__name__} timed out after {self.timeout}s")
+
+    def run(self, fn, *args):
+        """
+        Runs fn(*args) in a worker and returns the result. fn must be a
+        module-level function. Raises TimeoutError when the task runs longer
+        than the pool timeout once a worker has picked it up.
+        """
+        if not self._slots.acquire(timeout=self.slot_wait):
+            self._queue_full(fn)
+            return fn(*args)
+        future, executor = self._submit(fn, args)
+        if future is None:
+            return fn(*args)
+        try:
+            return future.result(timeout=self.wait_timeout)
+        except (FuturesTimeoutError, TimeoutError):
+            raise self._timed_out(fn) from None
+        except BrokenProcessPool:
+            self._restart(executor)
+            return fn(*args)
+
+    async def run_async(self, fn, *args):
+        """Async version of run; waits without blocking the event loop."""
+        if not await self._take_slot_async():
+            self._queue_full(fn)
+            return await asyncio.to_thread(fn, *args)
+        future, executor = self._submit(fn, args)
+        if future is None:
+            return await asyncio.to_thread(fn, *args)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.wait_timeout)
+        except (asyncio.TimeoutError, TimeoutError):
+            raise self._timed_out(fn) from None
+        except BrokenProcessPool:
+            self._restart(executor)
+            return await asyncio.to_thread(fn, *args)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'submitted': self.submitted,
+                'inline': self.inline,
+                'timed_out': self.timed_out,
+                'restarts': self.restarts,
+            }
+
+
+_cpu_pool = None
+_cpu_pool_pid = None
+_cpu_pool_lock = threading.Lock()
+
+
+def get_cpu_pool():
+    """
+    Returns the process-wide CPU pool, or None when CPU_POOL_WORKERS is 0 or
+    when called inside a pool worker. A forked server worker gets its own pool.
+    """
+    global _cpu_pool, _cpu_pool_pid
+    if CPU_POOL_WORKERS <= 0 or _in_worker:
+        return None
+    if _cpu_pool is None or _cpu_pool_pid != os.getpid():
+        with _cpu_pool_lock:
+            if _cpu_pool is None or _cpu_pool_pid != os.getpid():
+                first = _cpu_pool is None
+                _cpu_pool = CPUPool()
+                _cpu_pool_pid = os.getpid()
+                _cpu_pool.warm()
+                atexit.register(_cpu_pool.close)
+                if first:
+                    register_stats('cpu_pool', lambda: _cpu_pool.stats())
+    return _cpu_pool
+
+
+def is_ready():
+    """Whether this process's CPU pool is warm (always, when the pool is off)."""
+    if CPU_POOL_WORKERS <= 0:
+        return True
+    return _cpu_pool is not None and _cpu_pool_pid == os.getpid() and _cpu_pool.is_warm()
+
+
+def run(fn, *args):
+    """Runs fn(*args) in the CPU pool, or in this thread when the pool is off."""
+    pool = get_cpu_pool()
+    return pool.run(fn, *args) if pool else fn(*args)
+
+
+async def run_async(fn, *args):
+    """Async version of run."""
+    pool = get_cpu_pool()
+    return await pool.run_async(fn, *args) if pool else await asyncio.to_thread(fn, *args)
@@ -0,0 +1,344 @@
+# domain_health.py
+import os
+import time
+import logging
+import sqlite3
+import threading
+from urllib.parse import urlparse
+from .page_cache import CACHE_DIR
+from .metrics import Counter, register_stats
+from .sqlite_db import ThreadLocalConnection
+
+logger = logging.getLogger(__name__)
+
+DOMAIN_FETCHES = Counter('domain_fetch_total', 'Page fetches by host health outcome', ['result'])
+
+DOMAIN_HEALTH_ENABLED = os.getenv('DOMAIN_HEALTH_ENABLED', 'true').lower() == 'true'
+DOMAIN_HEALTH_PATH = os.getenv('DOMAIN_HEALTH_PATH', os.path.join(CACHE_DIR, 'domains.sqlite3'))
+# Host failures in a row (timeouts, connection errors, 403/429/5xx) that open a host's circuit
+DOMAIN_FAILURE_THRESHOLD = int(os.getenv('DOMAIN_FAILURE_THRESHOLD', 3))
+# Seconds an open circuit skips the host; doubles each time it opens again, up to a day
+DOMAIN_BREAKER_COOLDOWN = float(os.getenv('DOMAIN_BREAKER_COOLDOWN', 600))
+DOMAIN_BREAKER_MAX_COOLDOWN = 24 * 3600
+# Shortest per-host timeout; shorter fetches (budget nearly spent) say nothing about the host
+DOMAIN_MIN_TIMEOUT = float(os.getenv('DOMAIN_MIN_TIMEOUT', 3))
+
+# Fetches a host needs before its record changes its rank or timeout
+MIN_SAMPLES = 3
+# Counts are halved past this many fetches, so old behaviour fades out
+WINDOW = 50
+MAX_HOSTS = 10000
+# Hosts that deliver text at least / at most this often move ahead / back
+GOOD_SCORE = 0.5
+POOR_SCORE = 0.2
+# Status codes that mean the host is blocking us or broken, not that the page is missing
+BLOCKING_STATUSES = {401, 403, 407, 429, 451}
+# Smoothing of the latency average and deviation (as for TCP retransmission timeouts)
+LATENCY_ALPHA = 0.125
+LATENCY_BETA = 0.25
+
+
+def host_of(url):
+    return urlparse(url).netloc.lower()
+
+
+def is_host_failure(outcome, status=None):
+    """Whether a fetch outcome counts against the host for its circuit breaker."""
+    if outcome in ('timeout', 'error'):
+        return True
+    return outcome == 'http_error' and status is not None and (status in BLOCKING_STATUSES or status >= 500)
+
+
+class DomainHealth:
+    """
+    Per-host record of scrape outcomes: success rate, latency, bytes and how
+    often pages yield usable text. Stored in SQLite, so it survives restarts
+    and is shared by worker processes.
+
+    It orders URLs before fetching (reliable hosts first, hosts that usually
+    fail last), gives each host a timeout fitted to its latency, and skips
+    hosts whose circuit is open after repeated failures. Once the cooldown
+    passes, one fetch is let through as a probe; success closes the circuit.
+    """
+
+    def __init__(self, path=DOMAIN_HEALTH_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.skipped = 0
+        self.probes = 0
+        self.opened = 0
+        self._writes = 0
+        self._connect = ThreadLocalConnection(path, sqlite3.Row)
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS domains (
+                host TEXT PRIMARY KEY,
+                attempts REAL NOT NULL DEFAULT 0,
+                successes REAL NOT NULL DEFAULT 0,
+                extracted REAL NOT NULL DEFAULT 0,
+                timeouts REAL NOT NULL DEFAULT 0,
+                bytes REAL NOT NULL DEFAULT 0,
+                chars REAL NOT NULL DEFAULT 0,
+                latency REAL,
+                latency_dev REAL,
+                consecutive_failures INTEGER NOT NULL DEFAULT 0,
+                open_until REAL NOT NULL DEFAULT 0,
+                trips INTEGER NOT NULL DEFAULT 0,
+                last_status INTEGER,
+                last_error TEXT,
+                updated_at REAL NOT NULL
+            )
+        """)
+
+    def _rows(self, hosts):
+        hosts = list(set(hosts))
+        if not hosts:
+            return {}
+        placeholders = ','.join('?' * len(hosts))
+        return {row['host']: row for row in self._connect().execute(
+            f'SELECT * FROM domains WHERE host IN ({placeholders})', hosts)}
+
+    @staticmethod
+    def _score(row):
+        # Chance that a fetch from this host gives usable text (smoothed toward 1/2 x 1/2)
+        fetched = (row['successes'] + 1) / (row['attempts'] + 2)
+        extracted = (row['extracted'] + 1) / (row['successes'] + 2)
+        return fetched * extracted
+
+    def _tier(self, row):
+        if row is None or row['attempts'] < MIN_SAMPLES:
+            return 1
+        score = self._score(row)
+        return 0 if score >= GOOD_SCORE else 2 if score < POOR_SCORE else 1
+
+    @staticmethod
+    def _timeout(row, max_timeout):
+        """A timeout fitted to the host's latency, at most max_timeout (None: no cap)."""
+        if row is None or row['latency'] is None or row['successes'] < MIN_SAMPLES:
+            return max_timeout
+        timeout = row['latency'] + 4 * row['latency_dev']
+        # Back off after failures, in case the host just got slower
+        timeout *= 2 ** min(row['consecutive_failures'], 4)
+        timeout = max(DOMAIN_MIN_TIMEOUT, timeout)
+        return timeout if max_timeout is None else min(max_timeout, timeout)
+
+    def _claim_probe(self, host, open_until, until):
+        # Only one fetch (in any process) probes a host whose cooldown has passed
+        claimed = self._connect().execute(
+            'UPDATE domains SET open_until = ? WHERE host = ? AND open_until = ?', (until, host, open_until)
+        ).rowcount
+        return claimed == 1
+
+    def plan(self, urls, max_timeout, probe=True, limit=None):
+        """
+        Decides which URLs to fetch and in what order. Returns (index, timeout)
+        pairs: URLs on hosts with an open circuit are left out, reliable hosts
+        come first and unreliable ones last, otherwise in their original order.
+        Timeouts are fitted to each host's latency, up to max_timeout.
+        With probe, a URL on a host whose cooldown has passed is claimed as its
+        probe. With a limit, only the first limit URLs are planned (and claimed).
+        """
+        rows = self._rows(host_of(url) for url in urls)
+        now = time.time()
+        candidates = []
+        skipped = 0
+        for i, url in enumerate(urls):
+            host = host_of(url)
+            row = rows.get(host)
+            if row is not None and row['open_until'] > now:
+                skipped += 1
+                continue
+            candidates.append((self._tier(row), i, host, row))
+        candidates.sort(key=lambda item: (item[0], item[1]))
+
+        planned = []
+        probing = set()
+        for _, i, host, row in candidates:
+            if limit is not None and len(planned) >= limit:
+                break
+            if probe and row is not None and row['open_until'] > 0:
+                if host in probing or not self._claim_probe(host, row['open_until'],
+                                                            now + (max_timeout or DOMAIN_MIN_TIMEOUT)):
+                    skipped += 1
+                    continue
+                probing.add(host)
+                with self._lock:
+                    self.probes += 1
+                logger.info("Probing %s, its circuit was open", host)
+            planned.append((i, self._timeout(row, max_timeout)))
+
+        if skipped:
+            DOMAIN_FETCHES.inc(skipped, result='skipped')
+            with self._lock:
+                self.skipped += skipped
+        return planned
+
+    def rank(self, urls):
+        """The URLs worth fetching, in the order plan() would fetch them."""
+        return [urls[i] for i, _ in self.plan(urls, None, probe=False)]
+
+    def record(self, url, outcome, latency=None, status=None, size=0, chars=0, error=None):
+        """
+        Records one fetch from url's host. outcome is 'ok' (downloaded; chars
+        of text extracted), 'rejected' (the host answered with something other
+        than HTML), 'http_error' (with status), 'timeout' or 'error'.
+        """
+        host = host_of(url)
+        now = time.time()
+        ok = outcome == 'ok'
+        # A rejected page shows the host is up, but says nothing about how often it yields text
+        counted = outcome != 'rejected'
+        reachable = ok or outcome == 'rejected'
+        host_failure = is_host_failure(outcome, status)
+        DOMAIN_FETCHES.inc(result=outcome)
+
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT * FROM domains WHERE host = ?', (host,)).fetchone()
+            state = dict(row) if row else {
+                'host': host, 'attempts': 0, 'successes': 0, 'extracted': 0, 'timeouts': 0, 'bytes': 0,
+                'chars': 0, 'latency': None, 'latency_dev': None, 'consecutive_failures': 0,
+                'open_until': 0, 'trips': 0, 'last_status': None, 'last_error': None,
+            }
+            if counted and state['attempts'] >= WINDOW:
+                for key in ('attempts', 'successes', 'extracted', 'timeouts', 'bytes', 'chars'):
+                    state[key] /= 2
+
+            state['attempts'] += 1 if counted else 0
+            state['last_status'] = status
+            if ok:
+                state['successes'] += 1
+                state['extracted'] += 1 if chars else 0
+                state['bytes'] += size
+                state['chars'] += chars
+                state['last_error'] = None
+                if latency is not None:
+                    if state['latency'] is None:
+                        state['latency'], state['latency_dev'] = latency, latency / 2
+                    else:
+                        state['latency_dev'] += LATENCY_BETA * (abs(latency - state['latency']) - state['latency_dev'])
+                        state['latency'] += LATENCY_ALPHA * (latency - state['latency'])
+            elif counted:
+                state['timeouts'] += 1 if outcome == 'timeout' else 0
+                state['last_error'] = (error or outcome)[:200]
+
+            if host_failure:
+                state['consecutive_failures'] += 1
+                if state['consecutive_failures'] >= DOMAIN_FAILURE_THRESHOLD:
+                    cooldown = min(DOMAIN_BREAKER_COOLDOWN * 2 ** state['trips'], DOMAIN_BREAKER_MAX_COOLDOWN)
+                    state['open_until'] = now + cooldown
+                    state['trips'] += 1
+                    with self._lock:
+                        self.opened += 1
+                    logger.warning("%s failed %d times in a row, skipping it for %ds",
+                                   host, state['consecutive_failures'], cooldown)
+            elif reachable:
+                if state['open_until']:
+                    logger.info("%s is reachable again", host)
+                state['consecutive_failures'] = 0
+                state['open_until'] = 0
+                state['trips'] = 0
+
+            state['updated_at'] = now
+            columns = list(state)
+            conn.execute(
+                f'INSERT OR REPLACE INTO domains ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+                [state[column] for column in columns]
+            )
+            self._evict(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _evict(self, conn):
+        with self._lock:
+            self._writes += 1
+            due = self._writes % 100 == 0
+        if due:
+            # Forget the hosts not seen for the longest time
+            conn.execute('DELETE FROM domains WHERE host IN (SELECT host FROM domains ORDER BY updated_at DESC '
+                         'LIMIT -1 OFFSET ?)', (MAX_HOSTS,))
+
+    def _describe(self, row, now):
+        attempts = row['attempts']
+        successes = row['successes']
+        if row['open_until'] > now:
+            state = 'open'
+        elif row['open_until'] > 0:
+            state = 'half_open'
+        else:
+            state = 'closed'
+        return {
+            'host': row['host'],
+            'state': state,
+            'open_for': max(0.0, row['open_until'] - now),
+            'attempts': round(attempts, 1),
+            'success_rate': successes / attempts if attempts else 0.0,
+            'timeout_rate': row['timeouts'] / attempts if attempts else 0.0,
+            'extract_rate': row['extracted'] / successes if successes else 0.0,
+            'score': self._score(row),
+            'avg_bytes': row['bytes'] / successes if successes else 0.0,
+            'avg_chars': row['chars'] / row['extracted'] if row['extracted'] else 0.0,
+            'latency': row['latency'],
+            'timeout': self._timeout(row, None),
+            'consecutive_failures': row['consecutive_failures'],
+            'last_status': row['last_status'],
+            'last_error': row['last_error'],
+            'age': now - row['updated_at'],
+        }
+
+    def hosts(self, limit=100, host=None):
+        """The recorded hosts, most fetched first, as dicts for inspection."""
+        now = time.time()
+        if host:
+            rows = self._connect().execute('SELECT * FROM domains WHERE host = ?', (host.lower(),)).fetchall()
+        else:
+            rows = self._connect().execute('SELECT * FROM domains ORDER BY attempts DESC LIMIT ?', (limit,)).fetchall()
+        return [self._describe(row, now) for row in rows]
+
+    def stats(self):
+        now = time.time()
+        row = self._connect().execute(
+            'SELECT COUNT(*) AS hosts, COALESCE(SUM(open_until > ?), 0) AS open FROM domains', (now,)
+        ).fetchone()
+        with self._lock:
+            return {
+                'hosts': row['hosts'],
+                'open_circuits': row['open'],
+                'skipped': self.skipped,
+                'probes': self.probes,
+                'opened': self.opened,
+            }
+
+
+_domain_health = None
+_domain_health_lock = threading.Lock()
+
+
+def get_domain_health():
+    """Returns the process-wide domain health registry, or None when DOMAIN_HEALTH_ENABLED is off."""
+    global _domain_health
+    if not DOMAIN_HEALTH_ENABLED:
+        return None
+    if _domain_health is None:
+        with _domain_health_lock:
+            if _domain_health is None:
+                _domain_health = DomainHealth()
+                register_stats('domain_health', _domain_health.stats)
+    return _domain_health
+
+
+def rank_urls(urls):
+    """
+    Orders urls by their hosts' health and drops hosts with an open circuit.
+    Returns them unchanged when the registry is off or unavailable.
+    """
+    health = get_domain_health()
+    if health is None:
+        return list(urls)
+    try:
+        return health.rank(urls)
+    except Exception as e:
+        logger.warning("Domain health lookup failed: %s", e)
+        return list(urls)
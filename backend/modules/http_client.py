@@ -0,0 +1,211 @@
+# http_client.py
+import os
+import time
+import socket
+import logging
+import threading
+import importlib.util
+from collections import OrderedDict
+import httpx
+from .metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+# Connection pool shared by all fetches; idle keep-alive connections are reused per host
+HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', 100))
+HTTP_MAX_KEEPALIVE = int(os.getenv('HTTP_MAX_KEEPALIVE', 20))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv('HTTP_KEEPALIVE_EXPIRY', 30))
+# HTTP/2 needs the h2 package (httpx[http2])
+HTTP2_ENABLED = (os.getenv('HTTP2_ENABLED', 'true').lower() == 'true'
+                 and importlib.util.find_spec('h2') is not None)
+# Larger response bodies are abandoned mid-download
+HTTP_MAX_RESPONSE_MB = float(os.getenv('HTTP_MAX_RESPONSE_MB', 5))
+HTTP_MAX_RESPONSE_BYTES = int(HTTP_MAX_RESPONSE_MB * 1024 * 1024)
+# Seconds to remember resolved host names; 0 turns the DNS cache off
+DNS_CACHE_TTL = int(os.getenv('DNS_CACHE_TTL', 300))
+DNS_CACHE_SIZE = 1024
+
+# httpx decodes brotli when one of these is installed (httpx[brotli])
+BROTLI_AVAILABLE = any(importlib.util.find_spec(name) for name in ('brotli', 'brotlicffi'))
+ACCEPT_ENCODING = 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate'
+
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml')
+# Content types servers send when they don't know better; the body is sniffed instead
+SNIFFED_CONTENT_TYPES = ('', 'application/octet-stream', 'text/plain')
+HTML_SIGNATURES = (b'<!doctype html', b'<html', b'<head', b'<body', b'<!--')
+
+
+class ResponseTooLarge(httpx.HTTPError):
+    """Raised when a response body is bigger than the size cap."""
+
+
+class UnsupportedContentType(httpx.HTTPError):
+    """Raised when an HTML-only request gets something else, e.g. a PDF or an image."""
+
+
+def looks_like_html(data):
+    start = data[:1024].lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    return start.startswith(HTML_SIGNATURES) or b'<html' in start
+
+
+# DNS cache. httpx resolves through socket.getaddrinfo, in worker threads for
+# asyncio too, so caching it there covers every client in the process.
+_system_getaddrinfo = socket.getaddrinfo
+_dns_cache = OrderedDict()
+_dns_lock = threading.Lock()
+_dns_stats = {'hits': 0, 'misses': 0}
+
+
+def _cached_getaddrinfo(host, port, *args, **kwargs):
+    key = (host, port, args, tuple(sorted(kwargs.items())))
+    now = time.monotonic()
+    with _dns_lock:
+        entry = _dns_cache.get(key)
+        if entry and entry[0] > now:
+            _dns_cache.move_to_end(key)
+            _dns_stats['hits'] += 1
+            return entry[1]
+        _dns_stats['misses'] += 1
+
+    result = _system_getaddrinfo(host, port, *args, **kwargs)
+    with _dns_lock:
+        _dns_cache[key] = (now + DNS_CACHE_TTL, result)
+        _dns_cache.move_to_end(key)
+        while len(_dns_cache) > DNS_CACHE_SIZE:
+            _dns_cache.popitem(last=False)
+    return result
+
+
+def dns_cache_stats():
+    with _dns_lock:
+        return dict(_dns_stats, entries=len(_dns_cache), ttl=DNS_CACHE_TTL)
+
+
+def install_dns_cache():
+    """Routes socket.getaddrinfo through the DNS cache. Safe to call more than once."""
+    if DNS_CACHE_TTL > 0 and socket.getaddrinfo is not _cached_getaddrinfo:
+        socket.getaddrinfo = _cached_getaddrinfo
+        register_stats('dns_cache', dns_cache_stats)
+
+
+def _client_options():
+    return dict(
+        http2=HTTP2_ENABLED,
+        limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS,
+                            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+                            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY),
+        headers={'Accept-Encoding': ACCEPT_ENCODING},
+        follow_redirects=True,
+    )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Returns the process-wide pooled httpx.Client. It is safe to share between threads."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                install_dns_cache()
+                _client = httpx.Client(**_client_options())
+                logger.debug("HTTP client ready (http2=%s, brotli=%s)", HTTP2_ENABLED, BROTLI_AVAILABLE)
+    return _client
+
+
+def new_async_client():
+    """
+    Returns a pooled httpx.AsyncClient with the same settings as get_http_client.
+    Async clients are bound to one event loop, so the caller owns and closes it.
+    """
+    install_dns_cache()
+    return httpx.AsyncClient(**_client_options())
+
+
+def _media_type(response):
+    return response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+
+
+class _BodyReader:
+    """
+    Collects a streamed body, enforcing the size cap and, for HTML-only
+    requests, the content type, so unwanted bodies are dropped early.
+    """
+
+    def __init__(self, response, max_bytes, html_only, truncate):
+        self.response = response
+        self.max_bytes = max_bytes
+        self.truncate = truncate
+        self.chunks = []
+        self.size = 0
+        self.truncated = False
+
+        media_type = _media_type(response)
+        if html_only and media_type not in HTML_CONTENT_TYPES + SNIFFED_CONTENT_TYPES:
+            raise UnsupportedContentType(f"{response.url} is {media_type}, not HTML")
+        self.sniff = html_only and media_type not in HTML_CONTENT_TYPES
+
+        length = response.headers.get('Content-Length')
+        if not truncate and length and length.isdigit() and int(length) > max_bytes:
+            raise ResponseTooLarge(f"{response.url} is {length} bytes, over the {max_bytes} byte cap")
+
+    def feed(self, chunk):
+        """Adds a decoded chunk. Returns False once the rest of the body isn't wanted."""
+        if self.sniff and chunk:
+            if not looks_like_html(chunk):
+                raise UnsupportedContentType(f"{self.response.url} does not look like HTML")
+            self.sniff = False
+
+        self.size += len(chunk)
+        if self.size <= self.max_bytes:
+            self.chunks.append(chunk)
+            return True
+        if not self.truncate:
+            raise ResponseTooLarge(f"{self.response.url} is over the {self.max_bytes} byte cap")
+        self.chunks.append(chunk[:len(chunk) - (self.size - self.max_bytes)])
+        self.truncated = True
+        return False
+
+    def result(self):
+        """
+        A fully read copy of the response. The body is already decoded, and
+        extensions['truncated'] says whether it was cut at the size cap.
+        """
+        headers = self.response.headers.copy()
+        headers.pop('Content-Encoding', None)
+        headers.pop('Content-Length', None)
+        buffered = httpx.Response(self.response.status_code, headers=headers, content=b''.join(self.chunks),
+                                  request=self.response.request,
+                                  extensions=dict(self.response.extensions, truncated=self.truncated))
+        buffered.read()
+        return buffered
+
+
+def get(url, headers=None, timeout=15, max_bytes=HTTP_MAX_RESPONSE_BYTES, html_only=False, truncate=False):
+    """
+    GETs url through the shared client, following redirects.
+
+    The body is streamed: past max_bytes it is cut off (truncate=True) or
+    ResponseTooLarge is raised. With html_only, anything that isn't HTML
+    raises UnsupportedContentType before its body is downloaded.
+    """
+    client = get_http_client()
+    with client.stream('GET', url, headers=headers, timeout=timeout) as response:
+        reader = _BodyReader(response, max_bytes, html_only, truncate)
+        for chunk in response.iter_bytes():
+            if not reader.feed(chunk):
+                break
+    return reader.result()
+
+
+async def get_async(client, url, headers=None, timeout=15, max_bytes=HTTP_MAX_RESPONSE_BYTES,
+                    html_only=False, truncate=False):
+    """Async version of get, using a client from new_async_client."""
+    async with client.stream('GET', url, headers=headers, timeout=timeout) as response:
+        reader = _BodyReader(response, max_bytes, html_only, truncate)
+        async for chunk in response.aiter_bytes():
+            if not reader.feed(chunk):
+                break
+    return reader.result()
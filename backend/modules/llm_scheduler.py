@@ -0,0 +1,240 @@
+# llm_scheduler.py
+import os
+import math
+import heapq
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from .metrics import register_stats, percentile, STAGE_SECONDS
+
+# Generations allowed to run at once per model; LLM_MODEL_CONCURRENCY overrides
+# it for single models, e.g. "llama3.1=2,mistral=1"
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 1))
+LLM_MODEL_CONCURRENCY = {
+    name.strip(): int(value)
+    for name, _, value in (item.partition('=') for item in os.getenv('LLM_MODEL_CONCURRENCY', '').split(','))
+    if name.strip() and value.strip()
+}
+# Requests allowed to wait for a slot; beyond this they are rejected right away
+LLM_QUEUE_SIZE = int(os.getenv('LLM_QUEUE_SIZE', 16))
+# Longest a request waits for a slot before giving up
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', 120))
+
+# Follow-up questions jump ahead of new prompts this many tokens longer
+FOLLOW_UP_PRIORITY_BONUS = 2000
+# Samples kept for the latency percentiles
+TIMING_SAMPLES = 1000
+# How often a waiting slot() re-checks its cancelled callback
+CANCEL_POLL_INTERVAL = 0.25
+
+
+class LLMBusy(Exception):
+    """Raised when the LLM queue is full. retry_after is a hint in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"LLM queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def prompt_priority(prompt_tokens, follow_up=False):
+    """Lower runs first: short prompts, and follow-ups in a conversation."""
+    return prompt_tokens - (FOLLOW_UP_PRIORITY_BONUS if follow_up else 0)
+
+
+class _Waiter:
+    def __init__(self, priority, seq, wake):
+        self.priority = priority
+        self.seq = seq
+        self.wake = wake
+        self.granted = False
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class LLMScheduler:
+    """
+    Limits concurrent generations for one model and queues the rest.
+
+    Waiting requests form a bounded priority queue (see prompt_priority). When it
+    is full, new requests fail fast with LLMBusy instead of piling up on Ollama.
+    Works for threads (slot) and asyncio tasks (slot_async) alike.
+    """
+
+    def __init__(self, model, max_concurrency=LLM_MAX_CONCURRENCY, queue_size=LLM_QUEUE_SIZE):
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.queue_size = max(0, queue_size)
+        self._lock = threading.Lock()
+        self._queue = []
+        self._seq = itertools.count()
+        self._active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.cancelled = 0
+        self._queue_times = deque(maxlen=TIMING_SAMPLES)
+        self._generation_times = deque(maxlen=TIMING_SAMPLES)
+
+    def retry_after(self):
+        """Rough seconds until a queued request would start, for Retry-After."""
+        with self._lock:
+            typical = percentile(self._generation_times, 50) or 5.0
+            waves = (len(self._queue) + 1) / self.max_concurrency
+            return max(1, min(60, math.ceil(waves * typical)))
+
+    def check_capacity(self):
+        """Raises LLMBusy if a new request would be rejected right now."""
+        with self._lock:
+            full = self._active >= self.max_concurrency and len(self._queue) >= self.queue_size
+            if full:
+                self.rejected += 1
+        if full:
+            raise LLMBusy(self.retry_after())
+
+    def _enqueue(self, priority, wake):
+        """Takes a free slot (returns None) or queues a waiter (returns it)."""
+        with self._lock:
+            if self._active < self.max_concurrency and not self._queue:
+                self._active += 1
+                self._queue_times.append(0.0)
+                STAGE_SECONDS.observe(0.0, stage='llm_queue')
+                return None
+            if len(self._queue) >= self.queue_size:
+                self.rejected += 1
+                full = True
+            else:
+                full = False
+                waiter = _Waiter(priority, next(self._seq), wake)
+                heapq.heappush(self._queue, waiter)
+        if full:
+            raise LLMBusy(self.retry_after())
+        return waiter
+
+    def _abandon(self, waiter):
+        """Removes a waiter that gave up. Returns True if it had just been granted a slot."""
+        with self._lock:
+            if waiter.granted:
+                return True
+            self._queue.remove(waiter)
+            heapq.heapify(self._queue)
+            return False
+
+    def _release(self, started):
+        with self._lock:
+            self._active -= 1
+            if started is not None:
+                self.completed += 1
+                self._generation_times.append(time.monotonic() - started)
+            while self._queue and self._active < self.max_concurrency:
+                waiter = heapq.heappop(self._queue)
+                waiter.granted = True
+                self._active += 1
+                waited = time.monotonic() - waiter.enqueued_at
+                self._queue_times.append(waited)
+                STAGE_SECONDS.observe(waited, stage='llm_queue')
+                waiter.wake()
+
+    @staticmethod
+    def _wait(granted, timeout, cancelled):
+        """granted.wait(timeout), but gives up as soon as cancelled() returns True."""
+        if cancelled is None:
+            return granted.wait(timeout)
+        deadline = time.monotonic() + timeout
+        while not cancelled():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or granted.wait(min(remaining, CANCEL_POLL_INTERVAL)):
+                break
+        return granted.is_set()
+
+    @contextmanager
+    def slot(self, priority=0, timeout=LLM_QUEUE_TIMEOUT, cancelled=None):
+        """
+        Holds one generation slot for the duration of the block. cancelled is
+        an optional callable polled while queued; once it returns True the
+        request leaves the queue and LLMBusy is raised.
+        """
+        granted = threading.Event()
+        waiter = self._enqueue(priority, granted.set)
+        if waiter is not None and not self._wait(granted, timeout, cancelled) and not self._abandon(waiter):
+            with self._lock:
+                if cancelled is not None and cancelled():
+                    self.cancelled += 1
+                else:
+                    self.timed_out += 1
+            raise LLMBusy(self.retry_after())
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(started)
+
+    @asynccontextmanager
+    async def slot_async(self, priority=0, timeout=LLM_QUEUE_TIMEOUT):
+        """Async version of slot."""
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        waiter = self._enqueue(priority, wake)
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(granted), timeout)
+            except asyncio.TimeoutError:
+                if not self._abandon(waiter):
+                    with self._lock:
+                        self.timed_out += 1
+                    raise LLMBusy(self.retry_after())
+            except asyncio.CancelledError:
+                if self._abandon(waiter):
+                    # The slot was handed over as we were cancelled, pass it on
+                    self._release(None)
+                raise
+
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._release(started)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'model': self.model,
+                'active': self._active,
+                'queued': len(self._queue),
+                'max_concurrency': self.max_concurrency,
+                'queue_size': self.queue_size,
+                'completed': self.completed,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                'cancelled': self.cancelled,
+                'queue_time_p50': percentile(self._queue_times, 50),
+                'queue_time_p95': percentile(self._queue_times, 95),
+                'generation_time_p50': percentile(self._generation_times, 50),
+                'generation_time_p95': percentile(self._generation_times, 95),
+            }
+
+
+_schedulers = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_llm_scheduler(model):
+    """Returns the process-wide scheduler for model."""
+    scheduler = _schedulers.get(model)
+    if scheduler is None:
+        with _schedulers_lock:
+            scheduler = _schedulers.get(model)
+            if scheduler is None:
+                concurrency = LLM_MODEL_CONCURRENCY.get(model, LLM_MAX_CONCURRENCY)
+                scheduler = _schedulers[model] = LLMScheduler(model, concurrency)
+                register_stats('llm_scheduler', scheduler.stats)
+    return scheduler
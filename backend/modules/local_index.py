@@ -0,0 +1,287 @@
+# local_index.py
+import os
+import re
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import deque
+from .page_cache import CACHE_DIR, normalize_url
+from .metrics import register_stats, percentile, timed
+from .sqlite_db import ThreadLocalConnection
+
+logger = logging.getLogger(__name__)
+
+LOCAL_INDEX_ENABLED = os.getenv('LOCAL_INDEX_ENABLED', 'true').lower() == 'true'
+LOCAL_INDEX_PATH = os.getenv('LOCAL_INDEX_PATH', os.path.join(CACHE_DIR, 'local_index.sqlite3'))
+LOCAL_INDEX_MAX_DOCUMENTS = int(os.getenv('LOCAL_INDEX_MAX_DOCUMENTS', 5000))
+# Answer from indexed pages instead of searching when they cover the query well enough
+LOCAL_FIRST = os.getenv('LOCAL_FIRST', 'false').lower() == 'true'
+# Only pages indexed within this many seconds count for local-first answers
+LOCAL_FIRST_MAX_AGE = int(os.getenv('LOCAL_FIRST_MAX_AGE', 24 * 3600))
+# Passages needed, each containing this share of the query's own keywords
+LOCAL_FIRST_MIN_PASSAGES = int(os.getenv('LOCAL_FIRST_MIN_PASSAGES', 5))
+LOCAL_FIRST_MIN_COVERAGE = float(os.getenv('LOCAL_FIRST_MIN_COVERAGE', 0.6))
+
+PASSAGE_CHARS = 600
+MIN_PASSAGE_CHARS = 40
+# Candidates fetched from the index before the coverage check
+SEARCH_CANDIDATES = 50
+MAX_QUERY_TERMS = 32
+TIMING_SAMPLES = 1000
+
+# Same word boundaries as FTS5's unicode61 tokenizer; the index also stems words (porter)
+_TOKEN_RE = re.compile(r'\w+')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+def split_passages(text, target=PASSAGE_CHARS):
+    """Chunks extracted page text into passages of about target characters along paragraph and sentence breaks."""
+    passages = []
+    current = ''
+    for block in text.split('\n'):
+        block = block.strip()
+        pieces = [block] if len(block) <= target else _SENTENCE_END.split(block)
+        for piece in pieces:
+            if current and len(current) + len(piece) + 1 > target:
+                passages.append(current)
+                current = ''
+            current = f'{current} {piece}'.strip()
+    if current:
+        passages.append(current)
+    return [passage for passage in passages if len(passage) >= MIN_PASSAGE_CHARS]
+
+
+def _tokens(text):
+    return _TOKEN_RE.findall(text.lower())
+
+
+def _singular(token):
+    # Enough stemming for the coverage check to treat "smartwatches" as "smartwatch"
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 4 and token.endswith(('ches', 'shes', 'sses', 'xes', 'zes')):
+        return token[:-2]
+    if len(token) > 3 and token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        return token[:-1]
+    return token
+
+
+class LocalIndex:
+    """
+    Persistent full-text index of every page we have scraped, in passages.
+
+    Backed by an SQLite FTS5 table: an on-disk inverted index whose posting
+    lists and BM25 statistics are updated incrementally as pages are added or
+    replaced. Lets the pipeline answer from pages it has already fetched
+    without searching again.
+    """
+
+    def __init__(self, path=LOCAL_INDEX_PATH, max_documents=LOCAL_INDEX_MAX_DOCUMENTS):
+        self.path = path
+        self.max_documents = max_documents
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.local_answers = 0
+        self._query_times = deque(maxlen=TIMING_SAMPLES)
+        self._connect = ThreadLocalConnection(path, sqlite3.Row)
+        self._init_db()
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id INTEGER PRIMARY KEY,
+                url TEXT UNIQUE NOT NULL,
+                digest TEXT NOT NULL,
+                indexed_at REAL NOT NULL,
+                passages INTEGER NOT NULL,
+                chars INTEGER NOT NULL
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS documents_indexed_at ON documents (indexed_at)')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS passages (
+                id INTEGER PRIMARY KEY,
+                doc_id INTEGER NOT NULL,
+                position INTEGER NOT NULL,
+                text TEXT NOT NULL
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS passages_doc_id ON passages (doc_id)')
+        # The passages table holds the text; the FTS5 table only the inverted index
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS passages_fts USING fts5(
+                text, content='passages', content_rowid='id', tokenize='porter unicode61 remove_diacritics 2'
+            )
+        """)
+
+    def add_document(self, url, text):
+        """Indexes a page's extracted text, replacing any earlier version of the page."""
+        key = normalize_url(url)
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT id, digest FROM documents WHERE url = ?', (key,)).fetchone()
+            if row and row['digest'] == digest:
+                # Unchanged page, it is just fresher now
+                conn.execute('UPDATE documents SET indexed_at = ? WHERE id = ?', (now, row['id']))
+            else:
+                if row:
+                    self._delete(conn, row['id'])
+                passages = split_passages(text)
+                if passages:
+                    doc_id = conn.execute(
+                        'INSERT INTO documents (url, digest, indexed_at, passages, chars) VALUES (?, ?, ?, ?, ?)',
+                        (key, digest, now, len(passages), sum(len(passage) for passage in passages))
+                    ).lastrowid
+                    for position, passage in enumerate(passages):
+                        passage_id = conn.execute(
+                            'INSERT INTO passages (doc_id, position, text) VALUES (?, ?, ?)', (doc_id, position, passage)
+                        ).lastrowid
+                        conn.execute('INSERT INTO passages_fts (rowid, text) VALUES (?, ?)', (passage_id, passage))
+                self._evict(conn)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _delete(self, conn, doc_id):
+        for row in conn.execute('SELECT id, text FROM passages WHERE doc_id = ?', (doc_id,)).fetchall():
+            conn.execute("INSERT INTO passages_fts (passages_fts, rowid, text) VALUES ('delete', ?, ?)",
+                         (row['id'], row['text']))
+        conn.execute('DELETE FROM passages WHERE doc_id = ?', (doc_id,))
+        conn.execute('DELETE FROM documents WHERE id = ?', (doc_id,))
+
+    def _evict(self, conn):
+        # Drop the least recently indexed pages over the cap
+        excess = conn.execute('SELECT COUNT(*) FROM documents').fetchone()[0] - self.max_documents
+        if excess > 0:
+            for row in conn.execute('SELECT id FROM documents ORDER BY indexed_at ASC LIMIT ?', (excess,)).fetchall():
+                self._delete(conn, row['id'])
+
+    def search(self, keywords, limit=SEARCH_CANDIDATES, max_age=None):
+        """
+        Returns the best BM25 matches for the keywords as dicts with url, text,
+        score (higher is better) and indexed_at. max_age (seconds) skips older pages.
+        """
+        terms = list(dict.fromkeys(token for keyword in keywords for token in _tokens(keyword)))[:MAX_QUERY_TERMS]
+        if not terms:
+            return []
+        match = ' OR '.join(f'"{term}"' for term in terms)
+        oldest = time.time() - max_age if max_age is not None else 0
+
+        started = time.perf_counter()
+        with timed('local_search'):
+            rows = self._connect().execute("""
+                SELECT p.text, d.url, d.indexed_at, bm25(passages_fts) AS rank
+                FROM passages_fts
+                JOIN passages p ON p.id = passages_fts.rowid
+                JOIN documents d ON d.id = p.doc_id
+                WHERE passages_fts MATCH ? AND d.indexed_at >= ?
+                ORDER BY rank
+                LIMIT ?
+            """, (match, oldest, limit)).fetchall()
+        with self._lock:
+            self.queries += 1
+            self._query_times.append(time.perf_counter() - started)
+
+        # FTS5 ranks are negated BM25 scores
+        return [{'url': row['url'], 'text': row['text'], 'score': -row['rank'], 'indexed_at': row['indexed_at']}
+                for row in rows]
+
+    def evidence(self, query, keywords, char_budget, max_age=LOCAL_FIRST_MAX_AGE,
+                 min_passages=LOCAL_FIRST_MIN_PASSAGES, min_coverage=LOCAL_FIRST_MIN_COVERAGE):
+        """
+        Returns fresh indexed passages as web content for the query, best first
+        within char_budget, or None when too few of them cover the query.
+
+        Coverage is measured against the query's own keywords, not the generic
+        terms extract_keywords adds, so broad matches don't count as answers.
+        """
+        keyword_terms = {_singular(token) for keyword in keywords for token in _tokens(keyword)}
+        core_terms = {_singular(token) for token in _tokens(query)} & keyword_terms
+        if not core_terms:
+            return None
+
+        passages = [
+            passage for passage in self.search(keywords, max_age=max_age)
+            if len(core_terms & {_singular(token) for token in _tokens(passage['text'])}) / len(core_terms) >= min_coverage
+        ]
+        if len(passages) < min_passages:
+            return None
+
+        selected = []
+        used = 0
+        for passage in passages:
+            size = len(passage['text']) + 2
+            if used + size > char_budget:
+                continue
+            selected.append(passage['text'])
+            used += size
+        if not selected:
+            # Every covering passage is larger than the budget
+            return None
+        with self._lock:
+            self.local_answers += 1
+        logger.info("Local index: %d passages from %d pages cover the query",
+                    len(selected), len({passage['url'] for passage in passages}))
+        return "\n\n".join(selected)
+
+    def stats(self):
+        now = time.time()
+        row = self._connect().execute(
+            'SELECT COUNT(*) AS documents, COALESCE(SUM(passages), 0) AS passages, COALESCE(SUM(chars), 0) AS chars, '
+            'COALESCE(SUM(indexed_at >= ?), 0) AS fresh, MIN(indexed_at) AS oldest, MAX(indexed_at) AS newest '
+            'FROM documents', (now - LOCAL_FIRST_MAX_AGE,)
+        ).fetchone()
+        size = sum(os.path.getsize(path) for path in (self.path, self.path + '-wal') if os.path.exists(path))
+        with self._lock:
+            return {
+                'documents': row['documents'],
+                'fresh_documents': row['fresh'],
+                'passages': row['passages'],
+                'chars': row['chars'],
+                'bytes': size,
+                'oldest_age': now - row['oldest'] if row['oldest'] else 0.0,
+                'newest_age': now - row['newest'] if row['newest'] else 0.0,
+                'queries': self.queries,
+                'local_answers': self.local_answers,
+                'query_time_p50': percentile(self._query_times, 50),
+                'query_time_p95': percentile(self._query_times, 95),
+            }
+
+
+_local_index = None
+_local_index_lock = threading.Lock()
+
+
+def get_local_index():
+    """Returns the process-wide local index, or None when LOCAL_INDEX_ENABLED is off."""
+    global _local_index
+    if not LOCAL_INDEX_ENABLED:
+        return None
+    if _local_index is None:
+        with _local_index_lock:
+            if _local_index is None:
+                _local_index = LocalIndex()
+                register_stats('local_index', _local_index.stats)
+    return _local_index
+
+
+def local_first_evidence(query, keywords, char_budget):
+    """
+    In LOCAL_FIRST mode, returns indexed passages that answer the query
+    without a web search (see LocalIndex.evidence). Otherwise None.
+    """
+    index = get_local_index() if LOCAL_FIRST else None
+    if index is None:
+        return None
+    try:
+        return index.evidence(query, keywords, char_budget)
+    except Exception as e:
+        logger.warning("Local index lookup failed: %s", e)
+        return None
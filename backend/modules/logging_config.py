@@ -0,0 +1,15 @@
+# logging_config.py
+import os
+import logging
+
+# DEBUG, INFO, WARNING, ERROR, or OFF to silence the backend entirely
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+
+def configure_logging(level=LOG_LEVEL):
+    """Sets up leveled logging for the backend. Called once by the app entry points."""
+    if level == 'OFF':
+        logging.disable(logging.CRITICAL)
+        return
+    logging.basicConfig(level=getattr(logging, level, logging.INFO), format=LOG_FORMAT)
@@ -0,0 +1,172 @@
+# metrics.py
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Seconds; spans a cached lookup up to a slow LLM generation
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+RATE_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 50, 75, 100, 200)
+
+_metrics = []
+_stats = []
+_lock = threading.Lock()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        with _lock:
+            _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for key, value in sorted(self._values.items()):
+            lines.append(f'{self.name}{_label_text(zip(self.labelnames, key))} {value}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [bucket counts..., sum, count]
+        self._listeners = []
+        with _lock:
+            _metrics.append(self)
+
+    def add_listener(self, fn):
+        """Calls fn(value, labels) on every observation, e.g. to collect raw samples in a benchmark."""
+        self._listeners.append(fn)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with _lock:
+            series = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+        for listener in self._listeners:
+            listener(value, labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for key, series in sorted(self._values.items()):
+            labels = list(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{_label_text(labels + [("le", bound)])} {count}')
+            lines.append(f'{self.name}_bucket{_label_text(labels + [("le", "+Inf")])} {series[-1]}')
+            lines.append(f'{self.name}_sum{_label_text(labels)} {series[-2]}')
+            lines.append(f'{self.name}_count{_label_text(labels)} {series[-1]}')
+        return lines
+
+
+STAGE_SECONDS = Histogram('pipeline_stage_seconds', 'Time spent in each pipeline stage', ['stage'])
+LLM_TOKENS = Counter('llm_tokens_total', 'Tokens processed by the LLM', ['model', 'kind'])
+LLM_TOKENS_PER_SECOND = Histogram('llm_generation_tokens_per_second', 'LLM generation speed', ['model'],
+                                  buckets=RATE_BUCKETS)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples, 0.0 when there are none."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+@contextmanager
+def timed(stage):
+    """Records how long the block takes under pipeline_stage_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        logger.debug("%s took %.3fs", stage, elapsed)
+
+
+def observe_ollama(model, response):
+    """
+    Records Ollama's own timings from a final chat response (or the last
+    streamed chunk). Ollama reports durations in nanoseconds; prompt_eval_count
+    only covers prompt tokens not served from its cache.
+    """
+    prompt_count = response.get('prompt_eval_count') or 0
+    prompt_ns = response.get('prompt_eval_duration') or 0
+    eval_count = response.get('eval_count') or 0
+    eval_ns = response.get('eval_duration') or 0
+
+    STAGE_SECONDS.observe(prompt_ns / 1e9, stage='llm_prefill')
+    STAGE_SECONDS.observe(eval_ns / 1e9, stage='llm_generation')
+    LLM_TOKENS.inc(prompt_count, model=model, kind='prompt')
+    LLM_TOKENS.inc(eval_count, model=model, kind='generated')
+    rate = eval_count / (eval_ns / 1e9) if eval_ns else 0.0
+    if rate:
+        LLM_TOKENS_PER_SECOND.observe(rate, model=model)
+    logger.info("%s: prefill %d tokens in %.2fs, generated %d tokens in %.2fs (%.1f tokens/s)",
+                model, prompt_count, prompt_ns / 1e9, eval_count, eval_ns / 1e9, rate)
+
+
+def register_stats(prefix, stats_fn, **labels):
+    """
+    Exposes a component's stats() dict as gauges named {prefix}_{key}.
+    String values become labels.
+    """
+    with _lock:
+        _stats.append((prefix, stats_fn, labels))
+
+
+def render_metrics():
+    """Returns all metrics in the Prometheus text exposition format."""
+    with _lock:
+        metrics = list(_metrics)
+        stats = list(_stats)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+    # Several components may share a prefix (e.g. one scheduler per model)
+    gauges = {}
+    for prefix, stats_fn, labels in stats:
+        try:
+            values = stats_fn()
+        except Exception as e:
+            logger.warning("Could not collect %s stats: %s", prefix, e)
+            continue
+        series_labels = dict(labels)
+        series_labels.update((k, v) for k, v in values.items() if isinstance(v, str))
+        label_text = _label_text(sorted(series_labels.items()))
+        for key, value in values.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges.setdefault(f'{prefix}_{key}', []).append(f'{prefix}_{key}{label_text} {value}')
+
+    for name, series in gauges.items():
+        lines.append(f'# TYPE {name} gauge')
+        lines.extend(series)
+    return '\n'.join(lines) + '\n'
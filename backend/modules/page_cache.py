@@ -0,0 +1,182 @@
+# page_cache.py
+import os
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse, urlunparse, parse_qsl, urlencode
+from .metrics import register_stats
+from .sqlite_db import ThreadLocalConnection
+
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.cache'))
+PAGE_CACHE_PATH = os.getenv('PAGE_CACHE_PATH', os.path.join(CACHE_DIR, 'pages.sqlite3'))
+PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', 6 * 3600))
+PAGE_CACHE_MAX_MB = int(os.getenv('PAGE_CACHE_MAX_MB', 200))
+
+# Upper bound for TTLs taken from the server's Cache-Control header
+MAX_TTL = 7 * 24 * 3600
+
+# The size cap is checked after this many writes, or this share of the cap written,
+# by each process, instead of summing the table on every write
+EVICT_CHECK_WRITES = 100
+EVICT_CHECK_FRACTION = 0.05
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = {'fbclid', 'gclid', 'ref_src', 'ved', 'usg'}
+
+
+def normalize_url(url):
+    """
+    Normalizes a URL so equivalent links share one cache entry: lowercase scheme
+    and host, no default port, no fragment, no tracking parameters, sorted query.
+    """
+    parts = urlparse(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS]
+    query.sort()
+
+    path = parts.path or '/'
+    return urlunparse((scheme, host, path, parts.params, urlencode(query), ''))
+
+
+def ttl_from_headers(headers, default=PAGE_CACHE_TTL):
+    """
+    The TTL the server's Cache-Control header allows: 0 (don't store) for
+    no-store and no-cache, max-age when given (at most MAX_TTL), else default.
+    """
+    cache_control = ((headers or {}).get('Cache-Control', '') or '').lower()
+    directives = {part.strip().split('=', 1)[0] for part in cache_control.split(',')}
+    if 'no-store' in directives or 'no-cache' in directives:
+        return 0
+    match = re.search(r'(?:^|[,\s])max-age=(\d+)', cache_control)
+    if not match:
+        return default
+    return min(MAX_TTL, int(match.group(1)))
+
+
+class PageCache:
+    """
+    SQLite-backed cache of downloaded pages and their extracted text.
+
+    Entries carry their own TTL plus the ETag/Last-Modified validators needed for
+    conditional revalidation. Total size is capped with LRU eviction. SQLite in WAL
+    mode makes the file safe to share between threads and worker processes.
+    """
+
+    def __init__(self, path=PAGE_CACHE_PATH, max_bytes=PAGE_CACHE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._connect = ThreadLocalConnection(path, sqlite3.Row)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._written = 0
+        self._init_db()
+
+    def _init_db(self):
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                html TEXT,
+                text TEXT,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+        """)
+        self._connect().execute('CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)')
+
+    def get(self, url):
+        """
+        Returns the cached entry for url as a dict (fresh or stale), or None.
+        Check entry['expires_at'] to decide whether it needs revalidation.
+        """
+        key = normalize_url(url)
+        conn = self._connect()
+        row = conn.execute('SELECT * FROM pages WHERE url = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute('UPDATE pages SET last_access = ? WHERE url = ?', (time.time(), key))
+        return dict(row)
+
+    def put(self, url, html, text, etag=None, last_modified=None, ttl=PAGE_CACHE_TTL):
+        """Stores the raw HTML and extracted text of a page."""
+        key = normalize_url(url)
+        now = time.time()
+        size = len(html or '') + len(text or '')
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO pages (url, html, text, etag, last_modified, fetched_at, expires_at, last_access, size) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (key, html, text, etag, last_modified, now, now + ttl, now, size)
+        )
+        self._maybe_evict(size)
+
+    def delete(self, url):
+        self._connect().execute('DELETE FROM pages WHERE url = ?', (normalize_url(url),))
+
+    def refresh(self, url, ttl=PAGE_CACHE_TTL):
+        """Extends an entry's lifetime after a 304 Not Modified."""
+        now = time.time()
+        self._connect().execute(
+            'UPDATE pages SET expires_at = ?, last_access = ? WHERE url = ?',
+            (now + ttl, now, normalize_url(url))
+        )
+
+    def _maybe_evict(self, size):
+        with self._lock:
+            self._writes += 1
+            self._written += size
+            due = self._writes >= EVICT_CHECK_WRITES or self._written >= self.max_bytes * EVICT_CHECK_FRACTION
+            if due:
+                self._writes = self._written = 0
+        if due:
+            self._evict()
+
+    def _evict(self):
+        conn = self._connect()
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used pages until we're under the cap
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            for row in conn.execute('SELECT url, size FROM pages ORDER BY last_access ASC').fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute('DELETE FROM pages WHERE url = ?', (row['url'],))
+                total -= row['size']
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def stats(self):
+        row = self._connect().execute(
+            'SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS bytes, '
+            'COALESCE(SUM(expires_at > ?), 0) AS fresh FROM pages', (time.time(),)
+        ).fetchone()
+        return {'entries': row['entries'], 'fresh': row['fresh'], 'bytes': row['bytes'], 'max_bytes': self.max_bytes}
+
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache():
+    """Returns the process-wide page cache."""
+    global _page_cache
+    if _page_cache is None:
+        with _page_cache_lock:
+            if _page_cache is None:
+                _page_cache = PageCache()
+                register_stats('page_cache', _page_cache.stats)
+    return _page_cache
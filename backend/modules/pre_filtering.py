@@ -1,44 +1,167 @@
 # pre_filtering.py
+import os
+import re
+import logging
+import threading
+from functools import lru_cache
+import numpy as np
 import nltk
 from nltk.tokenize import sent_tokenize
+from .metrics import timed
+from . import cpu_pool
+from .vector_store import get_vector_store, document_key
 
-# Download the 'punkt' tokenizer if you haven't already
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    print("Downloading NLTK 'punkt' model...")
-    nltk.download('punkt')
+logger = logging.getLogger(__name__)
 
-def filter_content(content, keywords):
+# Sentence tokenizer data; newer NLTK releases read punkt_tab instead of punkt
+PUNKT_RESOURCES = ['punkt', 'punkt_tab']
+# None until the first load attempt, then whether the tokenizer is usable
+_tokenizer_available = None
+_tokenizer_lock = threading.Lock()
+
+# Stop scraping once this many characters of high-relevance sentences are collected
+FILTER_CHAR_BUDGET = int(os.getenv('FILTER_CHAR_BUDGET', 12000))
+
+# 'tiers' (keyword/indicator relevance buckets), 'bm25' (ranked within FILTER_CHAR_BUDGET)
+# or 'dense' (passages ranked by embedding similarity to the query, see vector_store.py)
+FILTER_MODES = ('tiers', 'bm25', 'dense')
+FILTER_MODE = os.getenv('FILTER_MODE', 'tiers')
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+def _check_mode(mode):
+    if mode not in FILTER_MODES:
+        raise ValueError(f"Unknown filter mode {mode!r}, expected one of {', '.join(FILTER_MODES)}")
+
+# A misconfigured FILTER_MODE fails at startup rather than on every request
+_check_mode(FILTER_MODE)
+
+# Word tokens for BM25 scoring (keeps prices like $999 and ₹4999 together)
+_TOKEN_RE = re.compile(r'[\w$₹]+')
+
+# Lines containing any of these start a section that is skipped
+UNWANTED_SECTION_PATTERNS = [
+    'FAQ', 'Frequently Asked Questions', 'Q:', 'A:', 'Question:', 'Answer:',
+    'UPSC', 'exam', 'test', 'quiz', 'MCQ', 'multiple choice',
+    'disclaimer', 'terms and conditions', 'privacy policy',
+    'advertisement', 'sponsored', 'affiliate',
+    'click here', 'learn more', 'read more', 'subscribe',
+    'newsletter', 'email', 'contact us'
+]
+
+# Sentences containing any of these are dropped
+UNWANTED_SENTENCE_PATTERNS = [
+    'faq', 'question:', 'answer:', 'q:', 'a:', 'disclaimer', 'terms of use', 'privacy policy', 'advertisement'
+]
+
+# Enhanced high relevance criteria - especially for events/hackathons
+HIGH_RELEVANCE_INDICATORS = [
+    'price', 'cost', '$', '₹', 'features', 'specs', 'specifications',
+    'rating', 'review', 'best', 'top', 'comparison', 'vs', 'versus',
+    'model', 'brand', 'display', 'battery', 'camera', 'performance',
+    # Event/hackathon specific indicators
+    'date', 'dates', 'deadline', 'registration', 'apply', 'participate',
+    'september', 'october', 'november', 'december', '2025', '2024',
+    'hackathon', 'competition', 'event', 'challenge', 'contest',
+    'student', 'cse', 'computer science', 'engineering',
+    'prize', 'winner', 'grand finale', 'rounds'
+]
+
+def _trie_pattern(patterns):
     """
-    Filters content by keeping only sentences that contain the query keywords.
-    Enhanced to remove irrelevant sections and focus on core content.
+    Builds a regex alternation of literal patterns merged on common prefixes,
+    e.g. ['date', 'dates', 'deadline'] -> 'd(?:ate(?:s)?|eadline)'. The regex
+    engine then tests one branch per character instead of every pattern, and
+    always matches the longest pattern starting at a position.
     """
-    print(f"Filtering content with keywords: {keywords}")
+    trie = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern:
+            node = node.setdefault(char, {})
+        node[''] = True
     
-    if not content or not keywords:
-        return ""
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+    
+    return build(trie)
+
+def _any_of(patterns):
+    """Compiles a regex that finds any of the (lowercased) substrings."""
+    return re.compile(_trie_pattern({pattern.lower() for pattern in patterns}))
+
+_UNWANTED_SECTION_RE = _any_of(UNWANTED_SECTION_PATTERNS)
+_UNWANTED_SENTENCE_RE = _any_of(UNWANTED_SENTENCE_PATTERNS)
+_HIGH_RELEVANCE_RE = _any_of(HIGH_RELEVANCE_INDICATORS)
+
+class KeywordMatcher:
+    """
+    Counts how many keywords occur in a text (same result as summing
+    `kw in text` over the keyword list) with a single regex pass.
+
+    The regex is a zero-width lookahead over a prefix trie of the keywords, so
+    it reports the longest keyword starting at every position. Shorter keywords
+    that are substrings of a reported one are credited along with it, which
+    makes the overlapping counts exact.
+    """
     
-    # Remove unwanted sections first
-    unwanted_patterns = [
-        'FAQ', 'Frequently Asked Questions', 'Q:', 'A:', 'Question:', 'Answer:',
-        'UPSC', 'exam', 'test', 'quiz', 'MCQ', 'multiple choice',
-        'disclaimer', 'terms and conditions', 'privacy policy',
-        'advertisement', 'sponsored', 'affiliate',
-        'click here', 'learn more', 'read more', 'subscribe',
-        'newsletter', 'email', 'contact us'
-    ]
+    def __init__(self, keywords):
+        multiplicity = {}
+        for keyword in keywords:
+            multiplicity[keyword] = multiplicity.get(keyword, 0) + 1
+        
+        # The empty string is "in" every text
+        self._always = multiplicity.pop('', 0)
+        self._multiplicity = multiplicity
+        
+        patterns = list(multiplicity)
+        self._implied = {p: [q for q in patterns if q in p] for p in patterns}
+        self._regex = re.compile('(?=(' + _trie_pattern(patterns) + '))') if patterns else None
     
+    def count(self, text, limit=None):
+        """
+        Returns the number of keyword matches in text. With a limit, stops
+        scanning as soon as the count reaches it and returns the limit.
+        """
+        total = self._always
+        if self._regex is None or (limit is not None and total >= limit):
+            return total if limit is None else min(total, limit)
+        
+        found = set()
+        for match in self._regex.finditer(text):
+            for keyword in self._implied[match.group(1)]:
+                if keyword not in found:
+                    found.add(keyword)
+                    total += self._multiplicity[keyword]
+            if limit is not None and total >= limit:
+                return limit
+        return total
+
+@lru_cache(maxsize=256)
+def _get_matcher(keywords_lower):
+    return KeywordMatcher(keywords_lower)
+
+def get_keyword_matcher(keywords):
+    """Returns a compiled matcher for the lowercased keywords, built once per keyword set."""
+    return _get_matcher(tuple(kw.lower() for kw in keywords))
+
+def _remove_unwanted_sections(content):
+    """
+    Drops FAQ/ad/boilerplate sections line by line.
+    """
     # Filter out unwanted sections
     lines = content.split('\n')
+    lines_lower = content.lower().split('\n')
     filtered_lines = []
     skip_section = False
     
-    for line in lines:
-        line_lower = line.lower().strip()
-        
+    for line, line_lower in zip(lines, lines_lower):
         # Check if we should skip this section
-        if any(pattern.lower() in line_lower for pattern in unwanted_patterns):
+        if _UNWANTED_SECTION_RE.search(line_lower):
             skip_section = True
             continue
         
@@ -49,50 +172,148 @@ def filter_content(content, keywords):
         if not skip_section and line.strip():
             filtered_lines.append(line)
     
-    content = '\n'.join(filtered_lines)
-        
-    sentences = sent_tokenize(content)
+    return '\n'.join(filtered_lines)
+
+def load_sentence_tokenizer():
+    """
+    Downloads the punkt tokenizer if it is missing and loads it, once per
+    process. Called on first use (or by startup.load_models), not at import.
+    Returns whether the tokenizer is usable.
+    """
+    global _tokenizer_available
+    if _tokenizer_available is not None:
+        return _tokenizer_available
+    with _tokenizer_lock:
+        if _tokenizer_available is None:
+            for resource in PUNKT_RESOURCES:
+                try:
+                    nltk.data.find(f'tokenizers/{resource}')
+                except LookupError:
+                    logger.warning("Downloading NLTK '%s' model...", resource)
+                    nltk.download(resource, quiet=True)
+            try:
+                sent_tokenize("Load the tokenizer. Keep it.")
+                _tokenizer_available = True
+            except LookupError:
+                logger.error("NLTK punkt tokenizer is not available, sentence splitting will fail")
+                _tokenizer_available = False
+    return _tokenizer_available
+
+def split_sentences(content):
+    """
+    Removes boilerplate sections and returns the remaining candidate sentences.
+    """
+    load_sentence_tokenizer()
+    content = _remove_unwanted_sections(content)
     
+    # Skip unwanted sentence patterns
+    return [sentence for sentence in sent_tokenize(content)
+            if not _UNWANTED_SENTENCE_RE.search(sentence.lower())]
+
+def split_sentences_offloaded(content):
+    """split_sentences in the CPU pool. A page that takes too long yields no sentences."""
+    try:
+        return cpu_pool.run(split_sentences, content)
+    except TimeoutError as e:
+        logger.warning("Giving up on splitting a page into sentences: %s", e)
+        return []
+
+def tier_sentences(sentences, keywords):
+    """
+    Sorts candidate sentences into (high_relevance, medium_relevance).
+    """
     # Create different relevance levels
     high_relevance = []
     medium_relevance = []
     
-    # Convert keywords to lowercase for better matching
-    keywords_lower = [kw.lower() for kw in keywords]
+    matcher = get_keyword_matcher(keywords)
     
     for sentence in sentences:
         sentence_lower = sentence.lower()
         
-        # Skip unwanted sentence patterns
-        if any(pattern in sentence_lower for pattern in [
-            'faq', 'question:', 'answer:', 'q:', 'a:', 'disclaimer', 'terms of use', 'privacy policy', 'advertisement'
-        ]):
+        # High relevance: contains specific indicators or multiple keywords
+        if _HIGH_RELEVANCE_RE.search(sentence_lower):
+            high_relevance.append(sentence)
             continue
         
         # Count keyword matches
-        matches = sum(1 for kw in keywords_lower if kw in sentence_lower)
-        
-        # Enhanced high relevance criteria - especially for events/hackathons
-        high_relevance_indicators = [
-            'price', 'cost', '$', '₹', 'features', 'specs', 'specifications',
-            'rating', 'review', 'best', 'top', 'comparison', 'vs', 'versus',
-            'model', 'brand', 'display', 'battery', 'camera', 'performance',
-            # Event/hackathon specific indicators
-            'date', 'dates', 'deadline', 'registration', 'apply', 'participate',
-            'september', 'october', 'november', 'december', '2025', '2024',
-            'hackathon', 'competition', 'event', 'challenge', 'contest',
-            'student', 'cse', 'computer science', 'engineering',
-            'prize', 'winner', 'grand finale', 'rounds'
-        ]
-        
-        # High relevance: contains multiple keywords or specific indicators
-        if (matches >= 2 or 
-            any(indicator in sentence_lower for indicator in high_relevance_indicators)):
+        matches = matcher.count(sentence_lower, limit=2)
+        if matches >= 2:
             high_relevance.append(sentence)
         # Medium relevance: contains at least one keyword
         elif matches >= 1:
             medium_relevance.append(sentence)
     
+    return high_relevance, medium_relevance
+
+def classify_sentences(content, keywords):
+    """
+    Splits content into sentences and sorts them into (high_relevance, medium_relevance).
+    """
+    return tier_sentences(split_sentences_offloaded(content), keywords)
+
+def rank_sentences(sentences, keywords, char_budget=FILTER_CHAR_BUDGET, k1=BM25_K1, b=BM25_B):
+    """
+    Scores every sentence against the keywords with BM25 in one batch of NumPy
+    operations and returns the best ones, highest score first, within char_budget.
+    """
+    if not sentences or not keywords:
+        return []
+    
+    # Query terms: individual tokens of the (possibly multi-word) keywords
+    terms = {}
+    for keyword in keywords:
+        for token in _TOKEN_RE.findall(keyword.lower()):
+            terms.setdefault(token, len(terms))
+    if not terms:
+        return []
+    
+    # Sentence x term frequency matrix, only for the query terms
+    lengths = np.empty(len(sentences), dtype=np.float32)
+    rows = []
+    cols = []
+    for i, sentence in enumerate(sentences):
+        tokens = _TOKEN_RE.findall(sentence.lower())
+        lengths[i] = len(tokens)
+        for token in tokens:
+            col = terms.get(token)
+            if col is not None:
+                rows.append(i)
+                cols.append(col)
+    if not rows:
+        return []
+    
+    tf = np.zeros((len(sentences), len(terms)), dtype=np.float32)
+    np.add.at(tf, (np.array(rows), np.array(cols)), 1)
+    
+    n = len(sentences)
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    avg_length = max(float(lengths.mean()), 1.0)
+    
+    norm = k1 * (1 - b + b * lengths / avg_length)
+    scores = ((tf * (k1 + 1)) / (tf + norm[:, None])) @ idf
+    
+    # Greedily take the best sentences that still fit in the budget
+    selected = []
+    used = 0
+    for i in np.argsort(-scores, kind='stable'):
+        if scores[i] <= 0:
+            break
+        size = len(sentences[i]) + 1
+        if used + size > char_budget:
+            continue
+        selected.append(sentences[i])
+        used += size
+    
+    return selected
+
+def select_sentences(high_relevance, medium_relevance, keywords):
+    """
+    Picks the final sentences from the relevance tiers and joins them.
+    """
+    keywords_lower = [kw.lower() for kw in keywords]
+    
     # For simple explanation requests, limit content more aggressively
     query_terms = ' '.join(keywords_lower)
     if any(term in query_terms for term in ['simple', 'explain', 'basic', 'introduction']):
@@ -102,8 +323,163 @@ def filter_content(content, keywords):
         # Combine results, prioritizing high relevance
         filtered_sentences = high_relevance + medium_relevance[:20]
     
-    result = " ".join(filtered_sentences)
-    print(f"Filtered content length: {len(result)} characters")
+    return " ".join(filtered_sentences)
+
+def filter_content(content, keywords, mode=FILTER_MODE):
+    """
+    Filters content by keeping only sentences that contain the query keywords.
+    Enhanced to remove irrelevant sections and focus on core content.
+    
+    mode='tiers' keeps high/medium relevance sentences in document order;
+    mode='bm25' keeps the top BM25-scored sentences within FILTER_CHAR_BUDGET;
+    mode='dense' keeps the passages closest to the keywords' embedding, like
+    DocumentFilter (falling back to the tiers when embeddings are unavailable).
+    """
+    logger.debug("Filtering content with keywords: %s", keywords)
+    
+    _check_mode(mode)
+    if not content or not keywords:
+        return ""
+    
+    if mode == 'dense':
+        doc_filter = DocumentFilter(keywords, mode=mode)
+        doc_filter.add(0, content)
+        return doc_filter.result()
+    
+    with timed('filter'):
+        if mode == 'bm25':
+            result = " ".join(rank_sentences(split_sentences_offloaded(content), keywords))
+        else:
+            high_relevance, medium_relevance = classify_sentences(content, keywords)
+            result = select_sentences(high_relevance, medium_relevance, keywords)
+    logger.info("Filtered content length: %d characters", len(result))
     
     return result
 
+class DocumentFilter:
+    """
+    Filters scraped pages one at a time as they arrive, instead of joining
+    everything into one string first. Reports when enough high-relevance text
+    has been collected so the caller can stop scraping early.
+    """
+    
+    def __init__(self, keywords, char_budget=FILTER_CHAR_BUDGET, mode=FILTER_MODE, query=None):
+        _check_mode(mode)
+        self.keywords = keywords
+        self.char_budget = char_budget
+        self.mode = mode
+        self.query = query or ' '.join(keywords)
+        self.high_chars = 0
+        self.documents = 0
+        self._sentences = {}
+        self._tiers = {}
+        self._dense_docs = {}
+    
+    def add(self, index, text):
+        """
+        Filters one page. index is its position in the URL list, so the final
+        result is ordered the same way regardless of arrival order.
+        Returns True once the budget is full.
+        """
+        if text and self.keywords:
+            with timed('filter'):
+                sentences = split_sentences_offloaded(text)
+                high_relevance, medium_relevance = tier_sentences(sentences, self.keywords)
+            if self.mode == 'bm25':
+                self._sentences[index] = sentences
+            elif self.mode == 'dense':
+                self._dense_docs[index] = _store_document(text)
+            self._tiers[index] = (high_relevance, medium_relevance)
+            self.high_chars += sum(len(sentence) + 1 for sentence in high_relevance)
+            self.documents += 1
+        return self.is_full
+    
+    @property
+    def is_full(self):
+        return self.high_chars >= self.char_budget
+    
+    def result(self):
+        with timed('filter_select'):
+            result = self._select()
+        logger.info("Filtered content length: %d characters from %d documents", len(result), self.documents)
+        return result
+    
+    def _select(self):
+        if self.mode == 'dense':
+            selected = self._select_dense()
+            if selected is not None:
+                return selected
+            # Without embeddings, fall back to the keyword tiers
+        
+        if self.mode == 'bm25':
+            sentences = [sentence for index in sorted(self._sentences) for sentence in self._sentences[index]]
+            return " ".join(rank_sentences(sentences, self.keywords, self.char_budget))
+        
+        high_relevance = []
+        medium_relevance = []
+        for index in sorted(self._tiers):
+            high_relevance.extend(self._tiers[index][0])
+            medium_relevance.extend(self._tiers[index][1])
+        
+        return select_sentences(high_relevance, medium_relevance, self.keywords)
+    
+    def _select_dense(self):
+        """
+        The passages of this request's pages most similar to the query, best
+        first within char_budget, or None when embeddings are unavailable.
+        """
+        docs = [self._dense_docs[index] for index in sorted(self._dense_docs) if self._dense_docs[index]]
+        if not docs:
+            return None
+        store = get_vector_store()
+        query_vector = store.embed_query(self.query)
+        if query_vector is None:
+            return None
+        
+        selected = []
+        used = 0
+        for passage in store.search(query_vector, docs):
+            if passage['score'] <= 0:
+                break
+            size = len(passage['text']) + 1
+            if used + size > self.char_budget:
+                continue
+            selected.append(passage['text'])
+            used += size
+        return " ".join(selected)
+
+def _store_document(text):
+    """
+    The page's document key in the vector store. A page is embedded and stored
+    the first time it is seen (keyed by a hash of its text); later queries that
+    scrape it again only look it up. None if it could not be embedded.
+    """
+    try:
+        store = get_vector_store()
+        doc = document_key(text)
+        if store.has_document(doc):
+            return doc
+        return store.add_document(text)
+    except Exception as e:
+        logger.warning("Could not add page to the vector store: %s", e)
+        return None
+
+def filter_documents(documents, keywords, char_budget=FILTER_CHAR_BUDGET, mode=FILTER_MODE, query=None):
+    """
+    Filters an iterable of (index, text) pages, e.g. from iter_scraped, as they
+    arrive. Stops consuming (and closes the iterable) once the budget is full.
+    """
+    logger.debug("Filtering content with keywords: %s", keywords)
+    
+    doc_filter = DocumentFilter(keywords, char_budget, mode, query)
+    try:
+        for index, text in documents:
+            if doc_filter.add(index, text):
+                logger.info("Collected %d characters of relevant content, stopping early", doc_filter.high_chars)
+                break
+    finally:
+        close = getattr(documents, 'close', None)
+        if close:
+            close()
+    
+    return doc_filter.result()
@@ -1,25 +1,98 @@
 # query_understanding.py
-import spacy
+import os
+import logging
+import threading
+from collections import OrderedDict
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+KEYWORD_CACHE_SIZE = int(os.getenv('KEYWORD_CACHE_SIZE', 1024))
+
+# Keyword extraction only needs POS tags, so skip the parser, NER and lemmatizer
+DISABLED_COMPONENTS = ["parser", "ner", "lemmatizer"]
+
+SPACY_MODEL = "en_core_web_sm"
+
+# Appended to the keywords of "upcoming"/"current" style queries
+RECENCY_KEYWORDS = ['2025', '2024', 'upcoming', 'current', 'latest', 'september', 'october', 'november', 'december']
+
+# Loaded on first use (or by startup.load_models), not at import
+_nlp = None
+_nlp_lock = threading.Lock()
+
+
+def get_nlp():
+    """Returns the spaCy pipeline, loading it once per process and downloading the model if missing."""
+    global _nlp
+    if _nlp is None:
+        with _nlp_lock:
+            if _nlp is None:
+                import spacy
+                try:
+                    _nlp = spacy.load(SPACY_MODEL, exclude=DISABLED_COMPONENTS)
+                except OSError:
+                    logger.warning("Downloading spaCy model...")
+                    from spacy.cli import download
+                    download(SPACY_MODEL)
+                    _nlp = spacy.load(SPACY_MODEL, exclude=DISABLED_COMPONENTS)
+    return _nlp
+
+# LRU memo of recent queries -> keywords
+_keyword_cache = OrderedDict()
+_keyword_cache_lock = threading.Lock()
+
+
+def _cache_get(query):
+    with _keyword_cache_lock:
+        keywords = _keyword_cache.get(query)
+        if keywords is not None:
+            _keyword_cache.move_to_end(query)
+            return list(keywords)
+    return None
+
+
+def _cache_put(query, keywords):
+    with _keyword_cache_lock:
+        _keyword_cache[query] = tuple(keywords)
+        _keyword_cache.move_to_end(query)
+        while len(_keyword_cache) > KEYWORD_CACHE_SIZE:
+            _keyword_cache.popitem(last=False)
 
-# Load the spaCy model
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    print("Downloading spaCy model...")
-    from spacy.cli import download
-    download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
 
 def extract_keywords(query):
     """
     Enhanced keyword extraction for better search results and current information
     """
-    print(f"Extracting keywords from: {query}")
+    with timed('keywords'):
+        cached = _cache_get(query)
+        if cached is not None:
+            logger.debug("Extracted keywords (cached): %s", cached)
+            return cached
+        
+        keywords = _keywords_from_doc(get_nlp()(query), query)
+        _cache_put(query, keywords)
     
-    # Load spacy model
-    nlp = spacy.load("en_core_web_sm")
-    doc = nlp(query)
+    logger.debug("Extracted keywords: %s", keywords)
+    return keywords
+
+
+def extract_keywords_many(queries, batch_size=64):
+    """
+    Extracts keywords for several queries at once, batching the uncached ones through nlp.pipe.
+    """
+    results = [_cache_get(query) for query in queries]
+    pending = [i for i, keywords in enumerate(results) if keywords is None]
     
+    pending_queries = [queries[i] for i in pending]
+    for i, doc in zip(pending, get_nlp().pipe(pending_queries, batch_size=batch_size)):
+        results[i] = _keywords_from_doc(doc, queries[i])
+        _cache_put(queries[i], results[i])
+    
+    return results
+
+
+def _keywords_from_doc(doc, query):
     # Extract meaningful tokens (nouns, proper nouns, adjectives, and verbs)
     keywords = []
     for token in doc:
@@ -35,7 +108,7 @@ def extract_keywords(query):
     
     # Enhanced time-specific keywords for current/upcoming events
     if any(word in query_lower for word in ['upcoming', 'current', '2025', 'this year', 'next']):
-        keywords.extend(['2025', '2024', 'upcoming', 'current', 'latest', 'september', 'october', 'november', 'december'])
+        keywords.extend(RECENCY_KEYWORDS)
     
     # Enhanced domain-specific keywords for hackathons
     if 'hackathon' in query_lower:
@@ -66,10 +139,4 @@ def extract_keywords(query):
         if keyword not in unique_keywords:
             unique_keywords.append(keyword)
     
-    print(f"Extracted keywords: {unique_keywords}")
-    return unique_keywords
-    keywords = list(set(keywords))
-    
-    print(f"Extracted keywords: {keywords}")
-    return keywords if keywords else query.split()
-
+    return unique_keywords if unique_keywords else query.split()
@@ -0,0 +1,145 @@
+# search_cache.py
+import os
+import json
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from .page_cache import CACHE_DIR
+from .metrics import register_stats
+from .query_understanding import RECENCY_KEYWORDS
+from .sqlite_db import ThreadLocalConnection
+
+SEARCH_CACHE_PATH = os.getenv('SEARCH_CACHE_PATH', os.path.join(CACHE_DIR, 'search.sqlite3'))
+SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 3600))
+SEARCH_CACHE_MEMORY_SIZE = int(os.getenv('SEARCH_CACHE_MEMORY_SIZE', 512))
+
+# The block extract_keywords() injects for "upcoming"/"current" style queries.
+# When all of it is present it is collapsed into one marker; years and months
+# typed on their own stay part of the key.
+RECENCY_TERMS = frozenset(RECENCY_KEYWORDS)
+RECENCY_MARKER = '@recent'
+
+
+def normalize_keywords(keywords):
+    """
+    Builds a canonical form of a keyword list: lowercased, deduplicated,
+    order-insensitive, with the auto-injected recency block collapsed.
+    """
+    if isinstance(keywords, str):
+        keywords = keywords.split()
+
+    terms = set()
+    for keyword in keywords:
+        term = ' '.join(str(keyword).lower().split())
+        if term:
+            terms.add(term)
+
+    if RECENCY_TERMS <= terms:
+        terms -= RECENCY_TERMS
+        terms.add(RECENCY_MARKER)
+
+    return sorted(terms)
+
+
+def search_cache_key(keywords, num_results):
+    normalized = normalize_keywords(keywords)
+    raw = json.dumps([normalized, num_results])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class SearchCache:
+    """
+    Two-tier cache of search result URLs: a small in-memory LRU in front of a
+    SQLite table that survives restarts and is shared by worker processes.
+    """
+
+    def __init__(self, path=SEARCH_CACHE_PATH, ttl=SEARCH_CACHE_TTL, memory_size=SEARCH_CACHE_MEMORY_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._connect = ThreadLocalConnection(path)
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS search_results (
+                key TEXT PRIMARY KEY,
+                urls TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        self._connect().execute('CREATE INDEX IF NOT EXISTS search_results_expires_at ON search_results (expires_at)')
+
+    def get(self, keywords, num_results):
+        """Returns the cached URL list, or None on a miss."""
+        key = search_cache_key(keywords, num_results)
+        now = time.time()
+
+        with self._lock:
+            item = self._memory.get(key)
+            if item and item[1] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return list(item[0])
+
+        row = self._connect().execute(
+            'SELECT urls, expires_at FROM search_results WHERE key = ? AND expires_at > ?', (key, now)
+        ).fetchone()
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            urls = json.loads(row[0])
+            self._remember(key, urls, row[1])
+            return list(urls)
+
+    def put(self, keywords, num_results, urls):
+        if not urls:
+            return
+        key = search_cache_key(keywords, num_results)
+        expires_at = time.time() + self.ttl
+
+        with self._lock:
+            self._remember(key, list(urls), expires_at)
+
+        conn = self._connect()
+        conn.execute('INSERT OR REPLACE INTO search_results (key, urls, expires_at) VALUES (?, ?, ?)',
+                     (key, json.dumps(list(urls)), expires_at))
+        conn.execute('DELETE FROM search_results WHERE expires_at <= ?', (time.time(),))
+
+    def _remember(self, key, urls, expires_at):
+        self._memory[key] = (urls, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                'memory_entries': len(self._memory),
+            }
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache():
+    """Returns the process-wide search cache."""
+    global _search_cache
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = SearchCache()
+                register_stats('search_cache', _search_cache.stats)
+    return _search_cache
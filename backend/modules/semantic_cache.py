@@ -0,0 +1,177 @@
+# semantic_cache.py
+import os
+import re
+import logging
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import ollama
+from .answer_cache import context_key
+from .metrics import register_stats
+
+logger = logging.getLogger(__name__)
+
+SEMANTIC_CACHE_ENABLED = os.getenv('SEMANTIC_CACHE_ENABLED', 'true').lower() == 'true'
+# Small embedding model served by Ollama (`ollama pull nomic-embed-text`)
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'nomic-embed-text')
+# Minimum cosine similarity for two queries to share an answer
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.92))
+SEMANTIC_CACHE_TTL = int(os.getenv('SEMANTIC_CACHE_TTL', 600))
+SEMANTIC_CACHE_SIZE = int(os.getenv('SEMANTIC_CACHE_SIZE', 1000))
+
+# Texts per Ollama embed call when embedding many at once
+EMBEDDING_BATCH_SIZE = 32
+# Recently embedded queries, so put() doesn't embed the query lookup() just saw
+EMBEDDING_MEMO_SIZE = 256
+# After a failed embedding call (e.g. model not pulled), skip the cache this long
+EMBEDDING_RETRY_DELAY = 60
+
+_NUMBER_RE = re.compile(r'\d+(?:[.,]\d+)*')
+
+
+def query_numbers(query):
+    """
+    Numbers in a query ("under 5000", "top 5"). Paraphrases must agree on them:
+    embeddings barely separate "under 5000" from "under 50000".
+    """
+    return frozenset(n.replace(',', '') for n in _NUMBER_RE.findall(query))
+
+
+def embed(text):
+    """Returns the L2-normalized embedding of text as a float32 vector."""
+    response = ollama.embed(model=EMBEDDING_MODEL, input=text)
+    vector = np.asarray(response['embeddings'][0], dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def embed_many(texts, batch_size=EMBEDDING_BATCH_SIZE):
+    """Embeds texts in batches. Returns an L2-normalized float32 matrix with one row per text."""
+    rows = []
+    for start in range(0, len(texts), batch_size):
+        response = ollama.embed(model=EMBEDDING_MODEL, input=list(texts[start:start + batch_size]))
+        rows.extend(response['embeddings'])
+    matrix = np.asarray(rows, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class SemanticCache:
+    """
+    In-memory cache of answers looked up by query meaning rather than exact text.
+
+    Query embeddings are rows of a preallocated NumPy matrix, so a lookup is one
+    matrix-vector product. A row only matches when it is fresh, was answered in the
+    same conversation context, and mentions the same numbers as the new query.
+    When full, expired rows are reused first, then the oldest.
+    """
+
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, ttl=SEMANTIC_CACHE_TTL, size=SEMANTIC_CACHE_SIZE,
+                 enabled=SEMANTIC_CACHE_ENABLED):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.ttl = ttl
+        self.size = max(1, size)
+        self._lock = threading.Lock()
+        self._vectors = None  # allocated once the embedding size is known
+        self._created_at = np.zeros(self.size)
+        self._entries = [None] * self.size  # (context, numbers, query, result)
+        self._memo = OrderedDict()
+        self._retry_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _embedding(self, query):
+        """Embeds query, or returns None if embeddings are unavailable."""
+        with self._lock:
+            vector = self._memo.get(query)
+            if vector is not None or not self.enabled or time.time() < self._retry_at:
+                return vector
+        try:
+            vector = embed(query)
+        except Exception as e:
+            with self._lock:
+                self.errors += 1
+                self._retry_at = time.time() + EMBEDDING_RETRY_DELAY
+            logger.warning("Could not embed query for the semantic cache: %s", e)
+            return None
+        with self._lock:
+            self._memo[query] = vector
+            while len(self._memo) > EMBEDDING_MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return vector
+
+    def lookup(self, query, conversation_history=None):
+        """Returns the cached answer to the most similar earlier query, or None."""
+        vector = self._embedding(query)
+        if vector is None:
+            return None
+
+        context = context_key(conversation_history)
+        numbers = query_numbers(query)
+        with self._lock:
+            if self._vectors is not None and self._vectors.shape[1] == vector.shape[0]:
+                scores = self._vectors @ vector
+                scores[self._created_at <= time.time() - self.ttl] = -1.0
+                for i in np.argsort(scores)[::-1]:
+                    if scores[i] < self.threshold:
+                        break
+                    entry = self._entries[i]
+                    if entry[0] == context and entry[1] == numbers:
+                        self.hits += 1
+                        logger.info("Semantic cache hit: '%s' ~ '%s' (%.3f)", query, entry[2], scores[i])
+                        return entry[3]
+            self.misses += 1
+            return None
+
+    def put(self, query, conversation_history, result):
+        vector = self._embedding(query)
+        if vector is None:
+            return
+
+        entry = (context_key(conversation_history), query_numbers(query), query, dict(result))
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                # First entry, or the embedding model changed
+                self._vectors = np.zeros((self.size, vector.shape[0]), dtype=np.float32)
+                self._created_at[:] = 0
+                self._entries = [None] * self.size
+            # Replace this query's previous answer, else the oldest row
+            # (never-used and expired rows have the smallest timestamps)
+            slot = next((i for i, e in enumerate(self._entries) if e and e[0] == entry[0] and e[2] == query), None)
+            if slot is None:
+                slot = int(np.argmin(self._created_at))
+            self._vectors[slot] = vector
+            self._created_at[slot] = time.time()
+            self._entries[slot] = entry
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            fresh = int(np.count_nonzero(self._created_at > time.time() - self.ttl)) if self._vectors is not None else 0
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'errors': self.errors,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': fresh,
+                'size': self.size,
+                'threshold': self.threshold,
+            }
+
+
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+
+def get_semantic_cache():
+    """Returns the process-wide semantic cache."""
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache()
+                register_stats('semantic_cache', _semantic_cache.stats)
+    return _semantic_cache
@@ -0,0 +1,236 @@
+# single_flight.py
+import asyncio
+import threading
+
+# The broadcast being produced on this thread, see stream_abandoned
+_producing = threading.local()
+
+
+def stream_abandoned():
+    """
+    Whether every subscriber of the SingleFlight stream being produced on this
+    thread has gone away. Long waits inside the generator (e.g. for an LLM slot)
+    poll it to give up early. Always False outside a shared stream.
+    """
+    broadcast = getattr(_producing, 'broadcast', None)
+    return broadcast is not None and broadcast.abandoned.is_set()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class _Broadcast:
+    """Events produced so far by one shared stream, replayed to every subscriber."""
+
+    def __init__(self, lock):
+        self.events = []
+        self.finished = False
+        self.error = None
+        self.subscribers = 0
+        self.abandoned = threading.Event()
+        self.changed = threading.Condition(lock)
+
+
+class SingleFlight:
+    """
+    Deduplicates identical in-flight work. Callers with the same key attach to
+    the execution already running instead of starting their own.
+
+    do() shares a return value. stream() shares a generator's events: it is run
+    by a background thread into a buffer every subscriber reads from (late
+    subscribers replay it from the start), and is closed once nobody is listening.
+    The generator can call stream_abandoned() to notice that while it waits.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+        self.coalesced = 0
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stream(self, key, gen_fn, *args):
+        with self._lock:
+            broadcast = self._streams.get(key)
+            if broadcast is None:
+                broadcast = self._streams[key] = _Broadcast(self._lock)
+                threading.Thread(target=self._produce, args=(key, broadcast, gen_fn(*args)),
+                                 name='single-flight-stream', daemon=True).start()
+            else:
+                self.coalesced += 1
+            broadcast.subscribers += 1
+
+        seen = 0
+        try:
+            while True:
+                with self._lock:
+                    broadcast.changed.wait_for(lambda: seen < len(broadcast.events) or broadcast.finished)
+                    pending = broadcast.events[seen:]
+                    finished = broadcast.finished
+                seen += len(pending)
+                yield from pending
+                if finished:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+        finally:
+            with self._lock:
+                broadcast.subscribers -= 1
+                if broadcast.subscribers == 0 and not broadcast.finished:
+                    # Every client went away: stop the work, and let new callers start afresh
+                    broadcast.abandoned.set()
+                    if self._streams.get(key) is broadcast:
+                        del self._streams[key]
+
+    def _produce(self, key, broadcast, gen):
+        _producing.broadcast = broadcast
+        try:
+            for event in gen:
+                if broadcast.abandoned.is_set():
+                    break
+                with self._lock:
+                    broadcast.events.append(event)
+                    broadcast.changed.notify_all()
+        except Exception as e:
+            broadcast.error = e
+        finally:
+            gen.close()
+            _producing.broadcast = None
+            with self._lock:
+                broadcast.finished = True
+                if self._streams.get(key) is broadcast:
+                    del self._streams[key]
+                broadcast.changed.notify_all()
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._calls) + len(self._streams), 'coalesced': self.coalesced}
+
+
+# --- Async version (used by app_async.py) ---
+
+class _AsyncFlight:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class _AsyncBroadcast:
+    def __init__(self):
+        self.events = []
+        self.finished = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self.changed = asyncio.Condition()
+
+
+class AsyncSingleFlight:
+    """
+    Async version of SingleFlight. The shared work runs as its own task and is
+    cancelled only when every caller waiting on it has been cancelled.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._streams = {}
+        self.coalesced = 0
+
+    async def do(self, key, coro_fn, *args):
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = self._calls[key] = _AsyncFlight(asyncio.ensure_future(coro_fn(*args)))
+            flight.task.add_done_callback(lambda _: self._forget(self._calls, key, flight))
+        else:
+            self.coalesced += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._forget(self._calls, key, flight)
+                flight.task.cancel()
+
+    async def stream(self, key, agen_fn, *args):
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = self._streams[key] = _AsyncBroadcast()
+            broadcast.task = asyncio.create_task(self._produce(key, broadcast, agen_fn(*args)))
+        else:
+            self.coalesced += 1
+        broadcast.subscribers += 1
+
+        seen = 0
+        try:
+            while True:
+                async with broadcast.changed:
+                    await broadcast.changed.wait_for(lambda: seen < len(broadcast.events) or broadcast.finished)
+                pending = broadcast.events[seen:]
+                finished = broadcast.finished
+                seen += len(pending)
+                for event in pending:
+                    yield event
+                if finished:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.task.done():
+                # Every client went away, stop the work
+                self._forget(self._streams, key, broadcast)
+                broadcast.task.cancel()
+
+    async def _produce(self, key, broadcast, agen):
+        try:
+            async for event in agen:
+                broadcast.events.append(event)
+                async with broadcast.changed:
+                    broadcast.changed.notify_all()
+        except Exception as e:
+            broadcast.error = e
+        finally:
+            await agen.aclose()
+            broadcast.finished = True
+            self._forget(self._streams, key, broadcast)
+            async with broadcast.changed:
+                broadcast.changed.notify_all()
+
+    @staticmethod
+    def _forget(flights, key, flight):
+        if flights.get(key) is flight:
+            del flights[key]
+
+    def stats(self):
+        return {'in_flight': len(self._calls) + len(self._streams), 'coalesced': self.coalesced}
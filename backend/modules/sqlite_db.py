@@ -0,0 +1,36 @@
+# sqlite_db.py
+import os
+import sqlite3
+import threading
+
+
+class ThreadLocalConnection:
+    """
+    Callable returning this thread's connection to one SQLite file, opened on
+    first use. Shared by the caches, the local index and the other on-disk
+    stores, which are all used from many threads and worker processes:
+
+    - WAL mode, so readers never block the writer (and vice versa), with
+      synchronous=NORMAL, which is safe under WAL and much cheaper per commit.
+    - Autocommit (isolation_level=None); use BEGIN IMMEDIATE for read-modify-write.
+    - A connection is never reused in a forked child; it gets its own.
+    """
+
+    def __init__(self, path, row_factory=None, timeout=30):
+        self.path = path
+        self.row_factory = row_factory
+        self.timeout = timeout
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def __call__(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
@@ -0,0 +1,64 @@
+# startup.py
+import time
+import logging
+import threading
+from . import cpu_pool
+from .query_understanding import get_nlp
+from .pre_filtering import load_sentence_tokenizer
+from .browser_pool import get_browser_pool, BROWSER_POOL_PRELAUNCH, BROWSER_SEARCH_ENABLED
+
+logger = logging.getLogger(__name__)
+
+_models_loaded = threading.Event()
+_models_lock = threading.Lock()
+
+
+def load_models():
+    """
+    Loads the spaCy model and the NLTK sentence tokenizer, downloading them if
+    missing. A preforking server calls this in its master process, so every
+    worker shares one copy of the models copy-on-write.
+    """
+    with _models_lock:
+        if _models_loaded.is_set():
+            return
+        started = time.perf_counter()
+        get_nlp()
+        if not load_sentence_tokenizer():
+            raise RuntimeError("the NLTK punkt tokenizer could not be loaded")
+        _models_loaded.set()
+        logger.info("Models loaded in %.1fs", time.perf_counter() - started)
+
+
+def start_worker():
+    """Starts the per-process pools. A preforking server calls this in each worker after the fork."""
+    cpu_pool.get_cpu_pool()
+    if BROWSER_SEARCH_ENABLED and BROWSER_POOL_PRELAUNCH:
+        get_browser_pool()
+
+
+def warm_up():
+    """Loads the models and starts the pools of a single-process server."""
+    load_models()
+    start_worker()
+
+
+def _warm_up_logged():
+    try:
+        warm_up()
+    except Exception:
+        logger.exception("Warm-up failed, the server will stay not ready")
+
+
+def warm_up_async():
+    """Runs warm_up in the background so the server accepts connections (and reports not ready) meanwhile."""
+    threading.Thread(target=_warm_up_logged, name='warm-up', daemon=True).start()
+
+
+def readiness():
+    """Returns (ready, checks): ready once the models are loaded and the CPU pool workers are up."""
+    checks = {
+        'models': _models_loaded.is_set(),
+        'cpu_pool': cpu_pool.is_ready(),
+    }
+    return all(checks.values()), checks
@@ -1,14 +1,116 @@
 # summarization.py
+import os
+import asyncio
+import logging
 import ollama
 import re
 import json
+from .token_counter import count_tokens, fit_to_budget
+from .llm_scheduler import get_llm_scheduler, prompt_priority, LLMBusy
+from .single_flight import stream_abandoned
+from .metrics import timed, observe_ollama
 
-def summarize_and_structure(content, query, conversation_history=None):
-    """
-    Advanced AI assistant that provides exceptional, ChatGPT-level responses with creative formatting.
+logger = logging.getLogger(__name__)
+
+MODEL = os.getenv('OLLAMA_MODEL', 'llama3.1')
+
+# Token budget for the whole prompt, and the context window requested from Ollama
+# (must leave room for the response)
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', 6000))
+OLLAMA_NUM_CTX = int(os.getenv('OLLAMA_NUM_CTX', 8192))
+
+# Conversation history gets at most this share of the budget
+HISTORY_BUDGET_SHARE = 0.15
+HISTORY_MAX_MESSAGES = 6
+HISTORY_MAX_CHARS = 300
+
+# Slack for small differences in the final rendering (e.g. character counts)
+BUDGET_SAFETY_MARGIN = 16
+
+# How long Ollama keeps the model (and its prompt cache) loaded between requests
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+
+# Static instructions, identical for every request. Anything per-request goes
+# in the user message so this stays a shared, cacheable prefix.
+SYSTEM_PROMPT = """You are ChatGPT, an AI assistant that provides exceptionally well-structured and formatted responses.
+
+**CRITICAL FORMATTING INSTRUCTIONS - MATCH CHATGPT EXACTLY:**
+
+1. **USE PROPER MARKDOWN FORMATTING**:
+   - Main headings: ## Heading (with ##)
+   - Subheadings: ### Subheading (with ###)
+   - Code blocks: ```language\ncode here\n```
+   - Inline code: `code`
+   - Bold text: **important text**
+   - Lists: Use proper numbered lists (1. 2. 3.) and bullet points (-)
+
+2. **STRUCTURE LIKE CHATGPT**:
+   - Start with brief intro
+   - Use clear section headers with ##
+   - Break down complex topics into numbered steps
+   - Include code examples in proper code blocks
+   - End with summary or next steps
+
+3. **CODE FORMATTING EXAMPLE**:
+   ```python
+   import requests
+   
+   def example_function():
+       # Clear comments
+       return "proper formatting"
+   ```
+
+4. **FOR TECHNICAL QUERIES**:
+   - Include "## Prerequisites" section
+   - Show "## Code Example" with proper syntax
+   - Add "## How to Use" section
+   - Include step-by-step instructions
+
+5. **FOR LIST QUERIES** (hackathons, products, etc.):
+   - Use "## Summary Table" with proper markdown tables
+   - Include "## What You Can Do Next" section
+   - Use exact data from web content
+
+6. **RESPONSE STRUCTURE TEMPLATE**:
+   ```
+   Brief introduction paragraph
+
+   ## Main Section Header
+   
+   Content with proper formatting
+   
+   ### Subsection
+   
+   More detailed content
+   
+   ```language
+   code example if applicable
+   ```
+   
+   ## Next Steps or Summary
+   
+   Final recommendations
+   ```
+
+**YOUR MISSION**: Create a response that matches ChatGPT's exact formatting style with proper headers, code blocks, and structured content."""
+
+_system_tokens = None
+
+def _system_prompt_tokens():
+    global _system_tokens
+    if _system_tokens is None:
+        _system_tokens = count_tokens(SYSTEM_PROMPT)
+    return _system_tokens
+
+def build_prompt(content, query, conversation_history=None, token_budget=PROMPT_TOKEN_BUDGET):
     """
-    print("Creating AI response...")
+    Builds the LLM chat messages from the filtered web content, query and conversation history,
+    keeping them within token_budget. Returns (messages, prompt_tokens) where prompt_tokens
+    breaks the count down into instructions, history and evidence.
     
+    The first message is always the byte-identical SYSTEM_PROMPT, so Ollama can
+    reuse its cached prefix instead of re-processing the instructions every time.
+    """
     # Enhanced query analysis
     query_lower = query.lower()
     
@@ -124,14 +226,8 @@ def summarize_and_structure(content, query, conversation_history=None):
 - End with personalized recommendation
 """
     
-    # Build conversation context if available
-    context_section = ""
-    if conversation_history and len(conversation_history) > 0:
-        context_section = "\n\n**Previous Conversation Context:**\n"
-        for i, msg in enumerate(conversation_history[-4:]):  # Include last 4 messages for context
-            role = "User" if msg.get('sender') == 'user' else "Assistant"
-            context_section += f"{role}: {msg.get('text', '')[:100]}{'...' if len(msg.get('text', '')) > 100 else ''}\n"
-        context_section += "\n"
+    # Build conversation context if available, within its share of the token budget
+    context_section = history_context(conversation_history, token_budget)
     
     # Clean formatting instructions - ChatGPT style
     formatting_instructions = ""
@@ -146,6 +242,48 @@ Create clean tables using this format:
 Keep headers descriptive and data well-organized.
 """
     
+    # Per-request part of the prompt. The static instructions live in SYSTEM_PROMPT,
+    # sent first so every request shares the same prefix
+    def render(evidence, content_instruction):
+        return f"""**USER QUERY:** {query}
+{context_section}
+
+**CURRENT WEB DATA:**
+{evidence}
+
+{content_instruction}
+
+Generate your properly formatted response now:"""
+    
+    # Instructions and history are fixed; whatever budget they leave goes to
+    # the web evidence, trimmed from its least relevant end
+    system_tokens = _system_prompt_tokens()
+    fixed_tokens = system_tokens + count_tokens(render("", _content_instruction(content))) + BUDGET_SAFETY_MARGIN
+    evidence, _ = fit_to_budget(content, token_budget - fixed_tokens)
+    if len(evidence) < len(content):
+        logger.info("Trimmed web evidence from %d to %d characters to fit the token budget", len(content), len(evidence))
+    
+    user_prompt = render(evidence, _content_instruction(evidence))
+    messages = [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': user_prompt},
+    ]
+    
+    total_tokens = system_tokens + count_tokens(user_prompt)
+    history_tokens = count_tokens(context_section)
+    evidence_tokens = count_tokens(evidence)
+    prompt_tokens = {
+        "budget": token_budget,
+        "instructions": total_tokens - history_tokens - evidence_tokens,
+        "history": history_tokens,
+        "evidence": evidence_tokens,
+        "total": total_tokens,
+    }
+    
+    return messages, prompt_tokens
+
+def _content_instruction(content):
+    """Instructions that depend on how much web content we have."""
     # Determine content quality and response strategy
     has_web_content = len(content.strip()) > 100
     content_quality = "high" if len(content.strip()) > 2000 else "medium" if len(content.strip()) > 500 else "low"
@@ -171,100 +309,171 @@ Keep headers descriptive and data well-organized.
 Acknowledge limited web content but provide the best possible answer with clear limitations stated.
 """
     
-    # Create the ultimate AI assistant prompt - focused and specific like ChatGPT
-    prompt = f"""You are ChatGPT, an AI assistant that provides exceptionally well-structured and formatted responses.
-
-**USER QUERY:** {query}
-{context_section}
+    return content_instruction
 
-**CURRENT WEB DATA:**
-{content}
-
-{content_instruction}
-
-**CRITICAL FORMATTING INSTRUCTIONS - MATCH CHATGPT EXACTLY:**
+def history_context(conversation_history, token_budget=PROMPT_TOKEN_BUDGET):
+    """The part of the conversation history that goes into the prompt."""
+    return _build_context_section(conversation_history, int(token_budget * HISTORY_BUDGET_SHARE))
 
-1. **USE PROPER MARKDOWN FORMATTING**:
-   - Main headings: ## Heading (with ##)
-   - Subheadings: ### Subheading (with ###)
-   - Code blocks: ```language\ncode here\n```
-   - Inline code: `code`
-   - Bold text: **important text**
-   - Lists: Use proper numbered lists (1. 2. 3.) and bullet points (-)
-
-2. **STRUCTURE LIKE CHATGPT**:
-   - Start with brief intro
-   - Use clear section headers with ##
-   - Break down complex topics into numbered steps
-   - Include code examples in proper code blocks
-   - End with summary or next steps
-
-3. **CODE FORMATTING EXAMPLE**:
-   ```python
-   import requests
-   
-   def example_function():
-       # Clear comments
-       return "proper formatting"
-   ```
+def _build_context_section(conversation_history, max_tokens):
+    """
+    Formats the most recent conversation turns, newest first, until max_tokens is used.
+    """
+    if not conversation_history:
+        return ""
+    
+    lines = []
+    used = 0
+    for msg in reversed(conversation_history[-HISTORY_MAX_MESSAGES:]):
+        role = "User" if msg.get('sender') == 'user' else "Assistant"
+        text = msg.get('text', '')
+        line = f"{role}: {text[:HISTORY_MAX_CHARS]}{'...' if len(text) > HISTORY_MAX_CHARS else ''}\n"
+        tokens = count_tokens(line)
+        if used + tokens > max_tokens:
+            break
+        lines.insert(0, line)
+        used += tokens
+    
+    if not lines:
+        return ""
+    return "\n\n**Previous Conversation Context:**\n" + "".join(lines) + "\n"
 
-4. **FOR TECHNICAL QUERIES**:
-   - Include "## Prerequisites" section
-   - Show "## Code Example" with proper syntax
-   - Add "## How to Use" section
-   - Include step-by-step instructions
+def error_message(query):
+    return f"I apologize, but I encountered an error while processing your question about '{query}'. Please make sure Ollama is running and try again."
 
-5. **FOR LIST QUERIES** (hackathons, products, etc.):
-   - Use "## Summary Table" with proper markdown tables
-   - Include "## What You Can Do Next" section
-   - Use exact data from web content
+def summarize_and_structure(content, query, conversation_history=None):
+    """
+    Advanced AI assistant that provides exceptional, ChatGPT-level responses with creative formatting.
+    """
+    logger.info("Creating AI response...")
+    
+    messages, prompt_tokens = build_prompt(content, query, conversation_history)
+    priority = prompt_priority(prompt_tokens['total'], bool(conversation_history))
+    
+    try:
+        with get_llm_scheduler(MODEL).slot(priority), timed('llm'):
+            response = ollama.chat(
+                model=MODEL,
+                messages=messages,
+                options={'num_ctx': OLLAMA_NUM_CTX},
+                keep_alive=OLLAMA_KEEP_ALIVE,
+            )
+        observe_ollama(MODEL, response)
+        
+        structured_response = {
+            "summary": response['message']['content'],
+            "sources": ["Web search results"],  # Placeholder, to be extracted from content
+            "prompt_tokens": prompt_tokens
+        }
+        
+        return structured_response
+    except LLMBusy:
+        raise
+    except Exception as e:
+        logger.error("An error occurred while using Ollama: %s", e)
+        return {
+            "summary": error_message(query),
+            "sources": []
+        }
 
-6. **RESPONSE STRUCTURE TEMPLATE**:
-   ```
-   Brief introduction paragraph
+def stream_summary(content, query, conversation_history=None, prompt_tokens=None):
+    """
+    Same as summarize_and_structure, but yields the response text piece by piece
+    as Ollama generates it. Errors (including LLMBusy) are raised to the caller.
+    If a prompt_tokens dict is passed, it is filled with the prompt's token counts.
+    """
+    logger.info("Streaming AI response...")
+    
+    messages, token_counts = build_prompt(content, query, conversation_history)
+    if prompt_tokens is not None:
+        prompt_tokens.update(token_counts)
+    priority = prompt_priority(token_counts['total'], bool(conversation_history))
+    
+    # The slot is held until the last token has been generated. If every client of
+    # a shared stream leaves while this waits in the queue, the prompt is never sent.
+    with get_llm_scheduler(MODEL).slot(priority, cancelled=stream_abandoned), timed('llm'):
+        stream = ollama.chat(
+            model=MODEL,
+            messages=messages,
+            options={'num_ctx': OLLAMA_NUM_CTX},
+            keep_alive=OLLAMA_KEEP_ALIVE,
+            stream=True,
+        )
+        
+        for chunk in stream:
+            text = chunk['message']['content']
+            if text:
+                yield text
+            if chunk.get('done'):
+                # The final chunk carries Ollama's token counts and timings
+                observe_ollama(MODEL, chunk)
 
-   ## Main Section Header
-   
-   Content with proper formatting
-   
-   ### Subsection
-   
-   More detailed content
-   
-   ```language
-   code example if applicable
-   ```
-   
-   ## Next Steps or Summary
-   
-   Final recommendations
-   ```
+_async_client = None
 
-**YOUR MISSION**: Create a response that matches ChatGPT's exact formatting style with proper headers, code blocks, and structured content.
+def _get_async_client():
+    global _async_client
+    if _async_client is None:
+        _async_client = ollama.AsyncClient()
+    return _async_client
 
-Generate your properly formatted response now:"""
+async def summarize_and_structure_async(content, query, conversation_history=None):
+    """
+    Async version of summarize_and_structure using the async Ollama client.
+    """
+    logger.info("Creating AI response...")
+    
+    messages, prompt_tokens = build_prompt(content, query, conversation_history)
+    priority = prompt_priority(prompt_tokens['total'], bool(conversation_history))
     
     try:
-        response = ollama.chat(
-            model='llama3.1',
-            messages=[
-                {
-                    'role': 'user',
-                    'content': prompt,
-                },
-            ],
-        )
+        async with get_llm_scheduler(MODEL).slot_async(priority):
+            with timed('llm'):
+                response = await _get_async_client().chat(
+                    model=MODEL,
+                    messages=messages,
+                    options={'num_ctx': OLLAMA_NUM_CTX},
+                    keep_alive=OLLAMA_KEEP_ALIVE,
+                )
+        observe_ollama(MODEL, response)
         
-        structured_response = {
+        return {
             "summary": response['message']['content'],
-            "sources": ["Web search results"]  # Placeholder, to be extracted from content
+            "sources": ["Web search results"],  # Placeholder, to be extracted from content
+            "prompt_tokens": prompt_tokens
         }
-        
-        return structured_response
+    except (asyncio.CancelledError, LLMBusy):
+        raise
     except Exception as e:
-        print(f"An error occurred while using Ollama: {e}")
+        logger.error("An error occurred while using Ollama: %s", e)
         return {
-            "summary": f"I apologize, but I encountered an error while processing your question about '{query}'. Please make sure Ollama is running and try again.",
+            "summary": error_message(query),
             "sources": []
         }
 
+async def stream_summary_async(content, query, conversation_history=None, prompt_tokens=None):
+    """
+    Async version of stream_summary. Errors are raised to the caller.
+    """
+    logger.info("Streaming AI response...")
+    
+    messages, token_counts = build_prompt(content, query, conversation_history)
+    if prompt_tokens is not None:
+        prompt_tokens.update(token_counts)
+    priority = prompt_priority(token_counts['total'], bool(conversation_history))
+    
+    async with get_llm_scheduler(MODEL).slot_async(priority):
+        with timed('llm'):
+            stream = await _get_async_client().chat(
+                model=MODEL,
+                messages=messages,
+                options={'num_ctx': OLLAMA_NUM_CTX},
+                keep_alive=OLLAMA_KEEP_ALIVE,
+                stream=True,
+            )
+            
+            async for chunk in stream:
+                text = chunk['message']['content']
+                if text:
+                    yield text
+                if chunk.get('done'):
+                    observe_ollama(MODEL, chunk)
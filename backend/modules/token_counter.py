@@ -0,0 +1,96 @@
+# token_counter.py
+import os
+import re
+import math
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Path to a Hugging Face tokenizer.json for the served model (e.g. Llama 3.1).
+# Without it, a local approximation is used.
+PROMPT_TOKENIZER = os.getenv('PROMPT_TOKENIZER', '')
+
+# Roughly how many characters a BPE token covers in English text
+CHARS_PER_TOKEN = 4
+
+_PIECE_RE = re.compile(r'\w+|[^\w\s]')
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?])\s+')
+
+_tokenizer = None
+_tokenizer_loaded = False
+
+
+def _load_tokenizer():
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        _tokenizer_loaded = True
+        if PROMPT_TOKENIZER:
+            try:
+                from tokenizers import Tokenizer
+                _tokenizer = Tokenizer.from_file(PROMPT_TOKENIZER)
+            except Exception as e:
+                logger.warning("Could not load tokenizer %s, approximating token counts: %s", PROMPT_TOKENIZER, e)
+    return _tokenizer
+
+
+def count_tokens(text):
+    """
+    Counts tokens with the model's tokenizer when PROMPT_TOKENIZER is set,
+    otherwise approximates: one token per punctuation mark and one per
+    CHARS_PER_TOKEN characters of each word.
+    """
+    if not text:
+        return 0
+
+    tokenizer = _load_tokenizer()
+    if tokenizer is not None:
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+    return sum(math.ceil(len(piece) / CHARS_PER_TOKEN) for piece in _PIECE_RE.findall(text))
+
+
+def fit_to_budget(text, max_tokens):
+    """
+    Keeps whole sentences from the start of text until max_tokens is reached.
+    Evidence from the filter is ordered most relevant first (tiers: high before
+    medium; bm25: by score), so this drops the least relevant sentences.
+    Sentences that don't fit are skipped; if none fits (e.g. a page without
+    punctuation), the first one is cut to the budget.
+    Returns (fitted_text, token_count).
+    """
+    if max_tokens <= 0 or not text:
+        return "", 0
+
+    total = count_tokens(text)
+    if total <= max_tokens:
+        return text, total
+
+    sentences = _SENTENCE_END_RE.split(text)
+    kept = []
+    used = 0
+    for sentence in sentences:
+        tokens = count_tokens(sentence)
+        if used + tokens > max_tokens:
+            continue
+        kept.append(sentence)
+        used += tokens
+
+    if not kept:
+        return _truncate(sentences[0], max_tokens)
+    return " ".join(kept), used
+
+
+def _truncate(text, max_tokens):
+    """The longest prefix of text within max_tokens, cut at a word boundary when there is one."""
+    low, high = 0, len(text)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(text[:middle]) <= max_tokens:
+            low = middle
+        else:
+            high = middle - 1
+    fitted = text[:low]
+    if low < len(text) and not text[low].isspace() and ' ' in fitted:
+        fitted = fitted.rsplit(' ', 1)[0]
+    fitted = fitted.rstrip()
+    return fitted, count_tokens(fitted)
@@ -0,0 +1,265 @@
+# vector_store.py
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import deque
+import numpy as np
+from .page_cache import CACHE_DIR
+from .local_index import split_passages
+from .semantic_cache import embed, embed_many, EMBEDDING_MODEL, EMBEDDING_RETRY_DELAY
+from .metrics import register_stats, percentile, timed
+from .sqlite_db import ThreadLocalConnection
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORE_DIR = os.getenv('VECTOR_STORE_DIR', os.path.join(CACHE_DIR, 'vectors'))
+# Passages kept; once full, the oldest rows are overwritten
+VECTOR_STORE_MAX_ROWS = int(os.getenv('VECTOR_STORE_MAX_ROWS', 200000))
+# Passages returned per dense search
+DENSE_TOP_K = int(os.getenv('DENSE_TOP_K', 40))
+
+# The vector file grows this many rows at a time
+GROW_ROWS = 4096
+# Rows scored per matrix product, bounding the float32 temporaries
+SEARCH_CHUNK_ROWS = 65536
+TIMING_SAMPLES = 1000
+
+
+def document_key(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:32]
+
+
+class VectorStore:
+    """
+    Passage embeddings of scraped pages, for semantic retrieval.
+
+    Vectors live in a memory-mapped float16 matrix file, so every worker process
+    shares one copy through the OS page cache. A sidecar SQLite file maps rows to
+    their document and passage text; its write lock also serializes appends
+    across processes. The matrix is a ring: once max_rows is reached, new
+    passages overwrite the oldest. Search is an exact matrix-vector product over
+    the candidate rows.
+    """
+
+    def __init__(self, directory=VECTOR_STORE_DIR, max_rows=VECTOR_STORE_MAX_ROWS, model=EMBEDDING_MODEL):
+        self.vectors_path = os.path.join(directory, 'vectors.f16')
+        self.meta_path = os.path.join(directory, 'vectors.meta.sqlite3')
+        self.max_rows = max(1, max_rows)
+        self.model = model
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._retry_at = 0.0
+        self.searches = 0
+        self.errors = 0
+        self._search_times = deque(maxlen=TIMING_SAMPLES)
+        os.makedirs(directory, exist_ok=True)
+        self._connect = ThreadLocalConnection(self.meta_path)
+        open(self.vectors_path, 'ab').close()
+        self._init_db()
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS rows (
+                row INTEGER PRIMARY KEY,
+                doc TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                text TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        conn.execute('CREATE INDEX IF NOT EXISTS rows_doc ON rows (doc)')
+
+        # Vectors from another embedding model are not comparable, start over
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if self._meta(conn, 'model', self.model) != self.model:
+                logger.info("Embedding model changed to %s, clearing the vector store", self.model)
+                conn.execute('DELETE FROM rows')
+                conn.execute('DELETE FROM meta')
+                open(self.vectors_path, 'wb').close()
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('model', ?)", (self.model,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def _meta(self, conn, key, default=None):
+        row = conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else default
+
+    def _vectors(self, rows, dim):
+        """The memory-mapped matrix with at least rows rows, remapped if another process grew the file."""
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[0] < rows or self._matrix.shape[1] != dim:
+                available = os.path.getsize(self.vectors_path) // (dim * 2)
+                if available < rows:
+                    return None
+                self._matrix = np.memmap(self.vectors_path, dtype=np.float16, mode='r+', shape=(available, dim))
+            return self._matrix
+
+    def _grow(self, rows, dim):
+        size = os.path.getsize(self.vectors_path)
+        if size >= rows * dim * 2:
+            return
+        capacity = min(self.max_rows, -(-rows // GROW_ROWS) * GROW_ROWS)
+        with open(self.vectors_path, 'r+b') as f:
+            f.truncate(capacity * dim * 2)
+
+    def _embeddings_available(self):
+        return time.time() >= self._retry_at
+
+    def _embedding_failed(self, e):
+        with self._lock:
+            self.errors += 1
+            self._retry_at = time.time() + EMBEDDING_RETRY_DELAY
+        logger.warning("Could not embed passages for the vector store: %s", e)
+
+    def has_document(self, doc):
+        """Whether passages of the document with this key are still in the store."""
+        return self._connect().execute('SELECT 1 FROM rows WHERE doc = ? LIMIT 1', (doc,)).fetchone() is not None
+
+    def add_document(self, text):
+        """
+        Chunks and embeds a page's text unless it is already stored. Returns the
+        document key, or None when embeddings are unavailable.
+        """
+        doc = document_key(text)
+        if self.has_document(doc):
+            return doc
+        conn = self._connect()
+        passages = split_passages(text)[:self.max_rows]
+        if not passages:
+            return doc
+        if not self._embeddings_available():
+            return None
+
+        try:
+            with timed('embed'):
+                vectors = embed_many(passages)
+        except Exception as e:
+            self._embedding_failed(e)
+            return None
+        self._append(conn, doc, passages, vectors)
+        return doc
+
+    def _append(self, conn, doc, passages, vectors):
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Another thread or process may have stored the same page meanwhile
+            if conn.execute('SELECT 1 FROM rows WHERE doc = ? LIMIT 1', (doc,)).fetchone():
+                conn.execute('COMMIT')
+                return
+            dim = int(self._meta(conn, 'dim', vectors.shape[1]))
+            if dim != vectors.shape[1]:
+                raise ValueError(f"embedding size {vectors.shape[1]} does not match the store's {dim}")
+
+            next_row = int(self._meta(conn, 'next_row', 0))
+            slots = [(next_row + i) % self.max_rows for i in range(len(passages))]
+            conn.executemany('DELETE FROM rows WHERE row = ?', [(slot,) for slot in slots])
+            self._grow(max(slots) + 1, dim)
+            matrix = self._vectors(max(slots) + 1, dim)
+            matrix[slots] = vectors.astype(np.float16)
+            matrix.flush()
+
+            conn.executemany(
+                'INSERT INTO rows (row, doc, position, text, created_at) VALUES (?, ?, ?, ?, ?)',
+                [(slot, doc, position, passage, now) for position, (slot, passage) in enumerate(zip(slots, passages))]
+            )
+            conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                             [('dim', str(dim)), ('next_row', str((next_row + len(passages)) % self.max_rows))])
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def embed_query(self, query):
+        """The query's embedding, or None when embeddings are unavailable."""
+        if not self._embeddings_available():
+            return None
+        try:
+            return embed(query)
+        except Exception as e:
+            self._embedding_failed(e)
+            return None
+
+    def search(self, query_vector, docs=None, k=DENSE_TOP_K):
+        """
+        Returns the k passages most similar to query_vector, best first, as
+        dicts with text, doc, position and score (cosine similarity).
+        docs limits the search to those document keys.
+        """
+        conn = self._connect()
+        started = time.perf_counter()
+        with timed('dense_search'):
+            if docs is None:
+                candidates = conn.execute('SELECT row FROM rows').fetchall()
+            else:
+                docs = list(docs)
+                if not docs:
+                    return []
+                placeholders = ','.join('?' * len(docs))
+                candidates = conn.execute(f'SELECT row FROM rows WHERE doc IN ({placeholders})', docs).fetchall()
+            rows = np.fromiter((row[0] for row in candidates), dtype=np.int64, count=len(candidates))
+            dim = int(self._meta(conn, 'dim', 0))
+            if not len(rows) or dim != len(query_vector):
+                return []
+            matrix = self._vectors(int(rows.max()) + 1, dim)
+            if matrix is None:
+                return []
+
+            query_vector = np.asarray(query_vector, dtype=np.float32)
+            scores = np.empty(len(rows), dtype=np.float32)
+            for start in range(0, len(rows), SEARCH_CHUNK_ROWS):
+                chunk = rows[start:start + SEARCH_CHUNK_ROWS]
+                scores[start:start + len(chunk)] = matrix[chunk].astype(np.float32) @ query_vector
+
+            top = np.argpartition(-scores, k - 1)[:k] if len(rows) > k else np.arange(len(rows))
+            top = top[np.argsort(-scores[top], kind='stable')]
+            best = {int(rows[i]): float(scores[i]) for i in top}
+            placeholders = ','.join('?' * len(best))
+            texts = {row: (doc, position, text) for row, doc, position, text in conn.execute(
+                f'SELECT row, doc, position, text FROM rows WHERE row IN ({placeholders})', list(best)
+            )}
+        with self._lock:
+            self.searches += 1
+            self._search_times.append(time.perf_counter() - started)
+
+        return [{'text': texts[row][2], 'doc': texts[row][0], 'position': texts[row][1], 'score': score}
+                for row, score in best.items() if row in texts]
+
+    def stats(self):
+        conn = self._connect()
+        rows, documents = conn.execute('SELECT COUNT(*), COUNT(DISTINCT doc) FROM rows').fetchone()
+        with self._lock:
+            return {
+                'model': self.model,
+                'rows': rows,
+                'documents': documents,
+                'max_rows': self.max_rows,
+                'dim': int(self._meta(conn, 'dim', 0)),
+                'bytes': os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0,
+                'searches': self.searches,
+                'errors': self.errors,
+                'search_time_p50': percentile(self._search_times, 50),
+                'search_time_p95': percentile(self._search_times, 95),
+            }
+
+
+_vector_store = None
+_vector_store_lock = threading.Lock()
+
+
+def get_vector_store():
+    """Returns the process-wide vector store."""
+    global _vector_store
+    if _vector_store is None:
+        with _vector_store_lock:
+            if _vector_store is None:
+                _vector_store = VectorStore()
+                register_stats('vector_store', _vector_store.stats)
+    return _vector_store
@@ -1,117 +1,176 @@
 # web_search.py
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-import time
-import requests
+import os
+import asyncio
+import logging
 from bs4 import BeautifulSoup
 import urllib.parse
+from .search_cache import get_search_cache
+from .browser_pool import get_browser_pool, BROWSER_SEARCH_ENABLED
+from .domain_health import rank_urls
+from .metrics import timed
+from . import http_client
+from .http_client import ACCEPT_ENCODING
 
-def fallback_search(query, num_results=10):
+logger = logging.getLogger(__name__)
+
+# Search results page; point it at a local stub server for offline benchmarks
+SEARCH_URL = os.getenv('SEARCH_URL', 'https://www.google.com/search')
+# Result URLs returned per search, and seconds to wait for the results page
+MAX_SEARCH_RESULTS = int(os.getenv('MAX_SEARCH_RESULTS', 10))
+SEARCH_TIMEOUT = float(os.getenv('SEARCH_TIMEOUT', 15))
+
+SEARCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': ACCEPT_ENCODING,
+    'Upgrade-Insecure-Requests': '1',
+}
+
+class ReliableUrls(list):
     """
-    Fallback search method using requests and BeautifulSoup
+    Hard-coded sources returned when a search found nothing. They are a stopgap,
+    so they are never cached: the next identical query searches again.
     """
-    try:
-        print(f"Fallback search for: {query}")
+
+
+def _fallback_search_url(query):
+    """Returns the Google search URL for a query, or None for an empty query."""
+    # Clean and encode the search query
+    clean_query = query.strip()
+    if not clean_query:
+        logger.warning("Empty query provided")
+        return None
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-        }
+    encoded_query = urllib.parse.quote_plus(f"{clean_query} 2024 2025")
+    search_url = f"{SEARCH_URL}?q={encoded_query}&num=20&hl=en"
+    
+    logger.debug("Search URL: %s", search_url)
+    return search_url
+
+def parse_search_results(html, num_results=MAX_SEARCH_RESULTS):
+    """
+    Extracts result URLs from a Google results page.
+    """
+    soup = BeautifulSoup(html, 'lxml')
+    
+    links = []
+    
+    # Try multiple search result selectors
+    selectors = [
+        'div.g a[href]',
+        'div.yuRUbf a[href]',
+        'h3 a[href]',
+        'a[href*="/url?q="]',
+        'a[data-ved][href]'
+    ]
+    
+    for selector in selectors:
+        elements = soup.select(selector)
+        logger.debug("Selector '%s' found %d elements", selector, len(elements))
         
-        # Clean and encode the search query
-        clean_query = query.strip()
-        if not clean_query:
-            print("Empty query provided")
-            return []
+        for element in elements:
+            if len(links) >= num_results:
+                break
+                
+            href = element.get('href', '')
+            
+            if href.startswith('/url?q='):
+                # Extract the actual URL from Google's redirect
+                try:
+                    actual_url = href.split('/url?q=')[1].split('&')[0]
+                    actual_url = urllib.parse.unquote(actual_url)
+                except:
+                    continue
+            elif href.startswith('http'):
+                actual_url = href
+            else:
+                continue
             
-        encoded_query = urllib.parse.quote_plus(f"{clean_query} 2024 2025")
-        search_url = f"https://www.google.com/search?q={encoded_query}&num=20&hl=en"
+            # Filter valid URLs
+            if (actual_url.startswith('http') and 
+                'google.com' not in actual_url and 
+                'youtube.com' not in actual_url and
+                'googleusercontent.com' not in actual_url and
+                actual_url not in links):
+                links.append(actual_url)
+                logger.debug("Added URL: %s", actual_url)
+        
+        if links:  # If we found some links, break
+            break
+    
+    return links
+
+def _with_reliable_urls(links, query, num_results):
+    logger.info("Fallback search found %d URLs", len(links))
+    
+    # If no links found, try some reliable sources based on query content
+    if not links:
+        logger.info("No links found, trying reliable sources...")
+        return ReliableUrls(get_reliable_urls_for_query(query)[:num_results])
+    
+    return links[:num_results]
+
+def _reliable_urls_last_resort(query, num_results, error):
+    logger.warning("Fallback search failed: %s", error, exc_info=True)
+    
+    # Last resort: return some reliable URLs based on query
+    try:
+        reliable_urls = get_reliable_urls_for_query(query)
+        logger.info("Using reliable URLs as last resort: %d URLs", len(reliable_urls))
+        return ReliableUrls(reliable_urls[:num_results])
+    except:
+        return []
+
+def fallback_search(query, num_results=MAX_SEARCH_RESULTS):
+    """
+    Fallback search method using the shared HTTP client and BeautifulSoup
+    """
+    try:
+        logger.debug("Fallback search for: %s", query)
         
-        print(f"Search URL: {search_url}")
+        search_url = _fallback_search_url(query)
+        if not search_url:
+            return []
         
-        response = requests.get(search_url, headers=headers, timeout=15)
-        print(f"Response status: {response.status_code}")
+        response = http_client.get(search_url, headers=SEARCH_HEADERS, timeout=SEARCH_TIMEOUT)
+        logger.debug("Response status: %s", response.status_code)
         
         if response.status_code != 200:
-            print(f"Bad response status: {response.status_code}")
+            logger.warning("Bad response status: %s", response.status_code)
             return []
         
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        links = []
+        links = parse_search_results(response.text, num_results)
+        return _with_reliable_urls(links, query, num_results)
         
-        # Try multiple search result selectors
-        selectors = [
-            'div.g a[href]',
-            'div.yuRUbf a[href]',
-            'h3 a[href]',
-            'a[href*="/url?q="]',
-            'a[data-ved][href]'
-        ]
+    except Exception as e:
+        return _reliable_urls_last_resort(query, num_results, e)
+
+async def fallback_search_async(client, query, num_results=MAX_SEARCH_RESULTS):
+    """
+    Async version of fallback_search using a client from http_client.new_async_client.
+    """
+    try:
+        logger.debug("Fallback search for: %s", query)
         
-        for selector in selectors:
-            elements = soup.select(selector)
-            print(f"Selector '{selector}' found {len(elements)} elements")
-            
-            for element in elements:
-                if len(links) >= num_results:
-                    break
-                    
-                href = element.get('href', '')
-                
-                if href.startswith('/url?q='):
-                    # Extract the actual URL from Google's redirect
-                    try:
-                        actual_url = href.split('/url?q=')[1].split('&')[0]
-                        actual_url = urllib.parse.unquote(actual_url)
-                    except:
-                        continue
-                elif href.startswith('http'):
-                    actual_url = href
-                else:
-                    continue
-                
-                # Filter valid URLs
-                if (actual_url.startswith('http') and 
-                    'google.com' not in actual_url and 
-                    'youtube.com' not in actual_url and
-                    'googleusercontent.com' not in actual_url and
-                    actual_url not in links):
-                    links.append(actual_url)
-                    print(f"Added URL: {actual_url}")
-            
-            if links:  # If we found some links, break
-                break
+        search_url = _fallback_search_url(query)
+        if not search_url:
+            return []
         
-        print(f"Fallback search found {len(links)} URLs")
+        response = await http_client.get_async(client, search_url, headers=SEARCH_HEADERS, timeout=SEARCH_TIMEOUT)
+        logger.debug("Response status: %s", response.status_code)
         
-        # If no links found, try some reliable sources based on query content
-        if not links:
-            print("No links found, trying reliable sources...")
-            reliable_urls = get_reliable_urls_for_query(query)
-            links.extend(reliable_urls)
+        if response.status_code != 200:
+            logger.warning("Bad response status: %s", response.status_code)
+            return []
         
-        return links[:num_results]
+        links = await asyncio.to_thread(parse_search_results, response.text, num_results)
+        return _with_reliable_urls(links, query, num_results)
         
+    except asyncio.CancelledError:
+        raise
     except Exception as e:
-        print(f"Fallback search failed: {e}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
-        
-        # Last resort: return some reliable URLs based on query
-        try:
-            reliable_urls = get_reliable_urls_for_query(query)
-            print(f"Using reliable URLs as last resort: {len(reliable_urls)} URLs")
-            return reliable_urls[:num_results]
-        except:
-            return []
+        return _reliable_urls_last_resort(query, num_results, e)
 
 def get_reliable_urls_for_query(query):
     """Get some reliable URLs based on query content"""
@@ -169,39 +228,73 @@ def get_reliable_urls_for_query(query):
     
     return urls[:10]
 
-def search_web(keywords, num_results=10):
+def search_web(keywords, num_results=MAX_SEARCH_RESULTS, use_cache=True):
     """
     Searches Google for the given keywords and returns the top N search result URLs.
+    Results for equivalent keyword lists are served from the search cache.
+    """
+    with timed('search'):
+        cache = get_search_cache() if use_cache else None
+        if cache:
+            cached_links = cache.get(keywords, num_results)
+            if cached_links is not None:
+                logger.info("Search cache hit: %d URLs", len(cached_links))
+                return cached_links
+
+        links = _search_web_uncached(keywords, num_results)
+        if cache and not isinstance(links, ReliableUrls):
+            cache.put(keywords, num_results, links)
+        return links
+
+async def search_web_async(client, keywords, num_results=MAX_SEARCH_RESULTS, use_cache=True):
+    """
+    Async version of search_web. The Selenium path still runs in a worker thread.
     """
-    print(f"Searching web for: {keywords}")
+    with timed('search'):
+        cache = get_search_cache() if use_cache else None
+        if cache:
+            cached_links = await asyncio.to_thread(cache.get, keywords, num_results)
+            if cached_links is not None:
+                logger.info("Search cache hit: %d URLs", len(cached_links))
+                return cached_links
+
+        logger.debug("Searching web for: %s", keywords)
+        links = await fallback_search_async(client, _keywords_to_query(keywords), num_results)
+        if not links and BROWSER_SEARCH_ENABLED:
+            logger.info("Fallback failed, trying Selenium...")
+            links = await asyncio.to_thread(selenium_search, keywords, num_results)
+
+        if cache and not isinstance(links, ReliableUrls):
+            await asyncio.to_thread(cache.put, keywords, num_results, links)
+        return links
+
+def _keywords_to_query(keywords):
+    if isinstance(keywords, list):
+        return " ".join([str(k) for k in keywords if k])
+    return str(keywords)
+
+def _search_web_uncached(keywords, num_results):
+    logger.debug("Searching web for: %s", keywords)
     
     # First try fallback method (more reliable)
-    if isinstance(keywords, list):
-        query = " ".join([str(k) for k in keywords if k])
-    else:
-        query = str(keywords)
+    query = _keywords_to_query(keywords)
     
-    print(f"Trying fallback search first...")
     fallback_links = fallback_search(query, num_results)
     if fallback_links:
-        print(f"Fallback found {len(fallback_links)} URLs")
-        print(f"Found URLs: {fallback_links[:5]}")  # Show first 5 URLs for debugging
+        logger.debug("Found URLs: %s", fallback_links)
         return fallback_links
     
-    print(f"Fallback failed, trying Selenium...")
+    if not BROWSER_SEARCH_ENABLED:
+        return fallback_links
     
+    logger.info("Fallback failed, trying Selenium...")
+    return selenium_search(keywords, num_results)
+
+def selenium_search(keywords, num_results=MAX_SEARCH_RESULTS):
+    """
+    Searches Google in a pooled headless browser, falling back to fallback_search on errors.
+    """
     try:
-        # Setup Chrome options
-        chrome_options = webdriver.ChromeOptions()
-        chrome_options.add_argument("--headless")  # Run in headless mode
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_argument("--user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-        
-        # Initialize WebDriver
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=chrome_options)
-        
         # Create a more intelligent search query
         if isinstance(keywords, list):
             # Combine keywords intelligently
@@ -226,87 +319,19 @@ def search_web(keywords, num_results=10):
         else:
             search_query = f"{query} {current_year}"
         
-        print(f"Search query: {search_query}")
+        logger.debug("Search query: %s", search_query)
         
         # Perform search
-        search_url = f"https://www.google.com/search?q={search_query}&num=20"
-        driver.get(search_url)
-        
-        # Wait for results to load
-        time.sleep(2)
-        
-        # Try different CSS selectors for Google search results
-        selectors = [
-            'div.g a[href]',
-            'div.yuRUbf a[href]', 
-            'h3.LC20lb a[href]',
-            'a[href][data-ved]'
-        ]
-        
-        # Filter out sites known to block scrapers and prioritize scraper-friendly sites
-        links = []
-        friendly_sites = []
-        other_sites = []
+        search_url = f"{SEARCH_URL}?q={search_query}&num=20"
         
-        # Sites that are generally more scraper-friendly
-        scraper_friendly_domains = [
-            'croma.com', 'amazon.', 'flipkart.', 'myntra.', 'ajio.', 'nykaa.',
-            'techcrunch.', 'gadgets360.', '91mobiles.', 'smartprix.', 'beebom.',
-            'indianexpress.', 'hindustantimes.', 'timesofindia.', 'ndtv.',
-            'moneycontrol.', 'livemint.', 'businesstoday.', 'financialexpress.',
-            'ibm.com', 'microsoft.com', 'aws.amazon.com', 'cloud.google.',
-            'blog.', 'medium.', 'linkedin.', 'github.com', 'stackoverflow.'
-        ]
+        with get_browser_pool().session() as driver:
+            links = _collect_result_links(driver, search_url, num_results)
         
-        # Sites that commonly block scrapers
-        blocking_domains = [
-            'wikipedia.org', 'pcmag.com', 'theverge.com', 'wired.com',
-            'techradar.com', 'cnet.com', 'engadget.com', 'ars-technica.com'
-        ]
-        
-        for selector in selectors:
-            try:
-                link_elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                for element in link_elements:
-                    if len(friendly_sites) + len(other_sites) >= num_results:
-                        break
-                    try:
-                        href = element.get_attribute('href')
-                        if (href and href.startswith('http') and 
-                            'google.com' not in href and 
-                            'youtube.com' not in href):
-                            
-                            # Check if domain is scraper-friendly
-                            is_friendly = any(domain in href for domain in scraper_friendly_domains)
-                            is_blocking = any(domain in href for domain in blocking_domains)
-                            
-                            if not is_blocking and href not in [item[1] for item in friendly_sites + other_sites]:
-                                if is_friendly:
-                                    friendly_sites.append((element.text or href, href))
-                                else:
-                                    other_sites.append((element.text or href, href))
-                                    
-                    except Exception as e:
-                        continue
-                
-                if len(friendly_sites) + len(other_sites) >= num_results:
-                    break
-                    
-            except Exception as e:
-                print(f"Error with selector {selector}: {e}")
-                continue
-        
-        # Prioritize friendly sites, then add others
-        all_sites = friendly_sites + other_sites
-        links = [href for _, href in all_sites[:num_results]]
-                
-        driver.quit()
-        
-        print(f"Found {len(links)} URLs")
+        logger.info("Selenium search found %d URLs", len(links))
         return links
         
     except Exception as e:
-        print(f"Web search error, trying fallback...")
+        logger.warning("Web search error, trying fallback: %s", e)
         
         # Try fallback search method
         if isinstance(keywords, list):
@@ -314,7 +339,63 @@ def search_web(keywords, num_results=10):
         else:
             query = keywords
             
-        fallback_links = fallback_search(query, num_results)
-        print(f"Fallback found {len(fallback_links)} URLs")
-        return fallback_links
+        return fallback_search(query, num_results)
 
+def _collect_result_links(driver, search_url, num_results):
+    """
+    Loads a Google results page in a pooled browser and collects result links,
+    ordered by how well their hosts have scraped before (see domain_health.py).
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import TimeoutException
+    
+    driver.get(search_url)
+    
+    # Wait for result elements instead of a fixed sleep
+    try:
+        WebDriverWait(driver, 10).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, '#search, div.g, #rso'))
+        )
+    except TimeoutException:
+        logger.warning("Timed out waiting for search results")
+    
+    # Try different CSS selectors for Google search results
+    selectors = [
+        'div.g a[href]',
+        'div.yuRUbf a[href]', 
+        'h3.LC20lb a[href]',
+        'a[href][data-ved]'
+    ]
+    
+    # Collect extra candidates, so hosts skipped by the domain health registry don't leave gaps
+    candidates = []
+    
+    for selector in selectors:
+        try:
+            link_elements = driver.find_elements(By.CSS_SELECTOR, selector)
+            for element in link_elements:
+                if len(candidates) >= 2 * num_results:
+                    break
+                try:
+                    href = element.get_attribute('href')
+                    if (href and href.startswith('http') and 
+                        'google.com' not in href and 
+                        'youtube.com' not in href and
+                        href not in candidates):
+                        candidates.append(href)
+                except Exception:
+                    continue
+            
+            if len(candidates) >= 2 * num_results:
+                break
+                
+        except Exception as e:
+            logger.debug("Error with selector %s: %s", selector, e)
+            continue
+    
+    # Hosts that reliably yield content first; hosts with an open circuit are dropped
+    links = rank_urls(candidates)[:num_results]
+            
+    return links
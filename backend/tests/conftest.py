@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+# Settings are read when the modules are imported, so they are set before any test
+# imports one. Every on-disk store goes to a throwaway directory, and extraction
+# runs in the test's own thread unless a test starts a pool itself.
+os.environ['CACHE_DIR'] = tempfile.mkdtemp(prefix='personalgpt-tests-')
+os.environ.setdefault('CPU_POOL_WORKERS', '0')
+os.environ.setdefault('LOCAL_INDEX_ENABLED', 'false')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,100 @@
+import types
+import pytest
+import app
+from modules import answer_cache
+from modules.answer_cache import AnswerCache, is_cacheable
+from modules.semantic_cache import SemanticCache
+
+RESULT = {'summary': 'The Pixel 8 is the best phone under 50000.', 'sources': ['https://example.com/phones']}
+HISTORY = [{'sender': 'user', 'text': 'I like Android phones'}, {'sender': 'assistant', 'text': 'Noted.'}]
+EVIDENCE = 'The Pixel 8 costs 49999 rupees.'
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(answer_cache, 'time', types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return AnswerCache(path=str(tmp_path / 'answers.db'), ttl=3600, query_ttl=60)
+
+
+def test_same_question_hits_before_searching(cache):
+    cache.put('Best phone under 50000?', HISTORY, EVIDENCE, RESULT)
+
+    assert cache.lookup('best  phone under 50000', HISTORY) == RESULT
+
+
+def test_changed_history_misses(cache):
+    cache.put('best phone', HISTORY, EVIDENCE, RESULT)
+    other_history = HISTORY[:1] + [{'sender': 'assistant', 'text': 'You prefer iOS.'}]
+
+    assert cache.lookup('best phone', other_history) is None
+    assert cache.lookup('best phone', None) is None
+    assert cache.get('best phone', other_history, EVIDENCE) is None
+
+
+def test_changed_evidence_misses(cache):
+    cache.put('best phone', HISTORY, EVIDENCE, RESULT)
+
+    assert cache.get('best phone', HISTORY, EVIDENCE + ' Now on sale.') is None
+    assert cache.get('best phone', HISTORY, EVIDENCE) == RESULT
+
+
+def test_query_only_hits_expire_before_evidence_hits(cache, clock):
+    cache.put('best phone', HISTORY, EVIDENCE, RESULT)
+
+    clock[0] += 61
+    assert cache.lookup('best phone', HISTORY) is None
+    assert cache.get('best phone', HISTORY, EVIDENCE) == RESULT
+
+    clock[0] += 3600
+    assert cache.get('best phone', HISTORY, EVIDENCE) is None
+
+
+def test_least_recently_used_answers_are_evicted(tmp_path, clock):
+    cache = AnswerCache(path=str(tmp_path / 'answers.db'), max_entries=2)
+    for query in ['first', 'second']:
+        cache.put(query, None, EVIDENCE, RESULT)
+        clock[0] += 1
+    assert cache.lookup('first') == RESULT
+    clock[0] += 1
+
+    cache.put('third', None, EVIDENCE, RESULT)
+
+    assert cache.stats()['entries'] == 2
+    assert cache.get('second', None, EVIDENCE) is None
+    assert cache.get('first', None, EVIDENCE) == RESULT
+    assert cache.get('third', None, EVIDENCE) == RESULT
+
+
+@pytest.mark.parametrize('result, evidence', [
+    ({'summary': 'I apologize, but I encountered an error.', 'sources': []}, EVIDENCE),
+    ({'summary': '  ', 'sources': RESULT['sources']}, EVIDENCE),
+    (RESULT, ''),
+])
+def test_errors_and_answers_without_evidence_are_not_cacheable(result, evidence):
+    assert not is_cacheable(result, evidence)
+
+
+def test_pipeline_does_not_cache_llm_errors(cache, monkeypatch):
+    calls = []
+
+    def failing_llm(content, query, conversation_history=None):
+        calls.append(query)
+        return {'summary': app.error_message(query), 'sources': []}
+
+    monkeypatch.setattr(app, 'get_answer_cache', lambda: cache)
+    monkeypatch.setattr(app, 'get_semantic_cache', lambda: SemanticCache(enabled=False))
+    monkeypatch.setattr(app, 'extract_keywords', lambda query: ['phone'])
+    monkeypatch.setattr(app, 'local_first_evidence', lambda *args: EVIDENCE)
+    monkeypatch.setattr(app, 'summarize_and_structure', failing_llm)
+
+    for _ in range(2):
+        assert app.main_pipeline('best phone')['cache'] == 'miss'
+
+    assert len(calls) == 2
+    assert cache.stats()['entries'] == 0
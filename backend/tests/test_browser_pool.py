@@ -0,0 +1,70 @@
+import threading
+import time
+import pytest
+from modules import browser_pool
+from modules.browser_pool import BrowserPool
+
+
+class FakeDriver:
+    def quit(self):
+        pass
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fake_driver(monkeypatch):
+    monkeypatch.setattr(browser_pool, 'create_driver', FakeDriver)
+
+
+def _acquire_in_background(pool, timeout):
+    outcome = {}
+
+    def wait():
+        started = time.monotonic()
+        try:
+            with pool.session(timeout=timeout):
+                outcome['waited'] = time.monotonic() - started
+        except Exception as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    return thread, outcome
+
+
+def test_waiter_is_woken_when_a_driver_is_retired():
+    # max_uses=1: the only driver is quit instead of returned, freeing its slot
+    pool = BrowserPool(size=1, max_uses=1)
+    with pool.session():
+        thread, outcome = _acquire_in_background(pool, timeout=10)
+        time.sleep(0.2)
+    thread.join(timeout=5)
+
+    assert 'error' not in outcome
+    assert outcome['waited'] < 2
+
+
+def test_waiter_is_woken_when_a_driver_crashes():
+    pool = BrowserPool(size=1)
+    with pytest.raises(RuntimeError):
+        with pool.session():
+            thread, outcome = _acquire_in_background(pool, timeout=10)
+            time.sleep(0.2)
+            raise RuntimeError("driver crashed")
+    thread.join(timeout=5)
+
+    assert 'error' not in outcome
+    assert outcome['waited'] < 2
+
+
+def test_acquire_times_out_when_the_pool_stays_busy():
+    pool = BrowserPool(size=1)
+    with pool.session():
+        with pytest.raises(TimeoutError):
+            with pool.session(timeout=0.2):
+                pass
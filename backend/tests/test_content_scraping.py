@@ -0,0 +1,71 @@
+import asyncio
+import httpx
+import pytest
+from modules import content_scraping
+from modules.page_cache import get_page_cache
+
+PAGE_HTML = ('<html><body><article>'
+             + '<p>A paragraph with enough words in it to count as the main content.</p>' * 5
+             + '</article></body></html>')
+
+
+@pytest.fixture
+def cached_urls():
+    """Six pages on one host, all fresh in the page cache."""
+    urls = [f'https://cached.example.com/page/{i}' for i in range(6)]
+    cache = get_page_cache()
+    for url in urls:
+        cache.put(url, PAGE_HTML, f'text of {url}', ttl=3600)
+    return urls
+
+
+def _refuse(*args, **kwargs):
+    raise AssertionError("a fresh cache hit must not wait for the host limiter")
+
+
+def _html_response(url, **kwargs):
+    return httpx.Response(200, headers={'Content-Type': 'text/html'}, text=PAGE_HTML,
+                          request=httpx.Request('GET', url))
+
+
+def test_cache_hits_bypass_the_host_limiter(cached_urls, monkeypatch):
+    monkeypatch.setattr(content_scraping.HostLimiter, 'acquire', _refuse)
+
+    results = dict(content_scraping.iter_scraped(cached_urls, host_delay=5, time_budget=2))
+
+    assert [results[i] for i in range(len(cached_urls))] == [f'text of {url}' for url in cached_urls]
+
+
+def test_cache_hits_bypass_the_host_limiter_async(cached_urls, monkeypatch):
+    monkeypatch.setattr(content_scraping.AsyncHostLimiter, 'acquire', _refuse)
+
+    async def scrape():
+        return {i: text async for i, text in content_scraping.iter_scraped_async(None, cached_urls, host_delay=5,
+                                                                                 time_budget=2)}
+
+    results = asyncio.run(scrape())
+
+    assert [results[i] for i in range(len(cached_urls))] == [f'text of {url}' for url in cached_urls]
+
+
+def test_extraction_timeout_does_not_cache_the_page_as_empty(monkeypatch):
+    url = 'https://slow-extract.example.com/article'
+
+    def time_out(fn, *args):
+        raise TimeoutError("extract_text timed out after 10s")
+
+    monkeypatch.setattr(content_scraping.http_client, 'get', _html_response)
+    monkeypatch.setattr(content_scraping.cpu_pool, 'run', time_out)
+
+    assert content_scraping.extract_from_url(url) is None
+    assert get_page_cache().get(url) is None
+
+
+def test_page_without_text_is_cached_briefly(monkeypatch):
+    url = 'https://no-text.example.com/article'
+    monkeypatch.setattr(content_scraping.http_client, 'get', _html_response)
+    monkeypatch.setattr(content_scraping.cpu_pool, 'run', lambda fn, *args: None)
+
+    assert content_scraping.extract_from_url(url) is None
+    entry = get_page_cache().get(url)
+    assert entry is not None and entry['text'] is None
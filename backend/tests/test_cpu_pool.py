@@ -0,0 +1,134 @@
+import asyncio
+import signal
+import threading
+import time
+import pytest
+from modules.cpu_pool import CPUPool
+
+pytestmark = pytest.mark.skipif(not hasattr(signal, 'setitimer'), reason="worker-side timeouts need setitimer")
+
+
+def sleep_for(seconds):
+    # Module-level so the spawned workers can import it
+    time.sleep(seconds)
+    return seconds
+
+
+def sleep_catching_errors(seconds):
+    # Like extraction code that catches every Exception from its parsers
+    try:
+        time.sleep(seconds)
+    except Exception:
+        pass
+    return 'finished anyway'
+
+
+def _warm_pool(**kwargs):
+    pool = CPUPool(workers=1, **kwargs)
+    # Start the worker first, so its start-up doesn't overlap the tasks
+    pool.warm()
+    deadline = time.monotonic() + 60
+    while not pool.is_warm() and time.monotonic() < deadline:
+        time.sleep(0.1)
+    return pool
+
+
+@pytest.fixture
+def pool():
+    pool = _warm_pool(queue_size=4, timeout=1)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture
+def small_pool():
+    pool = _warm_pool(queue_size=1, timeout=5, slot_wait=0.3)
+    yield pool
+    pool.close()
+
+
+def _in_background(fn, *args):
+    thread = threading.Thread(target=fn, args=args)
+    thread.start()
+    time.sleep(0.1)
+    return thread
+
+
+def test_time_spent_queued_does_not_count_against_the_timeout(pool):
+    # One worker, three 0.6s tasks: the last waits 1.2s in the queue but runs for 0.6s
+    results = []
+    errors = []
+
+    def run():
+        try:
+            results.append(pool.run(sleep_for, 0.6))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert results == [0.6, 0.6, 0.6]
+    assert pool.stats()['timed_out'] == 0
+
+
+def test_task_running_past_the_timeout_is_stopped(pool):
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        pool.run(sleep_for, 10)
+
+    assert time.monotonic() - started < 5
+    assert pool.stats()['timed_out'] == 1
+    # The worker survives and takes the next task
+    assert pool.run(sleep_for, 0.1) == 0.1
+
+
+def test_timeout_is_not_swallowed_by_the_task(pool):
+    with pytest.raises(TimeoutError):
+        pool.run(sleep_catching_errors, 3)
+
+
+def test_full_queue_waits_briefly_for_a_slot(small_pool):
+    busy = _in_background(small_pool.run, sleep_for, 0.1)
+
+    assert small_pool.run(sleep_for, 0.1) == 0.1
+    busy.join()
+    assert small_pool.stats()['inline'] == 0
+
+
+def test_full_queue_runs_the_task_inline_after_the_wait(small_pool):
+    busy = _in_background(small_pool.run, sleep_for, 1)
+
+    started = time.monotonic()
+    assert small_pool.run(sleep_for, 0.1) == 0.1
+    assert time.monotonic() - started < 0.9
+    busy.join()
+    assert small_pool.stats()['inline'] == 1
+
+
+def test_full_queue_async_waits_without_blocking_the_loop(small_pool):
+    busy = _in_background(small_pool.run, sleep_for, 1)
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        result = await small_pool.run_async(sleep_for, 0.1)
+        ticker.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    busy.join()
+    assert result == 0.1
+    assert ticks > 10
+    assert small_pool.stats()['inline'] == 1
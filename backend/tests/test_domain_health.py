@@ -0,0 +1,108 @@
+import asyncio
+import time
+import pytest
+from modules import content_scraping
+from modules.domain_health import DomainHealth, DOMAIN_FAILURE_THRESHOLD, MIN_SAMPLES
+from modules.http_client import UnsupportedContentType
+
+
+@pytest.fixture
+def health(tmp_path):
+    return DomainHealth(path=str(tmp_path / 'domains.db'))
+
+
+def _host(health, host):
+    return health.hosts(host=host)[0]
+
+
+def _open_circuit(health, host):
+    for _ in range(DOMAIN_FAILURE_THRESHOLD):
+        health.record(f'https://{host}/page', 'timeout', 5)
+
+
+def _cool_down(health, host):
+    health._connect().execute('UPDATE domains SET open_until = ? WHERE host = ?', (time.time() - 1, host))
+
+
+def test_rejected_pages_do_not_count_as_fetches(health):
+    for _ in range(MIN_SAMPLES):
+        health.record('https://docs.example.com/guide', 'ok', 0.2, 200, 5000, 2000)
+
+    health.record('https://docs.example.com/manual.pdf', 'rejected', 0.1)
+
+    row = _host(health, 'docs.example.com')
+    assert row['attempts'] == MIN_SAMPLES
+    assert row['success_rate'] == 1.0
+    assert row['extract_rate'] == 1.0
+
+
+def test_rejected_probe_closes_the_circuit(health):
+    _open_circuit(health, 'files.example.com')
+    _cool_down(health, 'files.example.com')
+
+    health.record('https://files.example.com/report.pdf', 'rejected', 0.1)
+
+    row = _host(health, 'files.example.com')
+    assert row['state'] == 'closed'
+    assert row['consecutive_failures'] == 0
+
+
+def test_probes_are_only_claimed_within_the_limit(health):
+    _open_circuit(health, 'flaky.example.com')
+    _cool_down(health, 'flaky.example.com')
+    for i in range(MIN_SAMPLES):
+        health.record(f'https://good.example.com/{i}', 'ok', 0.2, 200, 5000, 2000)
+    urls = [f'https://good.example.com/{i}' for i in range(3)] + ['https://flaky.example.com/page']
+
+    plan = health.plan(urls, 10, limit=3)
+
+    assert [i for i, _ in plan] == [0, 1, 2]
+    assert health.stats()['probes'] == 0
+    # Still waiting for a probe: a later, shorter plan claims it
+    assert _host(health, 'flaky.example.com')['state'] == 'half_open'
+    assert [i for i, _ in health.plan(urls[2:], 10, limit=3)] == [0, 1]
+    assert health.stats()['probes'] == 1
+
+
+def test_one_probe_per_host(health):
+    _open_circuit(health, 'flaky.example.com')
+    _cool_down(health, 'flaky.example.com')
+    urls = [f'https://flaky.example.com/{i}' for i in range(3)]
+
+    assert len(health.plan(urls, 10)) == 1
+    # The claimed probe keeps the host closed to other plans until it reports back
+    assert health.plan(urls, 10) == []
+
+
+@pytest.fixture
+def recorded(health, monkeypatch):
+    outcomes = []
+    monkeypatch.setattr(content_scraping, 'get_domain_health', lambda: health)
+    monkeypatch.setattr(health, 'record', lambda url, outcome, *args: outcomes.append(outcome))
+    return outcomes
+
+
+def _not_html(url):
+    return UnsupportedContentType(f"{url} is application/pdf, not HTML")
+
+
+def test_scraper_records_non_html_pages_as_rejected(recorded, monkeypatch):
+    def get(url, **kwargs):
+        raise _not_html(url)
+
+    monkeypatch.setattr(content_scraping.http_client, 'get', get)
+
+    assert content_scraping.extract_from_url('https://files.example.com/report.pdf', use_cache=False) is None
+    assert recorded == ['rejected']
+
+
+def test_async_scraper_records_non_html_pages_as_rejected(recorded, monkeypatch):
+    async def get_async(client, url, **kwargs):
+        raise _not_html(url)
+
+    monkeypatch.setattr(content_scraping.http_client, 'get_async', get_async)
+
+    text = asyncio.run(content_scraping.extract_from_url_async(None, 'https://files.example.com/report.pdf',
+                                                               use_cache=False))
+    assert text is None
+    assert recorded == ['rejected']
@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+import pytest
+from modules.llm_scheduler import LLMScheduler, LLMBusy
+
+
+def _queue_in_thread(scheduler, priority, order, **kwargs):
+    def run():
+        try:
+            with scheduler.slot(priority, **kwargs):
+                order.append(priority)
+        except LLMBusy as e:
+            order.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def _wait_until_queued(scheduler, count):
+    deadline = time.monotonic() + 2
+    while scheduler.stats()['queued'] < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_slot_serves_the_lowest_priority_first():
+    scheduler = LLMScheduler('test', max_concurrency=1, queue_size=4)
+    order = []
+    with scheduler.slot():
+        threads = []
+        for queued, priority in enumerate([300, 100, 200], start=1):
+            threads.append(_queue_in_thread(scheduler, priority, order))
+            _wait_until_queued(scheduler, queued)
+    for thread in threads:
+        thread.join(timeout=2)
+
+    assert order == [100, 200, 300]
+    assert scheduler.stats()['completed'] == 4
+
+
+def test_full_queue_raises_busy_with_a_retry_hint():
+    scheduler = LLMScheduler('test', max_concurrency=1, queue_size=1)
+    order = []
+    with scheduler.slot():
+        thread = _queue_in_thread(scheduler, 0, order)
+        _wait_until_queued(scheduler, 1)
+
+        with pytest.raises(LLMBusy) as busy:
+            scheduler.check_capacity()
+        with pytest.raises(LLMBusy):
+            with scheduler.slot():
+                pass
+
+    thread.join(timeout=2)
+    assert 1 <= busy.value.retry_after <= 60
+    assert scheduler.stats()['rejected'] == 2
+    assert order == [0]
+
+
+def test_timed_out_waiter_leaves_no_slot_behind():
+    scheduler = LLMScheduler('test', max_concurrency=1, queue_size=1)
+    with scheduler.slot():
+        with pytest.raises(LLMBusy):
+            with scheduler.slot(timeout=0.1):
+                pass
+
+    stats = scheduler.stats()
+    assert (stats['active'], stats['queued'], stats['timed_out']) == (0, 0, 1)
+    # The slot is free again
+    with scheduler.slot(timeout=0.1):
+        pass
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    scheduler = LLMScheduler('test', max_concurrency=1, queue_size=1)
+    gone = threading.Event()
+    order = []
+    with scheduler.slot():
+        thread = _queue_in_thread(scheduler, 0, order, cancelled=gone.is_set)
+        _wait_until_queued(scheduler, 1)
+        gone.set()
+        thread.join(timeout=2)
+        assert isinstance(order[0], LLMBusy)
+        assert scheduler.stats()['queued'] == 0
+
+    stats = scheduler.stats()
+    assert (stats['active'], stats['cancelled'], stats['timed_out']) == (0, 1, 0)
+
+
+def test_slot_async_serves_the_lowest_priority_first():
+    async def scenario():
+        scheduler = LLMScheduler('test', max_concurrency=1, queue_size=4)
+        order = []
+
+        async def generate(priority):
+            async with scheduler.slot_async(priority):
+                order.append(priority)
+
+        async with scheduler.slot_async():
+            tasks = [asyncio.create_task(generate(priority)) for priority in [300, 100, 200]]
+            await asyncio.sleep(0.05)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == [100, 200, 300]
+
+
+def test_slot_async_full_queue_raises_busy():
+    async def scenario():
+        scheduler = LLMScheduler('test', max_concurrency=1, queue_size=1)
+        order = []
+
+        async def generate():
+            async with scheduler.slot_async():
+                order.append('queued')
+
+        async with scheduler.slot_async():
+            queued = asyncio.create_task(generate())
+            await asyncio.sleep(0.05)
+            with pytest.raises(LLMBusy) as busy:
+                async with scheduler.slot_async():
+                    pass
+        await queued
+        assert order == ['queued']
+        assert 1 <= busy.value.retry_after <= 60
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats['rejected'] == 1
+    assert (stats['active'], stats['queued']) == (0, 0)
+
+
+def test_slot_async_timeout_and_cancellation_leave_no_slot_behind():
+    async def scenario():
+        scheduler = LLMScheduler('test', max_concurrency=1, queue_size=2)
+        async with scheduler.slot_async():
+            with pytest.raises(LLMBusy):
+                async with scheduler.slot_async(timeout=0.05):
+                    pass
+
+            async def wait_forever():
+                async with scheduler.slot_async():
+                    await asyncio.sleep(10)
+
+            cancelled = asyncio.create_task(wait_forever())
+            await asyncio.sleep(0.05)
+            cancelled.cancel()
+            await asyncio.gather(cancelled, return_exceptions=True)
+
+        # Cancelled right as the slot was handed over: it must be passed on
+        async with scheduler.slot_async():
+            handed_over = asyncio.create_task(wait_forever())
+            await asyncio.sleep(0.05)
+        handed_over.cancel()
+        await asyncio.gather(handed_over, return_exceptions=True)
+
+        async with scheduler.slot_async(timeout=0.05):
+            pass
+        return scheduler.stats()
+
+    stats = asyncio.run(scenario())
+    assert (stats['active'], stats['queued'], stats['timed_out']) == (0, 0, 1)
@@ -0,0 +1,96 @@
+import pytest
+from modules.local_index import LocalIndex, split_passages, PASSAGE_CHARS, MIN_PASSAGE_CHARS
+
+SENTENCE = "The Pixel 8 smartwatch pairing keeps battery drain low during the day."
+
+
+def _page(topic, sentences=3):
+    return '\n'.join(f"{topic} review part {i}: {SENTENCE}" for i in range(sentences))
+
+
+@pytest.fixture
+def index(tmp_path):
+    return LocalIndex(path=str(tmp_path / 'index.db'), max_documents=3)
+
+
+def _fts_in_sync(index):
+    """Whether the inverted index holds exactly the stored passages (every passage contains 'review')."""
+    conn = index._connect()
+    indexed = {row[0] for row in conn.execute("SELECT rowid FROM passages_fts WHERE passages_fts MATCH 'review'")}
+    stored = {row[0] for row in conn.execute('SELECT id FROM passages')}
+    return indexed == stored
+
+
+def test_split_passages_respects_the_target_size():
+    text = '\n'.join(SENTENCE for _ in range(30))
+
+    passages = split_passages(text)
+
+    assert len(passages) > 1
+    assert all(MIN_PASSAGE_CHARS <= len(passage) <= PASSAGE_CHARS for passage in passages)
+    assert ' '.join(passages) == ' '.join(SENTENCE for _ in range(30))
+
+
+def test_split_passages_breaks_long_paragraphs_at_sentences():
+    paragraph = ' '.join(SENTENCE for _ in range(20))
+
+    passages = split_passages(paragraph, target=200)
+
+    assert len(passages) > 1
+    assert all(passage.endswith('.') and len(passage) <= 200 for passage in passages)
+
+
+def test_split_passages_drops_fragments():
+    assert split_passages("Menu\nHome\nLogin") == []
+
+
+def test_evidence_needs_enough_passages_covering_the_query(index):
+    for i in range(3):
+        index.add_document(f'https://example.com/watch/{i}', _page('Smartwatch'))
+
+    # 'pixel', 'smartwatches' and 'battery' all appear in every passage ('smartwatches' as 'smartwatch')
+    evidence = index.evidence('pixel smartwatches battery', ['pixel', 'smartwatches', 'battery', 'best'], 10_000,
+                              min_passages=2)
+    assert evidence and 'Smartwatch review' in evidence
+    assert index.stats()['local_answers'] == 1
+
+    # Only 'pixel' of 'pixel earbuds noise' is covered: 1/3 < 0.6
+    assert index.evidence('pixel earbuds noise', ['pixel', 'earbuds', 'noise'], 10_000, min_passages=2) is None
+    # Covered, but by fewer passages than required
+    assert index.evidence('pixel battery', ['pixel', 'battery'], 10_000, min_passages=100) is None
+    assert index.stats()['local_answers'] == 1
+
+
+def test_evidence_ignores_keywords_missing_from_the_query(index):
+    index.add_document('https://example.com/watch', _page('Smartwatch'))
+
+    # The only core term is 'earbuds'; the generic added keywords don't make it a match
+    assert index.evidence('earbuds', ['earbuds', 'review', 'battery'], 10_000, min_passages=1) is None
+
+
+def test_evidence_is_none_when_no_passage_fits_the_budget(index):
+    index.add_document('https://example.com/watch', _page('Smartwatch'))
+
+    assert index.evidence('pixel battery', ['pixel', 'battery'], 20, min_passages=1) is None
+    assert index.stats()['local_answers'] == 0
+
+
+def test_replacing_a_page_keeps_the_fts_index_in_sync(index):
+    index.add_document('https://example.com/watch', _page('Smartwatch'))
+    index.add_document('https://example.com/watch', _page('Earbuds'))
+
+    assert _fts_in_sync(index)
+    hits = index.search(['review'])
+    assert hits and all(hit['text'].startswith('Earbuds') for hit in hits)
+    assert index.stats()['documents'] == 1
+
+
+def test_eviction_keeps_the_fts_index_in_sync(index):
+    for i, topic in enumerate(['Tablet', 'Laptop', 'Camera', 'Speaker']):
+        index.add_document(f'https://example.com/{i}', _page(topic))
+
+    assert index.stats()['documents'] == 3
+    assert _fts_in_sync(index)
+    # The oldest page is gone from the inverted index too
+    assert index.search(['tablet']) == []
+    assert index.search(['speaker'])
@@ -0,0 +1,30 @@
+import pytest
+from modules.page_cache import PageCache, ttl_from_headers, MAX_TTL, EVICT_CHECK_FRACTION
+
+
+@pytest.mark.parametrize('cache_control, ttl', [
+    ('no-store', 0),
+    ('public, no-cache', 0),
+    ('max-age=0', 0),
+    ('private, max-age=60', 60),
+    (f'max-age={MAX_TTL * 10}', MAX_TTL),
+])
+def test_ttl_follows_cache_control(cache_control, ttl):
+    assert ttl_from_headers({'Cache-Control': cache_control}, default=1234) == ttl
+
+
+@pytest.mark.parametrize('headers', [{}, {'Cache-Control': 'public'}, {'Cache-Control': 's-maxage=30'}, None])
+def test_default_ttl_without_max_age(headers):
+    assert ttl_from_headers(headers, default=1234) == 1234
+
+
+def test_size_cap_is_enforced_between_periodic_checks(tmp_path):
+    cache = PageCache(path=str(tmp_path / 'pages.db'), max_bytes=10_000)
+    for i in range(400):
+        cache.put(f'https://example.com/{i}', 'x' * 40, None)
+
+    # Overshoot is bounded by what can be written between two checks
+    assert cache.stats()['bytes'] <= 10_000 * (1 + EVICT_CHECK_FRACTION)
+    # Least recently used pages go first
+    assert cache.get('https://example.com/0') is None
+    assert cache.get('https://example.com/399') is not None
@@ -0,0 +1,175 @@
+import os
+import random
+import re
+import subprocess
+import sys
+import pytest
+from modules.pre_filtering import (KeywordMatcher, DocumentFilter, HIGH_RELEVANCE_INDICATORS,
+                                   UNWANTED_SECTION_PATTERNS, _trie_pattern, tier_sentences,
+                                   _remove_unwanted_sections, rank_sentences, filter_content)
+
+# Keywords that overlap, contain one another or repeat
+KEYWORDS = ['date', 'dates', 'update', 'at', 'a', 'phone', 'iphone', 'iphone 15', 'ph', 'hone', 'one', 'one', '']
+
+SENTENCES = [
+    'The iPhone 15 launch dates were updated.',
+    'Phones at a glance.',
+    'Nothing to see here.',
+    'honest',
+    'iphon',
+    '',
+    'one date, two dates, no update',
+]
+
+
+def _old_count(keywords, text):
+    return sum(1 for kw in keywords if kw in text)
+
+
+def _old_tiers(sentences, keywords):
+    high, medium = [], []
+    keywords_lower = [kw.lower() for kw in keywords]
+    for sentence in sentences:
+        sentence_lower = sentence.lower()
+        if any(indicator in sentence_lower for indicator in HIGH_RELEVANCE_INDICATORS):
+            high.append(sentence)
+            continue
+        matches = sum(1 for kw in keywords_lower if kw in sentence_lower)
+        if matches >= 2:
+            high.append(sentence)
+        elif matches >= 1:
+            medium.append(sentence)
+    return high, medium
+
+
+def _old_remove_unwanted_sections(content):
+    filtered_lines = []
+    skip_section = False
+    for line in content.split('\n'):
+        if any(pattern.lower() in line.lower() for pattern in UNWANTED_SECTION_PATTERNS):
+            skip_section = True
+            continue
+        if line.strip() and not line.startswith(' ') and len(line.split()) <= 5:
+            skip_section = False
+        if not skip_section and line.strip():
+            filtered_lines.append(line)
+    return '\n'.join(filtered_lines)
+
+
+def _random_texts(alphabet, count, seed=0):
+    rng = random.Random(seed)
+    return [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 30))) for _ in range(count)]
+
+
+@pytest.mark.parametrize('text', SENTENCES)
+def test_count_matches_substring_checks(text):
+    text = text.lower()
+    assert KeywordMatcher(KEYWORDS).count(text) == _old_count(KEYWORDS, text)
+
+
+def test_count_matches_substring_checks_on_random_text():
+    # A small alphabet makes overlapping and nested matches common
+    keywords = ['ab', 'abc', 'b', 'bca', 'cab', 'c', 'abcab', 'ab']
+    matcher = KeywordMatcher(keywords)
+    for text in _random_texts('abc ', 500):
+        assert matcher.count(text) == _old_count(keywords, text), text
+
+
+def test_count_with_limit_stops_at_the_limit():
+    text = 'the iphone 15 launch dates were updated'
+    matcher = KeywordMatcher(KEYWORDS)
+    assert _old_count(KEYWORDS, text) > 2
+    assert matcher.count(text, limit=2) == 2
+    assert matcher.count('nothing', limit=2) == _old_count(KEYWORDS, 'nothing')
+
+
+def test_nested_keywords_credit_the_shorter_ones():
+    # Only 'iphone 15' matches at position 0, 'iphone', 'phone', 'ph', 'hone', 'one' are implied by it
+    assert KeywordMatcher(['iphone 15', 'iphone', 'phone', 'ph', 'hone', 'one']).count('iphone 15') == 6
+
+
+@pytest.mark.parametrize('patterns', [
+    ['date', 'dates', 'deadline'],
+    ['a', 'ab', 'abc', 'b'],
+    ['$', '₹', 'c++', 'vs.'],
+])
+def test_trie_pattern_finds_the_longest_pattern_at_each_position(patterns):
+    regex = re.compile(_trie_pattern(patterns))
+    for text in _random_texts(''.join(set(''.join(patterns))) + ' ', 300, seed=1):
+        for start in range(len(text)):
+            longest = max((p for p in patterns if text.startswith(p, start)), key=len, default=None)
+            match = regex.match(text, start)
+            assert (match.group(0) if match else None) == longest
+
+
+def test_tiers_match_substring_checks():
+    keywords = ['iPhone', 'iPhone 15', 'one', 'launch', 'dates']
+    sentences = SENTENCES + ['The camera is great.', 'Launch of one iPhone.', 'Someone launched it.']
+    assert tier_sentences(sentences, keywords) == _old_tiers(sentences, keywords)
+
+
+def test_unwanted_sections_match_substring_checks():
+    content = '\n'.join([
+        'Phone review',
+        'The battery lasts two days.',
+        'Frequently Asked Questions',
+        'It is waterproof.',
+        '  indented answer stays skipped',
+        'Specs',
+        'Six inch display.',
+        'Click HERE to subscribe',
+        'Contact',
+    ])
+    assert _remove_unwanted_sections(content) == _old_remove_unwanted_sections(content)
+
+
+RANKED_SENTENCES = [
+    'The weather was pleasant all week.',
+    'The battery lasts two days on a single charge.',
+    'Battery life and battery charging speed are the best in its class.',
+    'Charging takes an hour.',
+    'Nothing relevant here.',
+]
+
+
+def test_rank_sentences_orders_by_bm25_score():
+    ranked = rank_sentences(RANKED_SENTENCES, ['battery', 'charging'])
+
+    # Both terms, one repeated, beats one term; sentences without a query term are dropped
+    assert ranked[0] == RANKED_SENTENCES[2]
+    assert set(ranked) == set(RANKED_SENTENCES[1:4])
+    # One match each, so length normalisation puts the shorter sentence first
+    assert ranked.index(RANKED_SENTENCES[3]) < ranked.index(RANKED_SENTENCES[1])
+
+
+def test_rank_sentences_keeps_within_the_char_budget():
+    best, shorter = RANKED_SENTENCES[2], RANKED_SENTENCES[3]
+    budget = len(best) + 1 + len(shorter) + 1
+
+    ranked = rank_sentences(RANKED_SENTENCES, ['battery', 'charging'], char_budget=budget)
+
+    # The battery-only sentence doesn't fit after the best one; a lower-scored shorter one still does
+    assert ranked == [best, shorter]
+    assert sum(len(sentence) + 1 for sentence in ranked) <= budget
+
+
+def test_rank_sentences_without_matches():
+    assert rank_sentences(RANKED_SENTENCES, ['laptop']) == []
+    assert rank_sentences([], ['battery']) == []
+    assert rank_sentences(RANKED_SENTENCES, []) == []
+
+
+def test_unknown_filter_mode_is_rejected_by_both_entry_points():
+    with pytest.raises(ValueError):
+        filter_content('Some text.', ['text'], mode='fuzzy')
+    with pytest.raises(ValueError):
+        DocumentFilter(['text'], mode='fuzzy')
+
+
+def test_unknown_filter_mode_setting_fails_at_import():
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', 'import modules.pre_filtering'], cwd=backend,
+                            env={**os.environ, 'FILTER_MODE': 'fuzzy'}, capture_output=True, text=True)
+
+    assert result.returncode != 0
+    assert "Unknown filter mode 'fuzzy'" in result.stderr
@@ -0,0 +1,28 @@
+import httpx
+from modules import web_search
+from modules.query_understanding import RECENCY_KEYWORDS
+from modules.search_cache import search_cache_key, get_search_cache
+
+
+def test_typed_years_stay_in_the_key():
+    assert search_cache_key(['laptops', '2024'], 10) != search_cache_key(['laptops', '2025'], 10)
+
+
+def test_injected_recency_block_is_collapsed():
+    plain = search_cache_key(['laptops'] + RECENCY_KEYWORDS, 10)
+    reordered = search_cache_key(list(reversed(RECENCY_KEYWORDS)) + ['Laptops'], 10)
+    assert plain == reordered
+    assert plain != search_cache_key(['laptops'], 10)
+
+
+def test_reliable_url_fallback_is_not_cached(monkeypatch):
+    keywords = ['obscure', 'laptop', 'query']
+    monkeypatch.setattr(web_search, 'BROWSER_SEARCH_ENABLED', False)
+    # A results page without any result links
+    monkeypatch.setattr(web_search.http_client, 'get', lambda url, **kwargs: httpx.Response(
+        200, text='<html><body>No results</body></html>', request=httpx.Request('GET', url)))
+
+    links = web_search.search_web(keywords)
+
+    assert links == web_search.get_reliable_urls_for_query(' '.join(keywords))[:len(links)]
+    assert get_search_cache().get(keywords, web_search.MAX_SEARCH_RESULTS) is None
@@ -0,0 +1,84 @@
+import re
+import types
+import zlib
+import numpy as np
+import pytest
+from modules import semantic_cache
+from modules.semantic_cache import SemanticCache, query_numbers
+
+RESULT = {'summary': 'The iPhone 15 costs 79900 rupees.', 'sources': ['https://example.com/iphone']}
+HISTORY = [{'sender': 'user', 'text': 'I want an Apple phone'}]
+
+
+def fake_embed(text):
+    """Bag of words without digits or punctuation, so "iphone 15" and "iphone 16" embed identically."""
+    vector = np.zeros(64, dtype=np.float32)
+    for word in re.findall(r'[a-z]+', text.lower()):
+        vector[zlib.crc32(word.encode()) % 64] += 1
+    return vector / np.linalg.norm(vector)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(semantic_cache, 'time', types.SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def cache(monkeypatch, clock):
+    monkeypatch.setattr(semantic_cache, 'embed', fake_embed)
+    return SemanticCache(threshold=0.9, ttl=600, size=4, enabled=True)
+
+
+def test_paraphrase_hits(cache):
+    cache.put('iphone 15 price', HISTORY, RESULT)
+
+    assert cache.lookup('Price of the iPhone 15?', HISTORY) is None  # extra words: below the threshold
+    assert cache.lookup('iPhone 15 price?', HISTORY) == RESULT
+
+
+def test_different_numbers_never_match(cache):
+    cache.put('iphone 15 price', HISTORY, RESULT)
+
+    # Same embedding, different model number
+    assert np.allclose(fake_embed('iphone 15 price'), fake_embed('iphone 16 price'))
+    assert cache.lookup('iphone 16 price', HISTORY) is None
+    assert cache.lookup('iphone price', HISTORY) is None
+
+
+def test_changed_history_misses(cache):
+    cache.put('iphone 15 price', HISTORY, RESULT)
+
+    assert cache.lookup('iphone 15 price', None) is None
+    assert cache.lookup('iphone 15 price', HISTORY + [{'sender': 'assistant', 'text': 'Sure.'}]) is None
+
+
+def test_entries_expire(cache, clock):
+    cache.put('iphone 15 price', HISTORY, RESULT)
+
+    clock[0] += 601
+
+    assert cache.lookup('iphone 15 price', HISTORY) is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_embedding_failure_disables_the_cache_for_a_while(monkeypatch, clock):
+    def unavailable(text):
+        raise ConnectionError("ollama is not running")
+
+    monkeypatch.setattr(semantic_cache, 'embed', unavailable)
+    cache = SemanticCache(enabled=True)
+
+    assert cache.lookup('iphone 15 price') is None
+    cache.put('iphone 15 price', None, RESULT)
+    assert cache.stats()['errors'] == 1
+
+
+@pytest.mark.parametrize('query, numbers', [
+    ('phones under 50,000', {'50000'}),
+    ('top 5 laptops 2024', {'5', '2024'}),
+    ('best phone', set()),
+])
+def test_query_numbers(query, numbers):
+    assert query_numbers(query) == numbers
@@ -0,0 +1,213 @@
+import asyncio
+import threading
+import time
+import pytest
+from modules.single_flight import SingleFlight, AsyncSingleFlight, stream_abandoned
+
+
+def _in_threads(count, fn):
+    results = [None] * count
+
+    def run(i):
+        try:
+            results[i] = fn()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+def test_do_shares_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return 'answer'
+
+    threading.Timer(0.2, release.set).start()
+    results = _in_threads(4, lambda: flight.do('key', work))
+
+    assert results == ['answer'] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {'in_flight': 0, 'coalesced': 3}
+
+
+def test_do_shares_errors_and_then_forgets_the_key():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError("search failed")
+
+    threading.Timer(0.2, release.set).start()
+    results = _in_threads(3, lambda: flight.do('key', failing))
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.do('key', lambda: 'retried') == 'retried'
+
+
+def test_late_stream_subscriber_replays_the_buffer():
+    flight = SingleFlight()
+    second_may_finish = threading.Event()
+
+    def events():
+        yield 'stage'
+        yield 'token'
+        second_may_finish.wait(5)
+        yield 'done'
+
+    first = flight.stream('key', events)
+    assert [next(first), next(first)] == ['stage', 'token']
+
+    second = flight.stream('key', events)
+    second_may_finish.set()
+
+    assert list(second) == ['stage', 'token', 'done']
+    assert list(first) == ['done']
+    assert flight.coalesced == 1
+
+
+def test_stream_is_closed_when_the_last_subscriber_leaves():
+    flight = SingleFlight()
+    closed = threading.Event()
+
+    def events():
+        try:
+            while True:
+                yield 'token'
+                time.sleep(0.01)
+        finally:
+            closed.set()
+
+    first = flight.stream('key', events)
+    second = flight.stream('key', events)
+    next(first), next(second)
+
+    first.close()
+    assert not closed.wait(0.2)
+    second.close()
+
+    assert closed.wait(2)
+    assert flight.stats()['in_flight'] == 0
+
+
+def test_abandoned_stream_is_noticed_while_the_generator_waits():
+    flight = SingleFlight()
+    gave_up = threading.Event()
+
+    def events():
+        yield 'generating'
+        # A long wait with no events, like queueing for the LLM
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if stream_abandoned():
+                gave_up.set()
+                return
+            time.sleep(0.01)
+        yield 'token'
+
+    subscriber = flight.stream('key', events)
+    assert next(subscriber) == 'generating'
+    subscriber.close()
+
+    assert gave_up.wait(2)
+
+    def fresh():
+        yield 'fresh'
+
+    # A new request for the same key doesn't attach to the abandoned run
+    assert list(flight.stream('key', fresh)) == ['fresh']
+
+
+def test_stream_abandoned_outside_a_stream():
+    assert stream_abandoned() is False
+
+
+def test_async_do_shares_one_task_until_every_waiter_leaves():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        started = []
+        cancelled = asyncio.Event()
+
+        async def work():
+            started.append(1)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        first = asyncio.create_task(flight.do('key', work))
+        second = asyncio.create_task(flight.do('key', work))
+        await asyncio.sleep(0.05)
+
+        first.cancel()
+        await asyncio.sleep(0.05)
+        assert not cancelled.is_set()
+
+        second.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert started == [1]
+        assert flight.stats()['in_flight'] == 0
+
+    asyncio.run(scenario())
+
+
+def test_async_do_result_survives_a_cancelled_waiter():
+    async def scenario():
+        flight = AsyncSingleFlight()
+
+        async def work():
+            await asyncio.sleep(0.1)
+            return 'answer'
+
+        first = asyncio.create_task(flight.do('key', work))
+        second = asyncio.create_task(flight.do('key', work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == 'answer'
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    asyncio.run(scenario())
+
+
+def test_async_stream_replays_and_stops_with_the_last_subscriber():
+    async def scenario():
+        flight = AsyncSingleFlight()
+        closed = asyncio.Event()
+
+        async def events():
+            try:
+                yield 'stage'
+                yield 'token'
+                await asyncio.sleep(10)
+                yield 'done'
+            finally:
+                closed.set()
+
+        first = flight.stream('key', events)
+        assert [await first.__anext__(), await first.__anext__()] == ['stage', 'token']
+
+        second = flight.stream('key', events)
+        assert [await second.__anext__(), await second.__anext__()] == ['stage', 'token']
+
+        await first.aclose()
+        await asyncio.sleep(0.05)
+        assert not closed.is_set()
+
+        await second.aclose()
+        await asyncio.wait_for(closed.wait(), 1)
+        assert flight.stats()['in_flight'] == 0
+
+    asyncio.run(scenario())
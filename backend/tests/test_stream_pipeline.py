@@ -0,0 +1,87 @@
+import asyncio
+import pytest
+import app
+import app_async
+from modules.answer_cache import AnswerCache
+from modules.metrics import STAGE_SECONDS
+from modules.semantic_cache import SemanticCache
+
+
+def scraped(urls):
+    yield 0, 'Phone evidence.'
+
+
+class FakeFilter:
+    def __init__(self, keywords, query=None):
+        self.texts = []
+
+    def add(self, index, text):
+        self.texts.append(text)
+        return False
+
+    def result(self):
+        return ' '.join(self.texts)
+
+
+@pytest.fixture
+def stages(monkeypatch, tmp_path):
+    """Runs the streaming pipelines against fakes and collects the stages they time."""
+    recorded = []
+    monkeypatch.setattr(STAGE_SECONDS, '_listeners', [lambda value, labels: recorded.append(labels['stage'])])
+
+    cache = AnswerCache(path=str(tmp_path / 'answers.db'))
+    for module in (app, app_async):
+        monkeypatch.setattr(module, 'get_answer_cache', lambda: cache)
+        monkeypatch.setattr(module, 'get_semantic_cache', lambda: SemanticCache(enabled=False))
+        monkeypatch.setattr(module, 'extract_keywords', lambda query: ['phone'])
+        monkeypatch.setattr(module, 'local_first_evidence', lambda *args: None)
+        monkeypatch.setattr(module, 'DocumentFilter', FakeFilter)
+    return recorded
+
+
+def test_stream_pipeline_times_the_pipeline_and_the_scrape(stages, monkeypatch):
+    def stream_summary(content, query, conversation_history=None, prompt_tokens=None):
+        yield 'An answer.'
+
+    monkeypatch.setattr(app, 'search_web', lambda keywords: ['https://example.com/phones'])
+    monkeypatch.setattr(app, 'iter_scraped', scraped)
+    monkeypatch.setattr(app, 'stream_summary', stream_summary)
+
+    events = list(app.stream_pipeline('best phone'))
+
+    assert events[-1]['type'] == 'done'
+    assert 'scrape' in stages and stages[-1] == 'pipeline'
+
+
+def test_async_stream_pipeline_times_the_pipeline_and_the_scrape(stages, monkeypatch):
+    async def search_web_async(client, keywords):
+        return ['https://example.com/phones']
+
+    async def iter_scraped_async(client, urls):
+        yield 0, 'Phone evidence.'
+
+    async def stream_summary_async(content, query, conversation_history=None, prompt_tokens=None):
+        yield 'An answer.'
+
+    monkeypatch.setattr(app_async, 'search_web_async', search_web_async)
+    monkeypatch.setattr(app_async, 'iter_scraped_async', iter_scraped_async)
+    monkeypatch.setattr(app_async, 'stream_summary_async', stream_summary_async)
+
+    async def collect():
+        return [event async for event in app_async.stream_pipeline(None, 'best phone')]
+
+    events = asyncio.run(collect())
+
+    assert events[-1]['type'] == 'done'
+    assert 'scrape' in stages and stages[-1] == 'pipeline'
+
+
+def test_abandoned_stream_still_records_the_pipeline(stages, monkeypatch):
+    monkeypatch.setattr(app, 'search_web', lambda keywords: ['https://example.com/phones'])
+    monkeypatch.setattr(app, 'iter_scraped', scraped)
+
+    events = app.stream_pipeline('best phone')
+    next(events)
+    events.close()
+
+    assert stages[-1] == 'pipeline'
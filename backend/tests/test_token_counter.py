@@ -0,0 +1,32 @@
+from modules.token_counter import count_tokens, fit_to_budget
+
+
+def test_text_within_budget_is_kept_whole():
+    text = "Short evidence. Another sentence."
+    assert fit_to_budget(text, 100) == (text, count_tokens(text))
+
+
+def test_oversized_first_sentence_does_not_drop_the_rest():
+    long_row = "| model | price | battery | " * 60 + "end of table."
+    text = long_row + " The battery lasts two days. It costs 4999 rupees."
+
+    fitted, tokens = fit_to_budget(text, 30)
+
+    assert fitted == "The battery lasts two days. It costs 4999 rupees."
+    assert 0 < tokens <= 30
+
+
+def test_text_without_any_fitting_sentence_is_truncated():
+    # A page without punctuation is one long sentence
+    text = " ".join(f"word{i}" for i in range(500))
+
+    fitted, tokens = fit_to_budget(text, 20)
+
+    assert fitted
+    assert text.startswith(fitted)
+    assert 0 < tokens <= 20
+    assert tokens == count_tokens(fitted)
+
+
+def test_zero_budget_gives_nothing():
+    assert fit_to_budget("Some evidence.", 0) == ("", 0)
@@ -1,9 +1,28 @@
 import React, { useState } from 'react';
-import axios from 'axios';
 import ReactMarkdown from 'react-markdown';
 import { Prism as SyntaxHighlighter } from 'react-syntax-highlighter';
 import { oneDark } from 'react-syntax-highlighter/dist/esm/styles/prism';
 
+const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:5001';
+
+// Loading text shown for each pipeline stage event from the stream
+const stageText = (event) => {
+  switch (event.stage) {
+    case 'understanding':
+      return 'Understanding your question...';
+    case 'searching':
+      return 'Searching the web...';
+    case 'scraping':
+      return `Reading sources (${event.done}/${event.total})...`;
+    case 'filtering':
+      return 'Picking out the relevant information...';
+    case 'generating':
+      return 'Writing a response...';
+    default:
+      return 'Searching and analyzing information...';
+  }
+};
+
 const ChatNew = () => {
   const [messages, setMessages] = useState([]);
   const [inputValue, setInputValue] = useState('');
@@ -29,23 +48,60 @@ const ChatNew = () => {
           sender: msg.sender
         }));
 
-        const response = await axios.post('http://localhost:5001/api/query', { 
-          query: currentQuery,
-          conversation_history: conversationHistory
-        });
-        
-        // Extract the summary content from the response
-        const aiResponse = response.data.summary || response.data || 'No response received';
-        
-        // Remove loading message and add properly formatted response
-        setMessages(prev => {
-          const newMessages = prev.slice(0, -1); // Remove loading message
-          return [...newMessages, { 
-            text: aiResponse, 
-            sender: 'bot',
-            sources: response.data.sources || []
-          }];
+        const response = await fetch(`${API_URL}/api/query/stream`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({
+            query: currentQuery,
+            conversation_history: conversationHistory
+          })
         });
+
+        // Replace the last (bot) message as stream events arrive
+        const updateBotMessage = (update) => {
+          setMessages(prev => [...prev.slice(0, -1), { ...prev[prev.length - 1], ...update }]);
+        };
+
+        // Server is at capacity, show its message instead of a generic error
+        if (response.status === 503) {
+          const data = await response.json();
+          updateBotMessage({ text: data.error, isLoading: false });
+          return;
+        }
+
+        if (!response.ok || !response.body) {
+          throw new Error(`Request failed with status ${response.status}`);
+        }
+
+        let aiResponse = '';
+        const handleEvent = (event) => {
+          if (event.type === 'stage') {
+            updateBotMessage({ text: stageText(event) });
+          } else if (event.type === 'token') {
+            aiResponse += event.text;
+            updateBotMessage({ text: aiResponse, isLoading: false });
+          } else if (event.type === 'done') {
+            updateBotMessage({ text: aiResponse || 'No response received', isLoading: false, sources: event.sources || [] });
+          } else if (event.type === 'error') {
+            updateBotMessage({ text: event.message, isLoading: false });
+          }
+        };
+
+        // Read newline-delimited JSON events incrementally
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+          const lines = buffer.split('\n');
+          buffer = lines.pop();
+          lines.filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+        }
+        if (buffer.trim()) {
+          handleEvent(JSON.parse(buffer));
+        }
         
       } catch (error) {
         console.error('Error fetching AI response:', error);
@@ -1,20 +1,43 @@
 #!/usr/bin/env python3
+"""
+Checks keyword extraction and web search for one query.
 
+    python test_search.py             # searches the live web
+    python test_search.py --offline   # searches the recorded fixtures instead
+"""
+
+import os
 import sys
-sys.path.append('/Users/codname_gd/Desktop/Personal_Copilot/backend')
+from contextlib import nullcontext
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+sys.path.insert(0, BACKEND_DIR)
+
+
+def main(offline):
+    from modules.web_search import search_web
+    from modules.query_understanding import extract_keywords
+
+    # Test the search functionality
+    query = "best smartwatch under 5000" if offline else "latest iPhone 16 features and price 2024"
+    print(f"Testing query: {query}")
 
-from modules.web_search import search_web
-from modules.query_understanding import extract_keywords
+    # Test keyword extraction
+    keywords = extract_keywords(query)
+    print(f"Extracted keywords: {keywords}")
 
-# Test the search functionality
-query = "latest iPhone 16 features and price 2024"
-print(f"Testing query: {query}")
+    # Test web search
+    urls = search_web(keywords, use_cache=False)
+    print(f"Found URLs: {urls}")
+    print(f"Number of URLs: {len(urls)}")
 
-# Test keyword extraction
-keywords = extract_keywords(query)
-print(f"Extracted keywords: {keywords}")
 
-# Test web search
-urls = search_web(keywords)
-print(f"Found URLs: {urls}")
-print(f"Number of URLs: {len(urls)}")
+if __name__ == '__main__':
+    offline = '--offline' in sys.argv[1:]
+    if offline:
+        from benchmarks.stub_servers import stub_servers
+    with stub_servers() if offline else nullcontext() as stubs:
+        if stubs:
+            # Read by modules.web_search at import time
+            os.environ['SEARCH_URL'] = stubs['search_url']
+        main(offline)